@@ -1,18 +1,55 @@
 #!/usr/bin/env python
 
 import logging
-from logging.config import dictConfig as _dictConfig
 from os import path
 
-import yaml
-
 __author__ = "Samuel Marks"
 __version__ = "0.0.9-alpha"
 
+_logging_configured = False
+
+
+def configure_logging():
+    """
+    Configure logging—once—with the logging.yml config, unless the root logger
+    already has handlers (i.e., the application has configured logging itself)
+    """
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+    if logging.getLogger().handlers:
+        return
+
+    from logging.config import dictConfig
+
+    import yaml
+
+    with open(path.join(path.dirname(__file__), "_data", "logging.yml"), "rt") as f:
+        data = yaml.load(f, Loader=yaml.SafeLoader)
+    dictConfig(data)
+
+
+class _ConfigureOnFirstRecordHandler(logging.Handler):
+    """
+    Defer `configure_logging`—and the PyYAML import—until a record is first emitted
+    """
+
+    def handle(self, record):
+        configure_logging()
+        logging.getLogger(__name__).removeHandler(self)
+        return True
+
+    def emit(self, record):
+        pass
+
+
+logging.getLogger(__name__).addHandler(_ConfigureOnFirstRecordHandler())
+
 
 def get_logger(name=None):
     """
-    Create logger—with optional name—with the logging.yml config
+    Create logger—with optional name—with the logging.yml config, applied lazily
 
     :param name: Optional name of logger
     :type name: ```Optional[str]```
@@ -20,12 +57,9 @@ def get_logger(name=None):
     :return: instanceof Logger
     :rtype: ```Logger```
     """
-    with open(path.join(path.dirname(__file__), "_data", "logging.yml"), "rt") as f:
-        data = yaml.load(f, Loader=yaml.SafeLoader)
-    _dictConfig(data)
     return logging.getLogger(name=name)
 
 
 root_logger = get_logger()
 
-__all__ = ["get_logger", "root_logger"]
+__all__ = ["configure_logging", "get_logger", "root_logger"]
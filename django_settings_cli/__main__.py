@@ -1,11 +1,17 @@
 #!/usr/bin/env python
 
 from argparse import ArgumentParser
+from os import environ
 from sys import argv, modules
 
 from django_settings_cli import __version__
+from django_settings_cli import diff as django_settings_diff
 from django_settings_cli import emitter as django_settings_emitter
+from django_settings_cli import matrix as django_settings_matrix
 from django_settings_cli import parser as django_settings_parser
+from django_settings_cli import profiling
+from django_settings_cli import server as django_settings_server
+from django_settings_cli import snapshot as django_settings_snapshot
 
 
 def _build_parser():
@@ -19,16 +25,51 @@ def _build_parser():
         prog="python -m {}".format(modules[__name__].__package__),
         description="Basic parsing, modifying & emitting for Django settings.py files.",
     )
-    subparsers = parser.add_subparsers(help="parse and emit", dest="command")
+    subparsers = parser.add_subparsers(
+        help="parse, emit, diff, compile, render-matrix and serve", dest="command"
+    )
+
+    profiling._parser_cli_args(
+        django_settings_parser._parser_cli_args(
+            subparsers.add_parser("parse", help=django_settings_parser.__desc__)
+        )
+    )
 
-    django_settings_parser._parser_cli_args(
-        subparsers.add_parser("parse", help=django_settings_parser.__desc__)
+    profiling._parser_cli_args(
+        django_settings_emitter._parser_cli_args(
+            subparsers.add_parser("emit", help=django_settings_emitter.__desc__)
+        )
     )
 
-    django_settings_emitter._parser_cli_args(
-        subparsers.add_parser("emit", help=django_settings_emitter.__desc__)
+    profiling._parser_cli_args(
+        django_settings_diff._parser_cli_args(
+            subparsers.add_parser("diff", help=django_settings_diff.__desc__)
+        )
     )
 
+    profiling._parser_cli_args(
+        django_settings_snapshot._parser_cli_args(
+            subparsers.add_parser("compile", help=django_settings_snapshot.__desc__)
+        )
+    )
+
+    profiling._parser_cli_args(
+        django_settings_matrix._parser_cli_args(
+            subparsers.add_parser("render-matrix", help=django_settings_matrix.__desc__)
+        )
+    )
+
+    django_settings_server._parser_cli_args(
+        subparsers.add_parser("serve", help=django_settings_server.__desc__)
+    )
+
+    parser.add_argument(
+        "--socket",
+        help="Forward parse and emit to the server on this Unix socket"
+        " (default: $DJANGO_SETTING_CLI_SOCKET)",
+        dest="socket_path",
+        default=environ.get("DJANGO_SETTING_CLI_SOCKET"),
+    )
     parser.add_argument(
         "--version", action="version", version="%(prog)s {}".format(__version__)
     )
@@ -43,7 +84,21 @@ if __name__ == "__main__":
     kwargs = dict(_build_parser().parse_args()._get_kwargs())
     # django_settings_parser.debug_py
     command = kwargs.pop("command")
-    {
-        "parse": django_settings_parser.query_py_with_output,
-        "emit": django_settings_emitter.emit,
-    }[command](**kwargs)
+    if command == "serve":
+        django_settings_server.serve(kwargs["listen_path"] or kwargs["socket_path"])
+    else:
+        profiling.start_from_cli(kwargs)
+        try:
+            socket_path = kwargs.pop("socket_path")
+            if socket_path and command in ("parse", "emit"):
+                django_settings_server.client(socket_path, command, kwargs)
+            else:
+                {
+                    "parse": django_settings_parser.query_py_with_output,
+                    "emit": django_settings_emitter.emit,
+                    "diff": django_settings_diff.diff_with_output,
+                    "compile": django_settings_snapshot.compile_with_output,
+                    "render-matrix": django_settings_matrix.render_matrix_with_output,
+                }[command](**kwargs)
+        finally:
+            profiling.stop()
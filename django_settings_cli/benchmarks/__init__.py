@@ -0,0 +1,227 @@
+"""
+Benchmarks: time each phase—cold start, parsing, querying, whole-file dumps, `--format`
+rendering, serialisation and emitting—on generated settings files, save the timings as JSON, and
+compare them with a baseline run.
+
+    $ python -m django_settings_cli.benchmarks --sizes 1KB 1MB 50MB -o baseline.json
+    $ python -m django_settings_cli.benchmarks --baseline baseline.json --threshold 0.2
+"""
+
+import ast
+from collections import OrderedDict
+from functools import partial
+from os import devnull, path, remove
+from platform import platform, python_version
+from shutil import rmtree
+from subprocess import check_call
+from sys import executable
+from timeit import default_timer
+
+from django_settings_cli import __version__
+from django_settings_cli.benchmarks.generator import (
+    SHAPES,
+    generate_settings,
+    parse_size,
+)
+
+CASES = (
+    "cold_start",
+    "parse_file",
+    "query_py_parser",
+    "dump",
+    "format",
+    "serialize",
+    "emit",
+)
+
+FORMAT_STR = (
+    '{ENGINE[ENGINE.rfind(".")+1:]}://{USER}@{HOST or "localhost"}:{PORT}/{NAME}'
+)
+
+
+def _literal_tree(source):
+    """Every top-level literal setting of `source`, as Python values"""
+    from django_settings_cli.parser.parser_utils import is_literal, node_to_python
+
+    return OrderedDict(
+        (node.targets[0].id, node_to_python(node))
+        for node in ast.parse(source).body
+        if isinstance(node, ast.Assign)
+        and isinstance(node.targets[0], ast.Name)
+        and is_literal(node.value)
+    )
+
+
+def _cases(filename, source, queries):
+    """
+    :return: Case name to a function preparing its input—only when the case is run—and
+      returning a function running it once, on the settings file `filename`
+    :rtype: ```OrderedDict```
+    """
+    from django_settings_cli.emitter import MergeStrategy, emit_source
+    from django_settings_cli.parser import parse_file, query_py_parser
+    from django_settings_cli.parser.dump import dump_file
+    from django_settings_cli.utils import stream_tree_as_json
+
+    def cold_start():
+        with open(devnull, "wt") as f:
+            check_call(
+                [
+                    executable,
+                    "-m",
+                    "django_settings_cli",
+                    "parse",
+                    queries[0],
+                    filename,
+                ],
+                stdout=f,
+            )
+
+    def serialize():
+        tree = _literal_tree(source)
+        return lambda: stream_tree_as_json(devnull, tree, False)
+
+    return OrderedDict(
+        (
+            ("cold_start", lambda: cold_start),
+            (
+                "parse_file",
+                lambda: partial(parse_file, filename, tuple(queries[-1].split("."))),
+            ),
+            (
+                "query_py_parser",
+                lambda: partial(query_py_parser, filename, query=queries),
+            ),
+            ("dump", lambda: partial(dump_file, filename)),
+            (
+                "format",
+                lambda: partial(
+                    query_py_parser,
+                    filename,
+                    query=".DATABASES.default",
+                    format_str=FORMAT_STR,
+                ),
+            ),
+            ("serialize", serialize),
+            (
+                "emit",
+                lambda: partial(
+                    emit_source,
+                    filename,
+                    ".DATABASES.default.HOST",
+                    "'db'",
+                    MergeStrategy.upsert,
+                ),
+            ),
+        )
+    )
+
+
+def _stats(times):
+    times = sorted(times)
+    return OrderedDict(
+        (
+            ("min", times[0]),
+            ("median", times[len(times) // 2]),
+            ("repeat", len(times)),
+        )
+    )
+
+
+def run(
+    sizes=("1KB", "100KB", "1MB"), shapes=SHAPES, cases=CASES, repeat=5, tmpdir=None
+):
+    """
+    Time every case on a generated file of every size and shape
+
+    :param sizes: File sizes, e.g., `("1KB", "50MB")`
+    :type sizes: ```Iterable[Union[int, str]]```
+
+    :param shapes: File shapes, of `generator.SHAPES`
+    :type shapes: ```Iterable[str]```
+
+    :param cases: Cases, of `CASES`
+    :type cases: ```Iterable[str]```
+
+    :param repeat: Timings taken of each case
+    :type repeat: ```int```
+
+    :param tmpdir: Directory for the generated files; default a new temporary one,
+      removed once run
+    :type tmpdir: ```Optional[str]```
+
+    :return: Run metadata and, keyed by `case[shape,size]`, the min and median seconds
+    :rtype: ```OrderedDict```
+    """
+    temporary = tmpdir is None
+    if temporary:
+        from tempfile import mkdtemp
+
+        tmpdir = mkdtemp(prefix="django_settings_cli_bench")
+
+    results = OrderedDict()
+    try:
+        for shape in shapes:
+            for size in sizes:
+                source, queries = generate_settings(size, shape)
+                filename = path.join(tmpdir, "{}_{}.py".format(shape, parse_size(size)))
+                with open(filename, "wt") as f:
+                    f.write(source)
+                try:
+                    for case, prepare in _cases(filename, source, queries).items():
+                        if case not in cases:
+                            continue
+                        func, times = prepare(), []
+                        for _ in range(repeat):
+                            start = default_timer()
+                            func()
+                            times.append(default_timer() - start)
+                        results["{}[{},{}]".format(case, shape, size)] = _stats(times)
+                finally:
+                    remove(filename)
+    finally:
+        if temporary:
+            rmtree(tmpdir)
+
+    return OrderedDict(
+        (
+            ("version", __version__),
+            ("python", python_version()),
+            ("platform", platform()),
+            ("results", results),
+        )
+    )
+
+
+def compare(baseline, current, threshold=0.2, floor=0.001):
+    """
+    Find the cases slower than in `baseline`—by their fastest timing—by more than
+    `threshold`, ignoring differences under `floor` seconds as noise
+
+    :param baseline: Results of `run`
+    :type baseline: ```dict```
+
+    :param current: Results of `run`
+    :type current: ```dict```
+
+    :param threshold: Tolerated slowdown, e.g., `0.2` for 20%
+    :type threshold: ```float```
+
+    :param floor: Seconds
+    :type floor: ```float```
+
+    :return: Case, baseline and current seconds, of each regression
+    :rtype: ```List[Tuple[str, float, float]]```
+    """
+    regressions = []
+    for key, stats in current["results"].items():
+        before = baseline["results"].get(key)
+        if before is None:
+            continue
+        old, new = before["min"], stats["min"]
+        if new > old * (1 + threshold) and new - old > floor:
+            regressions.append((key, old, new))
+    return regressions
+
+
+__all__ = ["CASES", "compare", "run"]
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+from argparse import ArgumentParser
+from json import dump, load
+from sys import exit, modules, stdout
+
+from django_settings_cli.benchmarks import CASES, compare, run
+from django_settings_cli.benchmarks.generator import SHAPES
+
+
+def _build_parser():
+    """
+    CLI parser builder using builtin `argparse` module
+
+    :returns: instanceof ArgumentParser
+    :rtype: ```ArgumentParser```
+    """
+    parser = ArgumentParser(
+        prog="python -m {}".format(modules[__name__].__package__),
+        description="Benchmark on generated settings files; fail on a regression"
+        " from a baseline.",
+    )
+    parser.add_argument(
+        "--sizes",
+        help="File sizes, e.g., 1KB 1MB 50MB",
+        nargs="+",
+        default=["1KB", "100KB", "1MB"],
+    )
+    parser.add_argument(
+        "--shapes", help="File shapes", nargs="+", choices=SHAPES, default=SHAPES
+    )
+    parser.add_argument(
+        "--cases", help="Cases to time", nargs="+", choices=CASES, default=CASES
+    )
+    parser.add_argument(
+        "--repeat", help="Timings taken of each case", type=int, default=5
+    )
+    parser.add_argument("-o", "--outfile", help="Save the results as JSON")
+    parser.add_argument(
+        "--baseline", help="Results JSON to compare with; exit 1 on a regression"
+    )
+    parser.add_argument(
+        "--threshold",
+        help="Tolerated slowdown from the baseline (default: 0.2, i.e., 20%%)",
+        type=float,
+        default=0.2,
+    )
+    parser.add_argument(
+        "--tmpdir", help="Directory for the generated files (default: a new one)"
+    )
+    return parser
+
+
+def main(argv=None):
+    args = _build_parser().parse_args(argv)
+    results = run(
+        sizes=args.sizes,
+        shapes=args.shapes,
+        cases=args.cases,
+        repeat=args.repeat,
+        tmpdir=args.tmpdir,
+    )
+
+    for key, stats in results["results"].items():
+        stdout.write(
+            "{key:<40} {min:>10.6f}s min {median:>10.6f}s median\n".format(
+                key=key, **stats
+            )
+        )
+    if args.outfile:
+        with open(args.outfile, "wt") as f:
+            dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "rt") as f:
+            regressions = compare(load(f), results, threshold=args.threshold)
+        for key, old, new in regressions:
+            stdout.write(
+                "REGRESSION {}: {:.6f}s -> {:.6f}s (+{:.0%})\n".format(
+                    key, old, new, new / old - 1
+                )
+            )
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
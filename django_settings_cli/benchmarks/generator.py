@@ -0,0 +1,138 @@
+"""
+Synthetic settings files, of a given size and shape, for benchmarking
+"""
+
+import re
+from itertools import count
+
+SHAPES = ("deep_dicts", "long_lists", "many_assignments", "many_subscripts", "mixed")
+
+_SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?)i?B?\s*$", re.IGNORECASE)
+
+_HEADER = """# -*- coding: utf-8 -*-
+# Generated benchmark settings
+
+import os
+
+DEBUG = False
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": "bench",
+        "USER": "bench",
+        "HOST": "localhost",
+        "PORT": 5432,
+    }
+}
+
+CONFIG = {}
+"""
+
+
+def parse_size(size):
+    """
+    :param size: Size in bytes, or with a unit, e.g., `"1KB"`, `"50MB"`
+    :type size: ```Union[int, str]```
+
+    :return: Size in bytes
+    :rtype: ```int```
+    """
+    if isinstance(size, int):
+        return size
+    match = _SIZE.match(size)
+    if match is None:
+        raise ValueError("Invalid size: {!r}".format(size))
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** " KMG".index(unit.upper() or " "))
+
+
+def _deep_dict(i, depth=4, breadth=3):
+    def node(level, path):
+        if level == depth:
+            return '"leaf-{}"'.format(path) if level & 1 else str(len(path))
+        indent = "    " * (level + 1)
+        return "{{\n{items}\n{close}}}".format(
+            items="\n".join(
+                '{indent}"k{b}": {value},'.format(
+                    indent=indent, b=b, value=node(level + 1, "{}{}".format(path, b))
+                )
+                for b in range(breadth)
+            ),
+            close="    " * level,
+        )
+
+    return "DEEP_{} = {}\n".format(i, node(0, "")), ".DEEP_{}.k0.k1.k2".format(i)
+
+
+def _long_list(i, length=200):
+    return (
+        "LIST_{} = [\n{}]\n".format(
+            i,
+            "".join(
+                '    "item-{}",\n'.format(n) if n & 1 else "    {},\n".format(n)
+                for n in range(length)
+            ),
+        ),
+        ".LIST_{}".format(i),
+    )
+
+
+def _assignment(i):
+    value = (
+        '"value-{}"'.format(i),
+        str(i),
+        "True",
+        "None",
+        '("a-{}", "b")'.format(i),
+        'os.environ.get("SETTING_{}", "default")'.format(i),
+    )[i % 6]
+    return "SETTING_{} = {}\n".format(i, value), ".SETTING_{}".format(i)
+
+
+def _subscript(i):
+    return (
+        'CONFIG["key_{i}"] = {{"enabled": {enabled}, "limit": {i}, "name": "k{i}"}}\n'.format(
+            i=i, enabled=bool(i & 1)
+        ),
+        ".CONFIG.key_{}".format(i),
+    )
+
+
+_GENERATORS = {
+    "deep_dicts": (_deep_dict,),
+    "long_lists": (_long_list,),
+    "many_assignments": (_assignment,),
+    "many_subscripts": (_subscript,),
+    "mixed": (_deep_dict, _long_list, _assignment, _subscript),
+}
+
+
+def generate_settings(size, shape="mixed"):
+    """
+    Generate a settings file of at least `size` bytes
+
+    :param size: Size in bytes, or with a unit, e.g., `"50MB"`
+    :type size: ```Union[int, str]```
+
+    :param shape: One of `SHAPES`
+    :type shape: ```str```
+
+    :return: Python source, and queries for its first and last generated settings,
+      besides `.DEBUG` and `.DATABASES.default`
+    :rtype: ```Tuple[str, List[str]]```
+    """
+    size = parse_size(size)
+    generators = _GENERATORS[shape]
+    chunks, length, first = [_HEADER], len(_HEADER), None
+    for i in count():
+        source, last = generators[i % len(generators)](i)
+        chunks.append(source)
+        length += len(source)
+        first = first or last
+        if length >= size:
+            break
+    return "".join(chunks), [".DEBUG", ".DATABASES.default", first, last]
+
+
+__all__ = ["SHAPES", "generate_settings", "parse_size"]
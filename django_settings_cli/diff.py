@@ -0,0 +1,351 @@
+"""
+Structural diff of settings files: each is evaluated statically, then its settings—
+every name a star import would bind, but modules, functions and classes, as a snapshot
+stores—are fingerprinted, Merkle-style, so that every subtree carries the hash of its
+contents. Subtrees with equal fingerprints are skipped without being walked.
+
+Fingerprint trees are self-contained—they hold their leaves—so, when cached, a repeat
+diff against an unchanged baseline, with unchanged environment variables read, neither
+parses nor evaluates it.
+"""
+
+from argparse import ArgumentParser
+from collections import OrderedDict, namedtuple
+from hashlib import sha1
+from os import environ, path
+
+from django_settings_cli.parser import _cli_env, _read
+from django_settings_cli.parser.query import is_extended
+from django_settings_cli.profiling import phase
+from django_settings_cli.utils import env_digest, stream_json_lines, string_types
+
+__desc__ = "Compare settings files, reporting added, removed and changed paths"
+
+# `kind` is "dict", "list", "set" or "leaf"; `value` is an `OrderedDict`, or a `list`,
+# of the child `Node`s—those of a set in order of their digests—or the leaf's value
+Node = namedtuple("Node", ("digest", "kind", "value"))
+
+Change = namedtuple("Change", ("op", "path", "old", "new"))
+
+
+def _leaf_digest(value):
+    return sha1("{}:{!r}".format(type(value).__name__, value).encode("utf-8")).digest()
+
+
+def fingerprint(value):
+    """
+    Fingerprint `value` and, recursively, each of its subtrees
+
+    :param value: Python value, e.g., of `to_python`
+    :type value: ```Any```
+
+    :return: Its fingerprint tree; dicts are fingerprinted regardless of key order,
+      and sets regardless of their—hash seeded—iteration order
+    :rtype: ```Node```
+    """
+    if isinstance(value, dict):
+        children = OrderedDict(
+            (key, fingerprint(child)) for key, child in value.items()
+        )
+        return Node(
+            sha1(
+                b"dict"
+                + b"".join(
+                    sorted(
+                        _leaf_digest(key) + child.digest
+                        for key, child in children.items()
+                    )
+                )
+            ).digest(),
+            "dict",
+            children,
+        )
+    elif isinstance(value, (list, tuple)):
+        children = [fingerprint(child) for child in value]
+        return Node(
+            sha1(b"list" + b"".join(child.digest for child in children)).digest(),
+            "list",
+            children,
+        )
+    elif isinstance(value, (set, frozenset)):
+        children = sorted(
+            (fingerprint(child) for child in value), key=lambda child: child.digest
+        )
+        return Node(
+            sha1(b"set" + b"".join(child.digest for child in children)).digest(),
+            "set",
+            children,
+        )
+    return Node(_leaf_digest(value), "leaf", value)
+
+
+def to_value(node):
+    """
+    The value fingerprinted by `node`
+
+    :param node: Fingerprint tree
+    :type node: ```Node```
+
+    :rtype: ```Any```
+    """
+    if node.kind == "dict":
+        return OrderedDict((key, to_value(child)) for key, child in node.value.items())
+    elif node.kind in ("list", "set"):
+        return [to_value(child) for child in node.value]
+    return node.value
+
+
+def format_path(keys):
+    """
+    The query selecting `keys`, e.g., `.INSTALLED_APPS[0]` or `.LOGGING['a.b']`
+
+    :param keys: Keys, from the top-level name
+    :type keys: ```Tuple[Union[str, int], ...]```
+
+    :rtype: ```str```
+    """
+    parts = []
+    for key in keys:
+        if isinstance(key, int) and not isinstance(key, bool):
+            parts.append("[{:d}]".format(key))
+        elif (
+            isinstance(key, string_types)
+            and key
+            and not is_extended(key)
+            and "." not in key
+        ):
+            parts.append(".{}".format(key))
+        else:
+            parts.append("[{!r}]".format(key))
+    return "".join(parts)
+
+
+def diff(old, new, keys=()):
+    """
+    Compare two fingerprint trees
+
+    :param old: Fingerprint tree compared against
+    :type old: ```Node```
+
+    :param new: Fingerprint tree compared
+    :type new: ```Node```
+
+    :param keys: Keys of `old` and `new`, from the top-level name
+    :type keys: ```tuple```
+
+    :return: The added, removed and changed subtrees, in order of `old` then `new`; a
+      set, having no paths to its elements, changes as a whole
+    :rtype: ```Iterator[Change]```
+    """
+    if old.digest == new.digest:
+        return
+    elif old.kind == new.kind == "dict":
+        for key, child in old.value.items():
+            if key in new.value:
+                for change in diff(child, new.value[key], keys + (key,)):
+                    yield change
+            else:
+                yield Change("removed", keys + (key,), to_value(child), None)
+        for key, child in new.value.items():
+            if key not in old.value:
+                yield Change("added", keys + (key,), None, to_value(child))
+    elif old.kind == new.kind == "list":
+        for i, (old_child, new_child) in enumerate(zip(old.value, new.value)):
+            for change in diff(old_child, new_child, keys + (i,)):
+                yield change
+        for i in range(len(new.value), len(old.value)):
+            yield Change("removed", keys + (i,), to_value(old.value[i]), None)
+        for i in range(len(old.value), len(new.value)):
+            yield Change("added", keys + (i,), None, to_value(new.value[i]))
+    else:
+        yield Change("changed", keys, to_value(old), to_value(new))
+
+
+def _fresh(cached, env):
+    """
+    Whether the `cached` tree was built from unchanged imports, with the values in
+    `env` of the environment variables read
+    """
+    from django_settings_cli.parser.cache import _stat_key
+
+    if "env_names" not in cached or cached.get("env") != env_digest(
+        env, cached["env_names"]
+    ):
+        return False
+    try:
+        return all(
+            _stat_key(filename) == stat_key
+            for filename, stat_key in cached["stat_keys"].items()
+        )
+    except OSError:
+        return False
+
+
+def file_fingerprint(filename, env=None, cache=None):
+    """
+    Evaluate the settings of `filename` and fingerprint them
+
+    :param filename: Settings filename
+    :type filename: ```str```
+
+    :param env: Environment for the evaluated `os.environ`; default the process's
+    :type env: ```Optional[Mapping[str, str]]```
+
+    :param cache: Cache of fingerprint trees; valid while `filename`, everything it
+      imports and the variables of `env` it reads are unchanged
+    :type cache: ```Optional[FileCache]```
+
+    :return: Fingerprint tree of the settings, by name
+    :rtype: ```Node```
+    """
+    from django_settings_cli.parser.evaluator import (
+        modules_cache,
+        setting_names,
+        to_python,
+    )
+
+    env = dict(environ if env is None else env)
+    if cache is not None:
+        with phase("cache.get"):
+            cached = cache.get(filename)
+        if cached is not None and _fresh(cached, env):
+            return cached["tree"]
+
+    with phase("evaluate"):
+        module = modules_cache.get(filename, env)
+    with phase("fingerprint"):
+        tree = fingerprint(
+            OrderedDict(
+                (name, to_python(module.symbols[name], keep_sets=True))
+                for name in setting_names(module.symbols)
+            )
+        )
+
+    if cache is not None:
+        # Read, and hashed, as `FileCache` revalidates it
+        fstr = _read(filename)[1]
+        with phase("cache.set"):
+            cache.set(
+                filename,
+                fstr,
+                {
+                    "env_names": module.env_names,
+                    "env": module.env_digest,
+                    "stat_keys": dict(module.stat_keys),
+                    "tree": tree,
+                },
+            )
+    return tree
+
+
+def diff_files(baseline, others, env=None, cache=None):
+    """
+    Compare each of `others` against `baseline`
+
+    :param baseline: Settings filename compared against
+    :type baseline: ```str```
+
+    :param others: Settings filenames compared
+    :type others: ```Iterable[str]```
+
+    :param env: Environment for the evaluated `os.environ`; default the process's
+    :type env: ```Optional[Mapping[str, str]]```
+
+    :param cache: Cache of fingerprint trees
+    :type cache: ```Optional[FileCache]```
+
+    :return: `OrderedDict`s of path, op, query, and old and new values, of each change
+    :rtype: ```Iterator[OrderedDict]```
+    """
+    old = file_fingerprint(baseline, env=env, cache=cache)
+    for other in others:
+        new = file_fingerprint(other, env=env, cache=cache)
+        with phase("diff"):
+            changes = list(diff(old, new))
+        for change in changes:
+            record = OrderedDict(
+                (
+                    ("path", other),
+                    ("op", change.op),
+                    ("query", format_path(change.path)),
+                )
+            )
+            if change.op != "added":
+                record["old"] = change.old
+            if change.op != "removed":
+                record["new"] = change.new
+            yield record
+
+
+def fingerprint_cache():
+    """
+    The cache of fingerprint trees, beside that of `parse` in
+    `DJANGO_SETTING_CLI_CACHE_DIR`
+
+    :return: The cache, or `None` when no cache directory is configured
+    :rtype: ```Optional[FileCache]```
+    """
+    from django_settings_cli.parser.cache import FileCache
+
+    cache = FileCache.from_environ()
+    if cache is None:
+        return None
+    return FileCache(path.join(cache.directory, "fingerprints"), cache.max_size)
+
+
+def _parser_cli_args(parser=None):
+    parser = ArgumentParser(description=__desc__) if parser is None else parser
+    parser.add_argument("baseline", help="Settings file compared against")
+    parser.add_argument("others", help="Settings files compared", nargs="+")
+    parser.add_argument("-o", "--outfile", help="Outfile")
+    parser.add_argument(
+        "-e",
+        "--env",
+        help="NAME=VALUE seen by the settings' os.environ when evaluated statically;"
+        " repeat for many",
+        dest="env_vars",
+        action="append",
+    )
+    parser.add_argument(
+        "--clean-env",
+        help="Evaluate with only the --env variables, not this process's environment",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--no-cache",
+        help="Bypass the fingerprint cache enabled by DJANGO_SETTING_CLI_CACHE_DIR",
+        action="store_true",
+    )
+    return parser
+
+
+def diff_with_output(
+    baseline, others, outfile=None, env_vars=None, clean_env=False, no_cache=False
+):
+    """
+    Stream JSON Lines of path, op (added, removed or changed), query, and old and new
+    values, of each change from `baseline` to each of `others`
+    """
+    stream_json_lines(
+        outfile,
+        diff_files(
+            baseline,
+            others,
+            env=_cli_env(env_vars, clean_env),
+            cache=None if no_cache else fingerprint_cache(),
+        ),
+    )
+
+
+__all__ = [
+    "Change",
+    "Node",
+    "diff",
+    "diff_files",
+    "diff_with_output",
+    "file_fingerprint",
+    "fingerprint",
+    "fingerprint_cache",
+    "format_path",
+    "to_value",
+]
@@ -0,0 +1,155 @@
+"""
+Library API: a settings file parsed once, then queried any number of times—from any
+number of threads.
+
+    >>> document = SettingsDocument.from_file("settings.py")
+    >>> document.query(".DATABASES.default.NAME")
+    'taiga'
+"""
+
+import ast
+from functools import partial
+from threading import Lock
+
+from django_settings_cli.parser import (
+    _STAR_IMPORT,
+    AssignQuerierVisitor,
+    _Dynamic,
+    _evaluated,
+    _query_results,
+    _read,
+    _resolve,
+    _returning_exceptions,
+)
+from django_settings_cli.parser.query import compile_query, is_extended
+from django_settings_cli.profiling import phase
+from django_settings_cli.utils import string_types
+
+
+class SettingsDocument(object):
+    """
+    A settings file, parsed and indexed once, answering concurrent `query` calls.
+
+    All its state—source, AST, index of assignments and, once needed, the statically
+    evaluated symbols—is its own, so is released with it; only the `modules` cache of
+    star-imported settings modules may be shared, when given. Every query returns new
+    values, which callers may mutate freely.
+
+    :param source: Python source
+    :type source: ```str```
+
+    :param filename: Filename, for errors and to resolve relative imports
+    :type filename: ```Optional[str]```
+
+    :param env: Environment for the evaluated `os.environ`; default the process's
+    :type env: ```Optional[Mapping[str, str]]```
+
+    :param modules: Cache of the star-imported settings modules; default its own
+    :type modules: ```Optional[ModuleCache]```
+    """
+
+    def __init__(self, source, filename=None, env=None, modules=None):
+        if "\r" in source:
+            source = source.replace("\r\n", "\n").replace("\r", "\n")
+        self.source = source
+        self.filename = filename
+        self.env = env
+
+        with phase("ast.parse"):
+            self._tree = ast.parse(source, filename=filename or "<unknown>")
+        visitor = AssignQuerierVisitor()
+        with phase("visit"):
+            visitor.visit(self._tree)
+        self._assignments = visitor.assignments
+        if _STAR_IMPORT.search(source):
+            self._assignments["*"] = [((), _Dynamic)]
+
+        self._modules = modules
+        self._symbols = None
+        self._lock = Lock()
+
+    @classmethod
+    def from_file(cls, infile, env=None, modules=None):
+        """
+        :param infile: Input filename or file-like object
+        :type infile: ```Union[str, TextIO]```
+
+        :rtype: ```SettingsDocument```
+        """
+        filename, source = _read(infile)
+        return cls(
+            source,
+            filename=filename if isinstance(infile, string_types) else None,
+            env=env,
+            modules=modules,
+        )
+
+    @property
+    def names(self):
+        """
+        :return: The top-level names assigned, in source order
+        :rtype: ```Tuple[str, ...]```
+        """
+        return tuple(name for name in self._assignments if name != "*")
+
+    def _evaluate(self, keys):
+        """The statically evaluated value at `keys`; `_UNKNOWN` if it cannot be"""
+        from django_settings_cli.parser.evaluator import ModuleCache, StaticEvaluator
+
+        symbols = self._symbols
+        if symbols is None:
+            with self._lock:
+                if self._symbols is None:
+                    if self._modules is None:
+                        self._modules = ModuleCache()
+                    with phase("evaluate"):
+                        self._symbols = StaticEvaluator(
+                            env=self.env, filename=self.filename, modules=self._modules
+                        ).run(self._tree)
+                symbols = self._symbols
+        return _evaluated(symbols, keys)
+
+    def query(self, query=".", format_str=None, no_eval=False, return_exceptions=False):
+        """
+        Query the settings
+
+        :param query: Query string, e.g., ".DATABASES.default"; or a list of them
+        :type query: ```Union[str, List[str]]```
+
+        :param format_str: Format string, applied to each resolved value
+        :type format_str: ```Optional[str]```
+
+        :param no_eval: Only substitute names in the format str, not expressions
+        :type no_eval: ```bool```
+
+        :param return_exceptions: Return, rather than raise, the error of a failed query
+        :type return_exceptions: ```bool```
+
+        :return: Resolved value; or, when `query` is a list, an `OrderedDict` keyed by
+          query
+        :rtype: ```Union[Any, OrderedDict]```
+        """
+        resolve = partial(
+            _resolve,
+            assignments=self._assignments,
+            fstr=self.source,
+            evaluate=self._evaluate,
+        )
+        if return_exceptions:
+            resolve = _returning_exceptions(resolve)
+        results = [
+            resolve(compile_query(q) if is_extended(q) else q.split("."))
+            for q in ((query,) if isinstance(query, string_types) else query)
+        ]
+        return _query_results(query, results, format_str, no_eval, return_exceptions)
+
+    def __contains__(self, name):
+        return name != "*" and name in self._assignments
+
+    def __repr__(self):
+        return "{}(filename={!r}, names={})".format(
+            type(self).__name__, self.filename, len(self.names)
+        )
+
+
+__all__ = ["SettingsDocument"]
@@ -1,16 +1,33 @@
-import ast
 from argparse import ArgumentParser
+from collections import OrderedDict
 from enum import Enum
 from sys import stdin, stdout
 
-import astor
-
-from django_settings_cli.utils import _file_or_dash
+from django_settings_cli.emitter.emitter_utils import (
+    apply_edits,
+    literal_source,
+    merge_edits,
+    read_source,
+    upsert_edits,
+    value_source,
+)
+from django_settings_cli.profiling import phase
+from django_settings_cli.utils import (
+    _file_or_dash,
+    stream_json_lines,
+    write_if_changed,
+)
 
 __desc__ = "Django settings.py emitter"
 
 
 class MergeStrategy(Enum):
+    """
+    upsert: replace the value at the query
+    merge_into: deep merge the input into the value; the input wins conflicts
+    merge_from: deep merge the value into the input; the value wins conflicts
+    """
+
     upsert = "upsert"
     merge_into = "merge_into"
     merge_from = "merge_from"
@@ -21,7 +38,7 @@ class MergeStrategy(Enum):
 
 def _parser_cli_args(parser=None):
     parser = ArgumentParser(description=__desc__) if parser is None else parser
-    parser.add_argument("query", help="Query string", default=".")
+    parser.add_argument("query", help="Query string", nargs="?", default=None)
     parser.add_argument(
         "infile",
         help="Input file",
@@ -37,23 +54,191 @@ def _parser_cli_args(parser=None):
         help="Merge strategy",
         type=MergeStrategy,
         choices=tuple(MergeStrategy),
+        default=MergeStrategy.upsert,
+    )
+    parser.add_argument(
+        "-p",
+        "--patch",
+        help="JSON or YAML file mapping queries to values, all applied in one pass",
+        type=lambda x: _file_or_dash(parser, x),
+    )
+    parser.add_argument(
+        "--in-place",
+        help="Write back to the infile (only if changed)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--batch",
+        help="Emit many files in place—directories, globs, filenames or @FILE listing"
+        " them (@- for stdin)—in parallel, streaming JSON Lines of path and status:"
+        " changed, unchanged or failed",
+        nargs="+",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Worker processes for --batch (default: CPU count)",
+        type=int,
+    )
+    parser.add_argument(
+        "--chunk-size",
+        help="Files sent to a --batch worker at a time",
+        type=int,
+        default=8,
     )
     return parser
 
 
-def emit(infile, query, input_s, merge, outfile):
-    keys = query.split(".")
-    tree = astor.parse_file(infile)  # parse_file(infile=infile, keys=keys)
+def query_keys(query):
+    """
+    :param query: Query string, e.g., ".DATABASES.default"
+    :type query: ```str```
+
+    :return: Its keys, e.g., `("DATABASES", "default")`
+    :rtype: ```tuple```
+    """
+    return tuple(query.split(".")[1:] if query.startswith(".") else query.split("."))
+
+
+def load_patch(patch_file):
+    """
+    Load a patch: a mapping of queries to values, in JSON—for *.json—or else YAML
+
+    :param patch_file: Filename
+    :type patch_file: ```str```
+
+    :return: Query to value, in file order
+    :rtype: ```OrderedDict```
+    """
+    with open(patch_file, "rt") as f:
+        if patch_file.endswith(".json"):
+            from json import load
+
+            patch = load(f, object_pairs_hook=OrderedDict)
+        else:
+            import yaml
 
-    # print(astor.dump_tree(tree))
+            patch = yaml.safe_load(f)
+    if not isinstance(patch, dict):
+        raise TypeError(
+            "Expected a mapping of queries to values in {}".format(patch_file)
+        )
+    return OrderedDict(patch)
 
-    if merge == MergeStrategy.upsert:
-        # TODO: Traverse and remove existent node(s) that match
-        tree.body.append(ast.parse(input_s, filename="input_s"))
-    else:
-        raise NotImplementedError(merge)
 
-    stream = stdout if outfile is None else open(outfile, "wt")
-    stream.write(astor.to_source(tree))
+def emit_source(infile, query, input_s, merge, patch=None):
+    """
+    Emit the Django settings file, modified with `input_s`—and/or with `patch`
+
+    :param infile: Input filename or file-like object
+    :type infile: ```Union[str, TextIOWrapper, StringIO]```
+
+    :param query: Query string, e.g., ".DATABASES.default"
+    :type query: ```Optional[str]```
+
+    :param input_s: Input to merge: a Python expression, or an assignment statement
+    :type input_s: ```Optional[str]```
+
+    :param merge: Merge strategy
+    :type merge: ```MergeStrategy```
+
+    :param patch: Query to value, e.g., `{".DATABASES.default.HOST": "db"}`; a query
+      supersedes those within it, e.g., `.A` supersedes `.A.x`, whatever their order—
+      or, when merging, has them merged into its value
+    :type patch: ```Optional[dict]```
+
+    :return: Python source
+    :rtype: ```str```
+    """
+    return _emit_source(infile, query, input_s, merge, patch)[0]
+
+
+def _emit_source(infile, query, input_s, merge, patch=None):
+    changes = (
+        []
+        if patch is None
+        else [(query_keys(q), literal_source(value)) for q, value in patch.items()]
+    )
+    if input_s is not None:
+        changes.append((query_keys(query or "."), value_source(input_s)))
+    if not changes:
+        raise ValueError("Nothing to emit; give an input or a patch")
+    elif not all(keys for keys, _ in changes):
+        raise ValueError("Cannot emit to the root query '.'")
+
+    with phase("read"):
+        source, encoding = read_source(infile)
+
+    with phase("edit"):
+        if merge == MergeStrategy.upsert:
+            # One parse for all changes; replace only the spans of existing values
+            edits = upsert_edits(source, changes)
+        else:
+            # Deep merge: `merge_into` keeps the input on conflicts, `merge_from` the
+            # file
+            edits = merge_edits(
+                source, changes, prefer_input=merge == MergeStrategy.merge_into
+            )
+
+    with phase("apply"):
+        return apply_edits(source, edits), encoding
+
+
+def emit(
+    infile,
+    query,
+    input_s,
+    merge,
+    outfile,
+    patch=None,
+    in_place=False,
+    batch=None,
+    jobs=None,
+    chunk_size=8,
+):
+    """
+    Emit the Django settings file, modified with `input_s` and/or with the patch file
+    `patch`, to `outfile`—written atomically, and only if changed—else stdout.
+    With `batch`, emit each of those files in place, reporting to `outfile`.
+
+    :return: Whether the output was written
+    :rtype: ```bool```
+    """
+    if batch:
+        from django_settings_cli.emitter.batch import emit_batch
+
+        stream_json_lines(
+            outfile,
+            emit_batch(
+                paths=batch,
+                query=query,
+                input_s=input_s,
+                merge=merge,
+                patch=None if patch is None else load_patch(patch),
+                jobs=jobs,
+                chunk_size=chunk_size,
+            ),
+        )
+        return True
+
+    if query is not None and not query.startswith(".") and infile is stdin:
+        # `emit --patch PATCH settings.py`
+        infile, query = query, None
+    if in_place:
+        if infile is stdin:
+            raise ValueError("--in-place needs an infile")
+        outfile = infile
+
+    source, encoding = _emit_source(
+        infile=infile,
+        query=query,
+        input_s=input_s,
+        merge=merge,
+        patch=None if patch is None else load_patch(patch),
+    )
 
-    # stream_tree_as_json(outfile=outfile, r=tree, raw_strings=None)
+    with phase("write"):
+        if outfile is None:
+            stdout.write(source)
+            return True
+        return write_if_changed(outfile, source, encoding)
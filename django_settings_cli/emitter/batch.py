@@ -0,0 +1,84 @@
+"""
+Fleet mode: apply the same change to many settings files across a pool of worker
+processes, each file rewritten atomically and only if changed.
+"""
+
+from collections import OrderedDict
+from functools import partial
+from multiprocessing import Pool, cpu_count
+
+from django_settings_cli.emitter import _emit_source
+from django_settings_cli.utils import expand_paths, write_if_changed
+
+
+def _emit_file(filename, query, input_s, merge, patch):
+    try:
+        source, encoding = _emit_source(
+            infile=filename, query=query, input_s=input_s, merge=merge, patch=patch
+        )
+        status = (
+            "changed" if write_if_changed(filename, source, encoding) else "unchanged"
+        )
+    except Exception as e:
+        return OrderedDict(
+            (
+                ("path", filename),
+                ("status", "failed"),
+                ("error", "{}: {}".format(type(e).__name__, e)),
+            )
+        )
+    return OrderedDict((("path", filename), ("status", status)))
+
+
+def emit_batch(paths, query, input_s, merge, patch=None, jobs=None, chunk_size=8):
+    """
+    Emit every file in place, yielding a record as each file completes (not in input
+    order). A file that fails is reported, and does not stop the others.
+
+    :param paths: Directories, globs, filenames or @FILE lists, as in `expand_paths`
+    :type paths: ```Iterable[str]```
+
+    :param query: Query string, e.g., ".CACHES.default.LOCATION"
+    :type query: ```Optional[str]```
+
+    :param input_s: Input to merge: a Python expression, or an assignment statement
+    :type input_s: ```Optional[str]```
+
+    :param merge: Merge strategy
+    :type merge: ```MergeStrategy```
+
+    :param patch: Query to value, e.g., `{".DATABASES.default.HOST": "db"}`
+    :type patch: ```Optional[dict]```
+
+    :param jobs: Worker processes—bounding the files open at once; `None` for the
+      CPU count, 1 to run in-process
+    :type jobs: ```Optional[int]```
+
+    :param chunk_size: Files sent to a worker at a time
+    :type chunk_size: ```int```
+
+    :return: `OrderedDict`s of path and status—"changed", "unchanged" or "failed",
+      with its error—per file
+    :rtype: ```Iterator[OrderedDict]```
+    """
+    emit_file = partial(
+        _emit_file, query=query, input_s=input_s, merge=merge, patch=patch
+    )
+    filenames = expand_paths(paths)
+    jobs = jobs or cpu_count()
+
+    if jobs == 1:
+        for filename in filenames:
+            yield emit_file(filename)
+        return
+
+    pool = Pool(jobs)
+    try:
+        for record in pool.imap_unordered(emit_file, filenames, chunk_size):
+            yield record
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+__all__ = ["emit_batch"]
@@ -1,47 +1,637 @@
+"""
+Source-preserving edits: locate assignments by their line and column offsets, and
+splice replacements into exactly those spans, leaving every other byte untouched.
+"""
+
 import ast
-import fileinput
+import re
+from collections import OrderedDict, namedtuple
+from io import open as io_open
 from os import environ
-from sys import modules, version
+from sys import modules
+from tokenize import detect_encoding
 
 from django_settings_cli import get_logger
-from django_settings_cli.parser import AssignQuerierVisitor
-
-if version[0] == "2":
-    try:
-        from cStringIO import StringIO
-    except ImportError:
-        from StringIO import StringIO
-else:
-    from io import StringIO, TextIOWrapper
+from django_settings_cli.parser import AssignQuerierVisitor, _nameToLevel
+from django_settings_cli.parser.parser_utils import get_value
+from django_settings_cli.parser.scanner import find_statement_spans
+from django_settings_cli.utils import string_types
 
 log = get_logger(modules[__name__].__name__)
 log.setLevel(_nameToLevel[environ.get("DJANGO_SETTING_CLI_LOG_LEVEL", "INFO")])
 
+_NEWLINE_RE = re.compile(r"\r\n?|\n")
+
+Edit = namedtuple("Edit", ("start", "end", "text"))
+
+
+def read_source(infile):
+    """
+    Read Python source, exactly—newlines untranslated—with its PEP 263 encoding
+
+    :param infile: Input filename or file-like object
+    :type infile: ```Union[str, TextIOWrapper, StringIO]```
+
+    :return: Source, and its encoding
+    :rtype: ```Tuple[str, str]```
+    """
+    if not isinstance(infile, string_types):
+        return infile.read(), "utf-8"
+    with open(infile, "rb") as f:
+        encoding, _ = detect_encoding(f.readline)
+    with io_open(infile, "rt", encoding=encoding, newline="") as f:
+        return f.read(), encoding
+
+
+class Locator(object):
+    """
+    Convert an AST node's (line, UTF-8 byte column) positions into offsets of the
+    parsed `text`—itself at offset `base` of the whole source.
+    """
+
+    def __init__(self, text, base=0):
+        self.text = text
+        self.base = base
+        self._line_starts = None
+
+    def offset(self, lineno, col_offset):
+        if self._line_starts is None:
+            self._line_starts = [0] + [m.end() for m in _NEWLINE_RE.finditer(self.text)]
+        line_start = self._line_starts[lineno - 1]
+        line = self.text[line_start : line_start + col_offset]
+        if any(ord(ch) > 127 for ch in line):
+            # Columns count UTF-8 bytes, offsets count characters
+            line = line.encode("utf-8")[:col_offset].decode("utf-8", "ignore")
+        return self.base + line_start + len(line)
+
+    def span(self, node):
+        """
+        :return: `(start, end)` offsets of `node` in the whole source
+        :rtype: ```Tuple[int, int]```
+        """
+        return (
+            self.offset(node.lineno, node.col_offset),
+            self.offset(node.end_lineno, node.end_col_offset),
+        )
 
-def parse_file(infile, keys):
-    visitor = AssignQuerierVisitor()
-    visitor.filter_value = (keys[1], keys[2]) if len(keys) > 2 else (keys[1],)
 
-    irregular_fh = isinstance(infile, TextIOWrapper) or isinstance(infile, StringIO)
+def find_assignments(source, names):
+    """
+    Find the assignments to, and subscript assignments into, `names`—parsing only
+    those statements when the scanner can isolate them, and the whole source otherwise.
+
+    :param source: Python source
+    :type source: ```str```
+
+    :param names: Top-level names
+    :type names: ```Iterable[str]```
+
+    :return: Name to the `(subkey, node, locator)` of each of its assignments, in
+      source order, as in `AssignQuerierVisitor.assignments`
+    :rtype: ```Dict[str, List[Tuple[tuple, ast.Assign, Locator]]]```
+    """
+    names = frozenset(names)
+    spans = find_statement_spans(source, names)
+    assignments = {}
+    for start, end in [(0, len(source))] if spans is None else spans:
+        locator = Locator(source[start:end], start)
+        visitor = AssignQuerierVisitor([(name,) for name in names])
+        visitor.visit(ast.parse(locator.text))
+        for name, pairs in visitor.assignments.items():
+            assignments.setdefault(name, []).extend(
+                (subkey, node, locator)
+                for subkey, node in pairs
+                # Edits target the assigned values, not the `+=` augmenting them
+                if isinstance(node, ast.Assign)
+            )
+    return assignments
 
-    fstr = "".join(
-        line.replace("\r\n", "\n").replace("\r", "\n")
-        for line in (infile if irregular_fh else fileinput.input(infile))
+
+def newline_of(source):
+    """The newline used by `source`, from its first line"""
+    match = _NEWLINE_RE.search(source)
+    return "\n" if match is None else match.group()
+
+
+def _is_literal_dict(node):
+    return isinstance(node, ast.Dict) and all(
+        isinstance(k, (ast.Str, ast.Num, ast.NameConstant)) for k in node.keys
     )
-    if infile == "-" or irregular_fh:
-        infile = "stdin"
 
-    if keys == ["", ""]:
-        return fstr
 
-    return ast.parse(fstr, filename=infile)
+def _items_sources(items):
+    """`["k0: v0", "k1: {k2: v2}"]` sources of `OrderedDict` `items`, nested for subtrees"""
+    return [
+        "{!r}: {}".format(
+            key,
+            (
+                value
+                if isinstance(value, string_types)
+                else "{{{}}}".format(", ".join(_items_sources(value)))
+            ),
+        )
+        for key, value in items.items()
+    ]
+
 
+def _insert_edit(source, node, locator, last_start, last_end, items_srcs):
+    start, end = locator.span(node)
+    close = end - 1
+    if last_start is None:
+        return Edit(close, close, ", ".join(items_srcs))
+
+    last_item_start = locator.offset(last_start.lineno, last_start.col_offset)
+    last_end = locator.offset(last_end.end_lineno, last_end.end_col_offset)
+    between = source[last_end:close]
+    comma = between.find(",") if between.lstrip().startswith(",") else -1
+
+    if "\n" in between or "\r" in between:
+        line_start = max(
+            source.rfind("\n", 0, last_item_start),
+            source.rfind("\r", 0, last_item_start),
+        )
+        indent = source[line_start + 1 : last_item_start]
+        if indent.strip():
+            indent = ""
+        separator = "{}{}".format(newline_of(source), indent)
+        items_src = ",{}".format(separator).join(items_srcs)
+        if comma == -1:
+            return Edit(last_end, last_end, ",{}{}".format(separator, items_src))
+        insert_at = last_end + comma + 1
+        return Edit(insert_at, insert_at, "{}{},".format(separator, items_src))
+
+    items_src = ", ".join(items_srcs)
+    if comma == -1:
+        return Edit(last_end, last_end, ", {}".format(items_src))
+    insert_at = last_end + comma + 1
+    return Edit(insert_at, insert_at, " {}".format(items_src))
+
+
+def dict_insert_edit(source, node, locator, items_srcs):
+    """
+    Edit inserting the items `items_srcs`—e.g., `["'k': 1", "'j': 2"]`—at the end of
+    the dict literal `node`, following its layout: one item per line, or all on one line
+
+    :rtype: ```Edit```
     """
+    return _insert_edit(
+        source,
+        node,
+        locator,
+        node.keys[-1] if node.keys else None,
+        node.values[-1] if node.values else None,
+        items_srcs,
+    )
 
-    visitor.visit()
 
-    log.debug('visitor.candidates: {} ;'.format(visitor.candidates))
-    r = reduce(operator.getitem, keys[2:-1],
-               visitor.candidates[1])[keys[-1]] if len(keys) > 2 else visitor.candidates[1]
-    return r
+def sequence_insert_edit(source, node, locator, items_srcs):
     """
+    Edit inserting the elements `items_srcs` at the end of the list, set or
+    parenthesised tuple literal `node`, following its layout, as `dict_insert_edit`
+
+    :rtype: ```Edit```
+    """
+    if not node.elts and isinstance(node, ast.Tuple) and len(items_srcs) == 1:
+        items_srcs = ["{},".format(items_srcs[0])]
+    last = node.elts[-1] if node.elts else None
+    return _insert_edit(source, node, locator, last, last, items_srcs)
+
+
+def append_edit(source, statements):
+    """
+    Edit appending the statements `keys[0][keys[1]]… = value_src` to the end of `source`
+
+    :param source: Python source
+    :type source: ```str```
+
+    :param statements: `(keys, value_src)` of each statement
+    :type statements: ```Iterable[Tuple[tuple, str]]```
+
+    :rtype: ```Edit```
+    """
+    newline = newline_of(source)
+    prefix = newline if source and not source.endswith(("\n", "\r")) else ""
+    return Edit(
+        len(source),
+        len(source),
+        prefix
+        + "".join(
+            "{name}{subscripts} = {value}{newline}".format(
+                name=keys[0],
+                subscripts="".join("[{!r}]".format(key) for key in keys[1:]),
+                value=value_src,
+                newline=newline,
+            )
+            for keys, value_src in statements
+        ),
+    )
+
+
+def _dict_index(node, indexes):
+    """
+    Key to value node of the dict literal `node`—later duplicates win, as in Python—
+    built once per node, so that lookups do not rescan `node.keys`
+    """
+    index = indexes.get(id(node))
+    if index is None:
+        index = indexes[id(node)] = {
+            get_value(k): v for k, v in zip(node.keys, node.values)
+        }
+    return index
+
+
+def _locate(assignments, keys, indexes):
+    """
+    Resolve `keys` through the last assignment matching them
+
+    :return: The value node at `keys`, its `Locator`, and `()`; else the deepest
+      enclosing dict literal, its `Locator`, and the keys missing from it; else `None`
+      (append a new statement), `None`, and `keys`
+    :rtype: ```Tuple[Optional[ast.AST], Optional[Locator], tuple]```
+    """
+    for subkey, node, locator in reversed(assignments.get(keys[0], ())):
+        if keys[1 : 1 + len(subkey)] == subkey:
+            break
+    else:
+        return None, None, keys
+
+    remaining_keys = keys[1 + len(subkey) :]
+    value = node.value
+    for i, key in enumerate(remaining_keys):
+        if not _is_literal_dict(value):
+            log.debug("upsert: not a dict literal, appending ;")
+            return None, None, keys
+        match = _dict_index(value, indexes).get(key)
+        if match is None:
+            return value, locator, remaining_keys[i:]
+        value = match
+    return value, locator, ()
+
+
+def _is_sequence(node, locator):
+    """A list or set literal, or a tuple literal with parentheses to insert into"""
+    if isinstance(node, ast.Tuple):
+        start, end = locator.span(node)
+        return locator.text[end - locator.base - 1] == ")"
+    return isinstance(node, (ast.List, ast.Set))
+
+
+def _merge_node_edits(
+    source, node, locator, other, other_locator, prefer_other, indexes
+):
+    """
+    Edits deep merging the input `other` into the existing value `node`: dict literals
+    by key, sequences by appending the elements not already present, and otherwise—
+    e.g., scalars, or a dict meeting a list—replacing `node` only if `prefer_other`
+    """
+
+    def segment(n):
+        start, end = other_locator.span(n)
+        return other_locator.text[start:end]
+
+    if _is_literal_dict(node) and _is_literal_dict(other):
+        index = _dict_index(node, indexes)
+        edits, items_srcs = [], []
+        for key, (k, v) in _dict_index_items(other).items():
+            existing = index.get(key)
+            if existing is None:
+                items_srcs.append("{}: {}".format(segment(k), segment(v)))
+            else:
+                edits.extend(
+                    _merge_node_edits(
+                        source,
+                        existing,
+                        locator,
+                        v,
+                        other_locator,
+                        prefer_other,
+                        indexes,
+                    )
+                )
+        if items_srcs:
+            edits.append(dict_insert_edit(source, node, locator, items_srcs))
+        return edits
+    elif _is_sequence(node, locator) and isinstance(
+        other, (ast.List, ast.Tuple, ast.Set)
+    ):
+        # Elements are deduplicated by the hash of their structure
+        seen = set(map(ast.dump, node.elts))
+        items_srcs = []
+        for elt in other.elts:
+            dumped = ast.dump(elt)
+            if dumped not in seen:
+                seen.add(dumped)
+                items_srcs.append(segment(elt))
+        return (
+            [sequence_insert_edit(source, node, locator, items_srcs)]
+            if items_srcs
+            else []
+        )
+    elif prefer_other:
+        return [Edit(*locator.span(node), text=segment(other))]
+    return []
+
+
+def _dict_index_items(node):
+    """Key to `(key node, value node)` of the dict literal `node`, in source order"""
+    return OrderedDict((get_value(k), (k, v)) for k, v in zip(node.keys, node.values))
+
+
+def _insert_or_append(inserts, appends, node, locator, keys, remaining_keys, value_src):
+    if node is None:
+        appends.append((keys, value_src))
+        return
+    # Missing keys of the same dict literal are inserted by one edit
+    items = inserts.setdefault(id(node), (node, locator, OrderedDict()))[2]
+    for missing_key in remaining_keys[:-1]:
+        items = items.setdefault(missing_key, OrderedDict())
+        if isinstance(items, string_types):
+            raise ValueError("Conflicting changes at {}".format(keys))
+    items[remaining_keys[-1]] = value_src
+
+
+def _superseding(patch):
+    """
+    The changes of `patch` not within the keys of another: a change to a key supersedes
+    every change within it—e.g., `.A` those to `.A.x`—whatever their order. Later
+    changes to the same keys win.
+    """
+    patch = OrderedDict(patch)
+    changes = []
+    for keys, value_src in patch.items():
+        if any(keys[:i] in patch for i in range(1, len(keys))):
+            log.debug("patch: {} superseded by a change to its parent ;".format(keys))
+        else:
+            changes.append((keys, value_src))
+    return changes
+
+
+def _query(keys):
+    return ".{}".format(".".join(keys))
+
+
+def _merged(value, other):
+    """`other` deep merged into `value`: dicts by key, `other` winning conflicts"""
+    if not (isinstance(value, dict) and isinstance(other, dict)):
+        return other
+    value = OrderedDict(value)
+    for key, v in other.items():
+        value[key] = _merged(value[key], v) if key in value else v
+    return value
+
+
+def _folded(patch):
+    """
+    The changes of `patch` not within the keys of another, each with the changes within
+    it folded into its value—e.g., `.A.x: 1` into `.A: {'y': 2}` as `.A: {'y': 2,
+    'x': 1}`—deep merged, the more specific winning conflicts, whatever their order.
+    So that a deep merge applies every change, rather than just the outermost.
+
+    :raises ValueError: When a change cannot be folded, e.g., into a value that is not
+      a literal, or not a dict at its keys
+    """
+    patch = OrderedDict(patch)
+    changes = []
+    for keys, value_src in _superseding(patch):
+        within = sorted(
+            (
+                child
+                for child in patch
+                if len(child) > len(keys) and child[: len(keys)] == keys
+            ),
+            key=len,
+        )
+        if within:
+            try:
+                value = ast.literal_eval(value_src)
+                others = [ast.literal_eval(patch[child]) for child in within]
+            except (SyntaxError, ValueError):
+                raise ValueError(
+                    "Cannot merge the changes within {} into its value, as they are"
+                    " not all literals".format(_query(keys))
+                )
+            for child, other in zip(within, others):
+                container, key_path = value, keys
+                for key in child[len(keys) : -1]:
+                    if not isinstance(container, dict):
+                        break
+                    container = container.setdefault(key, OrderedDict())
+                    key_path += (key,)
+                if not isinstance(container, dict):
+                    raise ValueError(
+                        "Cannot merge the change to {} into that to {}, not a dict at"
+                        " {}".format(_query(child), _query(keys), _query(key_path))
+                    )
+                container[child[-1]] = (
+                    _merged(container[child[-1]], other)
+                    if child[-1] in container
+                    else other
+                )
+            value_src = literal_source(value)
+        changes.append((keys, value_src))
+    return changes
+
+
+def _edits(source, patch, merge_edits):
+    patch = _superseding(patch)
+    assignments = find_assignments(source, (keys[0] for keys, _ in patch))
+
+    indexes = {}
+    edits, inserts, appends = [], OrderedDict(), []
+    for keys, value_src in patch:
+        node, locator, remaining_keys = _locate(assignments, keys, indexes)
+        if node is not None and not remaining_keys:
+            edits.extend(merge_edits(node, locator, value_src, indexes))
+        else:
+            _insert_or_append(
+                inserts, appends, node, locator, keys, remaining_keys, value_src
+            )
+
+    edits.extend(
+        dict_insert_edit(source, node, locator, _items_sources(items))
+        for node, locator, items in inserts.values()
+    )
+    if appends:
+        edits.append(append_edit(source, appends))
+    return edits
+
+
+def upsert_edits(source, patch):
+    """
+    Edits setting the value at each query to its new value, from one scan and parse:
+    replacing just the span of its existing value; else inserting it into the nearest
+    enclosing dict literal; else appending a new statement. A change to a key
+    supersedes the changes within it, e.g., `.A` those to `.A.x`.
+
+    :param source: Python source
+    :type source: ```str```
+
+    :param patch: `(keys, value_src)` of each change, e.g.,
+      `[(("DATABASES", "default", "HOST"), "'db'")]`
+    :type patch: ```Iterable[Tuple[tuple, str]]```
+
+    :return: Non-overlapping edits, for `apply_edits`
+    :rtype: ```List[Edit]```
+    """
+    return _edits(
+        source,
+        patch,
+        lambda node, locator, value_src, indexes: [
+            Edit(*locator.span(node), text=value_src)
+        ],
+    )
+
+
+def merge_edits(source, patch, prefer_input):
+    """
+    Edits deep merging each value into the existing value at its query, from one scan
+    and parse. Dict literals merge by key, recursively; list, set and parenthesised
+    tuple literals gain the input's elements not already present, in order. Other
+    conflicts—e.g., two scalars—keep the input if `prefer_input`, else the existing
+    value. Values with no existing value are inserted or appended, as in
+    `upsert_edits`; but changes within another's keys are folded into its value, e.g.,
+    `.A.x: 1` into `.A: {'y': 2}` as `.A: {'y': 2, 'x': 1}`, rather than superseded.
+
+    :param source: Python source
+    :type source: ```str```
+
+    :param patch: `(keys, value_src)` of each change, e.g.,
+      `[(("CACHES",), "{'default': {'TIMEOUT': 60}}")]`
+    :type patch: ```Iterable[Tuple[tuple, str]]```
+
+    :param prefer_input: Whether the input wins conflicts (`merge_into`), or the
+      existing value does (`merge_from`)
+    :type prefer_input: ```bool```
+
+    :return: Non-overlapping edits, for `apply_edits`
+    :rtype: ```List[Edit]```
+
+    :raises ValueError: When a change cannot be folded into that to its parent keys
+    """
+
+    def merge_value_edits(node, locator, value_src, indexes):
+        other_locator = Locator(value_src)
+        return _merge_node_edits(
+            source,
+            node,
+            locator,
+            ast.parse(value_src, mode="eval").body,
+            other_locator,
+            prefer_input,
+            indexes,
+        )
+
+    return _edits(source, _folded(patch), merge_value_edits)
+
+
+def upsert_edit(source, keys, value_src):
+    """
+    Edit setting the value at `keys` to `value_src`, as in `upsert_edits`
+
+    :param source: Python source
+    :type source: ```str```
+
+    :param keys: Query keys, e.g., `("DATABASES", "default", "HOST")`
+    :type keys: ```tuple```
+
+    :param value_src: Python source of the new value
+    :type value_src: ```str```
+
+    :rtype: ```Edit```
+    """
+    return upsert_edits(source, [(keys, value_src)])[0]
+
+
+def apply_edits(source, edits):
+    """
+    Splice `edits` into `source`
+
+    :param source: Python source
+    :type source: ```str```
+
+    :param edits: Non-overlapping edits, in any order
+    :type edits: ```Iterable[Edit]```
+
+    :return: Edited source
+    :rtype: ```str```
+    """
+    pieces = []
+    end = len(source)
+    # Zero-width edits at the same offset are inserted in the order given
+    for _, edit in sorted(
+        enumerate(edits), key=lambda e: (e[1].start, e[1].end, e[0]), reverse=True
+    ):
+        if edit.end > end:
+            raise ValueError("Overlapping edits at offset {}".format(edit.start))
+        pieces.append(source[edit.end : end])
+        pieces.append(edit.text)
+        end = edit.start
+    pieces.append(source[:end])
+    return "".join(reversed(pieces))
+
+
+def literal_source(value):
+    """
+    Python source of the literal `value`—a `dict` subclass, e.g., an `OrderedDict`, as a
+    plain `{…}` display—so that the settings module need not import anything
+
+    :param value: Value, e.g., of a JSON or YAML patch
+    :type value: ```Any```
+
+    :return: Source of the value
+    :rtype: ```str```
+    """
+    if isinstance(value, dict):
+        return "{{{}}}".format(
+            ", ".join(
+                "{}: {}".format(literal_source(k), literal_source(v))
+                for k, v in value.items()
+            )
+        )
+    elif isinstance(value, list):
+        return "[{}]".format(", ".join(map(literal_source, value)))
+    elif isinstance(value, tuple):
+        return "({}{})".format(
+            ", ".join(map(literal_source, value)), "," if len(value) == 1 else ""
+        )
+    return repr(value)
+
+
+def value_source(input_s):
+    """
+    Python source of the value in `input_s`: an expression, or an assignment statement
+
+    :param input_s: Input, e.g., `{"default": {}}` or `DATABASES = {"default": {}}`
+    :type input_s: ```str```
+
+    :return: Source of the value
+    :rtype: ```str```
+    """
+    try:
+        ast.parse(input_s, mode="eval")
+        return input_s.strip()
+    except SyntaxError:
+        tree = ast.parse(input_s, filename="input_s")
+    if len(tree.body) != 1 or not isinstance(tree.body[0], ast.Assign):
+        raise ValueError(
+            "Expected an expression or one assignment: {!r}".format(input_s)
+        )
+    start, end = Locator(input_s).span(tree.body[0].value)
+    return input_s[start:end]
+
+
+__all__ = [
+    "Edit",
+    "Locator",
+    "append_edit",
+    "apply_edits",
+    "dict_insert_edit",
+    "find_assignments",
+    "literal_source",
+    "merge_edits",
+    "read_source",
+    "sequence_insert_edit",
+    "upsert_edit",
+    "upsert_edits",
+    "value_source",
+]
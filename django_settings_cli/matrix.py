@@ -0,0 +1,139 @@
+"""
+Environment matrix: the effective settings of many overlays—dev, staging, prod,
+customers…—of one shared base file. The base is evaluated and converted once; each
+overlay is then evaluated as a copy-on-write layer over it, so memory grows with the
+overrides rather than with the number of overlays times the base.
+"""
+
+import ast
+from argparse import ArgumentParser
+from collections import OrderedDict
+from os import environ
+
+from django_settings_cli.parser import _cli_env, _read
+from django_settings_cli.parser.query import query_values
+from django_settings_cli.profiling import phase
+from django_settings_cli.utils import stream_json_lines
+
+__desc__ = "Render the effective settings of many overlays of one base file"
+
+
+def _settings(symbols, names):
+    from django_settings_cli.parser.evaluator import to_python
+
+    return OrderedDict((name, to_python(symbols[name])) for name in names)
+
+
+def render_matrix(base, overlays, queries=None, env=None):
+    """
+    Render each overlay over `base`
+
+    :param base: Settings filename of the base
+    :type base: ```str```
+
+    :param overlays: Settings filenames of the overlays; each may, or need not, import
+      everything from `base`
+    :type overlays: ```Iterable[str]```
+
+    :param queries: Query strings; default every setting
+    :type queries: ```Optional[List[str]]```
+
+    :param env: Environment for the evaluated `os.environ`; default the process's
+    :type env: ```Optional[Mapping[str, str]]```
+
+    :return: `OrderedDict`s of path and settings—or, per query, of path, query and
+      value—or error, of each overlay, in order. The values of the settings that no
+      overlay binds are shared by every record, so must not be mutated
+    :rtype: ```Iterator[OrderedDict]```
+    """
+    from django_settings_cli.parser.evaluator import OverlayEvaluator, modules_cache
+
+    env = dict(environ if env is None else env)
+    with phase("evaluate"):
+        module = modules_cache.get(base, env)
+    with phase("convert"):
+        # Shared by every cell, for the settings no overlay binds
+        base_settings = _settings(
+            module.symbols, [name for name in module.symbols if name.isupper()]
+        )
+
+    for overlay in overlays:
+        try:
+            filename, fstr = _read(overlay)
+            with phase("ast.parse"):
+                tree = ast.parse(fstr, filename=filename)
+            evaluator = OverlayEvaluator(
+                module, base, env=env, filename=overlay, modules=modules_cache
+            )
+            with phase("evaluate"):
+                symbols = evaluator.run(tree)
+            with phase("convert"):
+                settings = OrderedDict(base_settings)
+                settings.update(
+                    _settings(
+                        symbols,
+                        [name for name in symbols.maps[0] if name.isupper()],
+                    )
+                )
+        except Exception as e:
+            yield OrderedDict(
+                (("path", overlay), ("error", "{}: {}".format(type(e).__name__, e)))
+            )
+            continue
+
+        if queries is None:
+            yield OrderedDict((("path", overlay), ("settings", settings)))
+            continue
+        for query in queries:
+            try:
+                value = ("value", query_values(query, settings))
+            except Exception as e:
+                value = ("error", "{}: {}".format(type(e).__name__, e))
+            yield OrderedDict((("path", overlay), ("query", query), value))
+
+
+def _parser_cli_args(parser=None):
+    parser = ArgumentParser(description=__desc__) if parser is None else parser
+    parser.add_argument("base", help="Settings file shared by the overlays")
+    parser.add_argument("overlays", help="Settings files layered on it", nargs="+")
+    parser.add_argument("-o", "--outfile", help="Outfile")
+    parser.add_argument(
+        "-q",
+        "--query",
+        help="Query string; repeat for many (default: every setting)",
+        dest="queries",
+        action="append",
+    )
+    parser.add_argument(
+        "-e",
+        "--env",
+        help="NAME=VALUE seen by the settings' os.environ when evaluated statically;"
+        " repeat for many",
+        dest="env_vars",
+        action="append",
+    )
+    parser.add_argument(
+        "--clean-env",
+        help="Evaluate with only the --env variables, not this process's environment",
+        action="store_true",
+    )
+    return parser
+
+
+def render_matrix_with_output(
+    base, overlays, outfile=None, queries=None, env_vars=None, clean_env=False
+):
+    """
+    Stream JSON Lines of each overlay's path and settings—or, per query, path, query
+    and value—or error
+    """
+    stream_json_lines(
+        outfile,
+        render_matrix(
+            base, overlays, queries=queries, env=_cli_env(env_vars, clean_env)
+        ),
+        flush=True,
+    )
+
+
+__all__ = ["render_matrix", "render_matrix_with_output"]
@@ -1,7 +1,9 @@
 import ast
-import fileinput
 import operator
+import re
 from argparse import ArgumentParser
+from collections import OrderedDict
+from functools import partial
 
 try:
     from logging import _nameToLevel
@@ -27,29 +29,34 @@ except ImportError:
 from os import environ
 from sys import modules, stdin, version
 
-from django_settings_cli.utils import _file_or_dash, stream_tree_as_json
-
-if version[0] == "2":
-    try:
-        from cStringIO import StringIO
-    except ImportError:
-        from StringIO import StringIO
+from django_settings_cli.utils import (
+    FORMATS,
+    _file_or_dash,
+    expand_paths,
+    read_text,
+    stream_env_lines,
+    stream_json_lines,
+    stream_tree_as_json,
+    string_types,
+)
 
-    TextIOWrapper = StringIO
-else:
-    from io import StringIO, TextIOWrapper
+if version[0] == "3":
     from functools import reduce
 
-import astor
-
 from django_settings_cli import get_logger
 from django_settings_cli.parser.parser_utils import (
     astdict_to_dict,
-    eval_parens,
+    descend,
+    expr_to_python,
+    get_subscript_key,
+    is_literal,
+    mutated_name,
     node_to_python,
-    parenthetic_contents,
     resolve_collection,
 )
+from django_settings_cli.parser.query import Query, compile_query, is_extended
+from django_settings_cli.parser.scanner import find_statements
+from django_settings_cli.profiling import phase
 
 log = get_logger(modules[__name__].__name__)
 log.setLevel(_nameToLevel[environ.get("DJANGO_SETTING_CLI_LOG_LEVEL", "INFO")])
@@ -59,7 +66,7 @@ __desc__ = "Django settings.py emitter"
 
 def _parser_cli_args(parser=None):
     parser = ArgumentParser(description=__desc__) if parser is None else parser
-    parser.add_argument("query", help="Query string", default=".")
+    parser.add_argument("query", help="Query string", nargs="?")
     parser.add_argument(
         "infile",
         help="Input file",
@@ -68,6 +75,25 @@ def _parser_cli_args(parser=None):
         default=stdin,
     )
     parser.add_argument("-o", "--outfile", help="Outfile")
+    parser.add_argument(
+        "-q",
+        "--query",
+        help="Query string; repeat to resolve many queries in one parse",
+        dest="queries",
+        action="append",
+    )
+    parser.add_argument(
+        "--json-lines",
+        help="output one JSON object per query, per line",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--output-format",
+        help="json (default), compact JSON, ndjson (as --json-lines), dotenv lines, or"
+        " shell export lines; dict results are flattened, keys joined by __",
+        choices=FORMATS,
+        default="json",
+    )
     parser.add_argument(
         "-r",
         "--raw-strings",
@@ -81,7 +107,79 @@ def _parser_cli_args(parser=None):
         dest="format_str",
     )
     parser.add_argument(
-        "--no-eval", help="Disable eval (for format str)", action="store_true"
+        "--no-eval",
+        help="Only substitute names in the format str, not expressions",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--dump",
+        help="Output every top-level assignment, as if each were queried, converting"
+        " the statements of large files across --jobs worker processes",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--snapshot",
+        help="Query this snapshot, of the compile subcommand, rather than parse; the"
+        " infile, if given, is parsed instead should the snapshot be stale",
+    )
+    parser.add_argument(
+        "--xpath",
+        help="Queries are XPath, over the AST as astpath's XML; needs astpath and lxml",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-e",
+        "--env",
+        help="NAME=VALUE seen by the settings' os.environ when evaluated statically;"
+        " repeat for many",
+        dest="env_vars",
+        action="append",
+    )
+    parser.add_argument(
+        "--clean-env",
+        help="Evaluate with only the --env variables, not this process's environment",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--batch",
+        help="Query many files—directories, globs, filenames or @FILE listing them"
+        " (@- for stdin)—in parallel, streaming JSON Lines of path, query and value"
+        " or error",
+        nargs="+",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Worker processes for --batch and --dump (default: CPU count)",
+        type=int,
+    )
+    parser.add_argument(
+        "--chunk-size",
+        help="Files sent to a --batch worker at a time",
+        type=int,
+        default=8,
+    )
+    parser.add_argument(
+        "--watch",
+        help="Keep running, streaming JSON Lines of path, query and value or error"
+        " whenever a result changes",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--interval",
+        help="Seconds between checks for --watch (default: 1)",
+        type=float,
+        default=1.0,
+    )
+    parser.add_argument(
+        "--no-cache",
+        help="Bypass the cache enabled by DJANGO_SETTING_CLI_CACHE_DIR",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        help="Remove every entry from the cache first",
+        action="store_true",
     )
     return parser
 
@@ -93,7 +191,7 @@ class DebugVisitor(ast.NodeVisitor):
                 log.debug("target.id: {} ;".format(target.id))
                 # log.debug('target.ctx: {} ;'.format(target.ctx))
             elif isinstance(target, ast.Subscript):
-                log.debug("target.slice.value.s: {} ;".format(target.slice.value.s))
+                log.debug("target.slice: {} ;".format(get_subscript_key(target)))
                 if isinstance(target.value, ast.Name):
                     log.debug("target.value.id: {} ;".format(target.value.id))
             else:
@@ -131,96 +229,652 @@ class DebugVisitor(ast.NodeVisitor):
 
 
 class AssignQuerierVisitor(ast.NodeVisitor):
-    filter_value = None  # type: tuple
-    candidates = []
-    outer_key = None
+    """
+    Collect, in a single walk, the assignments to the queried top-level names.
+
+    Every query is its `keys`—a `query.split(".")`—less the leading empty string,
+    i.e., `("DATABASES", "default")` for `.DATABASES.default`. With no queries,
+    the assignments to every name are collected.
+
+    `assignments` maps each name to its `(subkey, node)` pairs, in source order;
+    where `subkey` is `()` for `NAME = …` and `(key,)` for `NAME[key] = …`. The
+    augmented `NAME += …` are included, as `ast.AugAssign` nodes; and the method calls
+    that may mutate a name, e.g., `NAME.append(…)`, as `ast.Expr` nodes.
+    """
+
+    def __init__(self, filter_values=None):  # type: (Optional[Iterable[tuple]]) -> None
+        self.names = (
+            None
+            if filter_values is None
+            else frozenset(filter_value[0] for filter_value in filter_values)
+        )
+        self.assignments = OrderedDict()
+
+    def _add(self, name, subkey, node):
+        if self.names is None or name in self.names:
+            self.assignments.setdefault(name, []).append((subkey, node))
 
     def visit_Assign(self, node):  # type: (AssignQuerierVisitor, ast.Assign) -> any
         for target in node.targets:
             if isinstance(target, ast.Name):
-                if target.id == self.filter_value[0]:
-                    self.candidates.append(target.id)
+                self._add(target.id, (), node)
                 # log.debug('target.ctx:', target.ctx, ';')
-            elif isinstance(target, ast.Subscript):
-                log.debug("target.slice.value.s: {} ;".format(target.slice.value.s))
-                if (
-                    len(self.filter_value) > 1
-                    and target.slice.value.s == self.filter_value[1]
-                ):
-                    self.candidates.append(target.slice.value.s)
-                    self.outer_key = target.slice.value.s
-                if isinstance(target.value, ast.Name):
-                    log.debug("target.value.id: {} ;".format(target.value.id))
+            elif isinstance(target, ast.Subscript) and isinstance(
+                target.value, ast.Name
+            ):
+                outer_key = get_subscript_key(target)
+                log.debug("target.slice: {} ;".format(outer_key))
+                self._add(target.value.id, (outer_key,), node)
             else:
                 log.debug("type(target): {} ;".format(type(target)))
 
-        if len(self.candidates) & 1 == 0:
-            return
+    def visit_AugAssign(
+        self, node
+    ):  # type: (AssignQuerierVisitor, ast.AugAssign) -> any
+        if isinstance(node.target, ast.Name):
+            self._add(node.target.id, (), node)
+        elif isinstance(node.target, ast.Subscript) and isinstance(
+            node.target.value, ast.Name
+        ):
+            self._add(node.target.value.id, (get_subscript_key(node.target),), node)
 
-        self.candidates.append(
-            (lambda py: py if self.outer_key is None else {self.outer_key: py})(
-                node_to_python(node)
-            )
-        )
-        self.outer_key = None
+    def visit_Expr(self, node):  # type: (AssignQuerierVisitor, ast.Expr) -> any
+        name = mutated_name(node)
+        if name is not None:
+            self._add(name, (), node)
+
+
+def lookup_assignment(assignments, filter_value):
+    """
+    Find the last assignment that sets the queried value
+
+    :param assignments: Name to `(subkey, value)` pairs, as in `AssignQuerierVisitor`
+    :type assignments: ```Mapping[str, List[Tuple[tuple, Any]]]```
+
+    :param filter_value: Query keys, e.g., `("DATABASES", "default")`
+    :type filter_value: ```tuple```
+
+    :return: The assigned value, and the keys left to look up within it
+    :rtype: ```Tuple[Any, tuple]```
+    """
+    for subkey, value in reversed(assignments.get(filter_value[0], ())):
+        if filter_value[1 : 1 + len(subkey)] == subkey:
+            return value, filter_value[1 + len(subkey) :]
+    raise KeyError(".{}".format(".".join(filter_value)))
+
+
+class _Dynamic(object):
+    """Cached in place of values that must be evaluated with the whole file"""
+
+
+def _materialise(node):
+    if isinstance(node, ast.Assign) and is_literal(node.value):
+        return node_to_python(node)
+    return _Dynamic
+
+
+# What the `StaticEvaluator` could not evaluate
+_UNKNOWN = object()
+
+# `from … import *`, which may bind any name
+_STAR_IMPORT = re.compile(r"^[ \t]*from[ \t]+[\w.]+[ \t]+import[ \t]+\*", re.MULTILINE)
 
 
 def debug_py(infile):
+    import astor
+
     parsed = astor.parse_file(infile)
     DebugVisitor().visit(parsed)
     # log.debug(astor.dump_tree(parsed))
 
 
-def parse_file(infile, keys):
-    visitor = AssignQuerierVisitor()
-    visitor.filter_value = (keys[1], keys[2]) if len(keys) > 2 else (keys[1],)
+def _read(infile):
+    with phase("read"):
+        fstr = read_text(stdin if infile == "-" else infile)
+    with phase("normalise"):
+        if "\r" in fstr:
+            fstr = fstr.replace("\r\n", "\n").replace("\r", "\n")
+    if not isinstance(infile, string_types) or infile == "-":
+        infile = "stdin"
+    return infile, fstr
+
+
+def _resolve(keys, assignments, fstr, evaluate):
+    """
+    Resolve one query from the extracted `assignments`, falling back to `evaluate`
 
-    irregular_fh = type(infile).__name__ in ("StringO", "StringIO") or isinstance(
-        infile, (TextIOWrapper, StringIO)
+    :param keys: Query, split on "."; or compiled, by `compile_query`
+    :type keys: ```Union[List[str], Query]```
+
+    :param assignments: Name to `(subkey, node)` pairs, of `AssignQuerierVisitor`—or
+      to `(subkey, value)` pairs, as cached
+    :type assignments: ```OrderedDict```
+
+    :param fstr: File contents, for the root query
+    :type fstr: ```Optional[str]```
+
+    :param evaluate: Statically evaluated value at `keys`; `_UNKNOWN` if it cannot be.
+      At the root, `[""]`, the settings, by name
+    :type evaluate: ```Callable[[List[str]], Any]```
+
+    :return: Resolved value
+    :rtype: ```Any```
+    """
+    if isinstance(keys, Query):
+        return keys.search(
+            assignments,
+            partial(_top_level, assignments=assignments, fstr=fstr, evaluate=evaluate),
+            evaluate,
+        )
+    elif keys == ["", ""]:
+        return fstr
+    elif "*" in assignments:
+        # Any setting may come from, or be overridden by, the star imports;
+        # unless those cannot be followed, when this file's assignments are used
+        value = evaluate(keys)
+        if value is not _UNKNOWN:
+            return value
+    try:
+        value, remaining_keys = lookup_assignment(assignments, tuple(keys[1:]))
+    except KeyError:
+        # Perhaps imported by name, e.g., `from .base import DATABASES`
+        value = evaluate(keys)
+        if value is _UNKNOWN:
+            raise
+        return value
+    if isinstance(value, ast.Assign):
+        # Only convert the selected subtree of the assigned literal
+        node, remaining_keys = descend(value.value, remaining_keys)
+        value = _Dynamic
+        if is_literal(node):
+            with phase("convert"):
+                value = reduce(operator.getitem, remaining_keys, expr_to_python(node))
+    elif isinstance(value, ast.AST):
+        value = _Dynamic
+    elif value is not _Dynamic:
+        value = reduce(operator.getitem, remaining_keys, value)
+    if value is not _Dynamic and len(keys) == 2:
+        # The whole name: its later `NAME[key] = …` assign into it
+        value = _assign_into(value, _assigned_into(assignments[keys[1]]))
+    if value is not _Dynamic:
+        return value
+    value = evaluate(keys)
+    return None if value is _UNKNOWN else value
+
+
+def _assigned_into(pairs):
+    """The `(subkey, node)` pairs after the last `NAME = …` of `pairs`"""
+    for i in range(len(pairs) - 1, -1, -1):
+        if not pairs[i][0]:
+            return pairs[i + 1 :]
+    return pairs
+
+
+def _assign_into(value, pairs):
+    """
+    `value`, with the `NAME[key] = …` assignments of `pairs` applied in source order;
+    `_Dynamic` when any cannot be without evaluating the file
+    """
+    if not pairs:
+        return value
+    elif not isinstance(value, (dict, list)):
+        return _Dynamic
+    # A copy, as cached values are shared
+    value = type(value)(value)
+    for subkey, node in pairs:
+        if isinstance(node, ast.Assign):
+            if not is_literal(node.value):
+                return _Dynamic
+            with phase("convert"):
+                node = expr_to_python(node.value)
+        elif isinstance(node, ast.AST) or node is _Dynamic:
+            return _Dynamic
+        try:
+            value[subkey[0]] = node
+        except (IndexError, TypeError):
+            return _Dynamic
+    return value
+
+
+def _top_level(name, assignments, fstr, evaluate):
+    """
+    The value of the top-level `name`, for `Query.search`: the AST of its last
+    assignment—converted as the query descends into it—when that alone sets it
+    """
+    pairs = assignments.get(name)
+    if pairs and "*" not in assignments:
+        subkey, node = pairs[-1]
+        if not subkey and isinstance(node, ast.Assign):
+            return node.value
+    try:
+        return _resolve(["", name], assignments, fstr, evaluate)
+    except KeyError:
+        if not pairs:
+            raise
+    # Only ever assigned into, e.g., `REST_FRAMEWORK["PAGE_SIZE"] = 30`, by this file
+    return OrderedDict(
+        (subkey[0], node.value if isinstance(node, ast.Assign) else node)
+        for subkey, node in pairs
+        if node is not _Dynamic and not isinstance(node, ast.AugAssign)
     )
 
-    fstr = "".join(
-        line.replace("\r\n", "\n").replace("\r", "\n")
-        for line in (infile if irregular_fh else fileinput.input(infile))
+
+class _Evaluation(object):
+    """
+    The `evaluate` of `_resolve`: the statically evaluated value at `keys`, `_UNKNOWN` if
+    it cannot be; the whole file is evaluated once, when first needed
+
+    :param infile: Input filename or file-like object
+    :type infile: ```Union[str, TextIOWrapper, StringIO]```
+
+    :param fstr: File contents, if read; else `infile` is read when evaluated
+    :type fstr: ```Optional[str]```
+
+    :param filename: Filename, for syntax errors
+    :type filename: ```Optional[str]```
+
+    :param env: Environment for the evaluated `os.environ`; default the process's
+    :type env: ```Optional[Mapping[str, str]]```
+    """
+
+    def __init__(self, infile, fstr, filename, env):
+        self.infile = infile
+        self.fstr = fstr
+        self.filename = filename
+        self.env = env
+        self.symbols = None
+        # `stat` of each settings module imported, transitively, once evaluated
+        self.stat_keys = {}
+
+    def __call__(self, keys):
+        from django_settings_cli.parser.evaluator import StaticEvaluator
+
+        if self.symbols is None:
+            infile = self.infile
+            source = self.fstr if self.fstr is not None else _read(infile)[1]
+            evaluator = StaticEvaluator(
+                env=self.env,
+                filename=infile if isinstance(infile, string_types) else None,
+            )
+            with phase("evaluate"):
+                self.symbols = evaluator.run(
+                    ast.parse(source, filename=self.filename or infile)
+                )
+            self.stat_keys = evaluator.stat_keys
+        return _evaluated(self.symbols, keys)
+
+
+def _evaluated(symbols, keys):
+    """
+    The value at `keys` of the evaluated `symbols`, `_UNKNOWN` if unknown; at the root,
+    `[""]`, every setting, as merged with the star imports
+    """
+    from django_settings_cli.parser.evaluator import UNKNOWN, setting_names, to_python
+
+    if len(keys) == 1:
+        return OrderedDict(
+            (name, to_python(symbols[name])) for name in setting_names(symbols)
+        )
+    value = symbols.get(keys[1], UNKNOWN)
+    if value is UNKNOWN:
+        return _UNKNOWN
+    return reduce(operator.getitem, keys[2:], to_python(value))
+
+
+def _filter_value(keys):
+    """The top-level name a query needs, as a 1-tuple; `None` when it may need any"""
+    if isinstance(keys, Query):
+        return None if keys.names is None else tuple(keys.names)
+    return tuple(keys[1:])
+
+
+def parse_file_queries(
+    infile, keys_list, cache=None, return_exceptions=False, env=None
+):
+    """
+    Resolve many queries with one read, one parse and one walk of `infile`
+
+    Values that are not literals—e.g., `os.environ.get("HOST", "localhost")` or
+    `BASE_DIR / "static"`—are evaluated statically, with the whole file, by the
+    `StaticEvaluator`.
+
+    :param infile: Input filename or file-like object
+    :type infile: ```Union[str, TextIOWrapper, StringIO]```
+
+    :param keys_list: Queries, each split on "."—or compiled, by `compile_query`
+    :type keys_list: ```List[Union[List[str], Query]]```
+
+    :param cache: Cache of the extracted assignments, used when `infile` is a filename
+    :type cache: ```Optional[FileCache]```
+
+    :param return_exceptions: Return, rather than raise, the error of a failed query
+    :type return_exceptions: ```bool```
+
+    :param env: Environment for the evaluated `os.environ`; default the process's
+    :type env: ```Optional[Mapping[str, str]]```
+
+    :return: Resolved value for each query, in the same order as `keys_list`
+    :rtype: ```list```
+    """
+    filter_values = tuple(_filter_value(keys) for keys in keys_list if keys != ["", ""])
+    use_cache = (
+        cache is not None
+        and len(filter_values) == len(keys_list)
+        and isinstance(infile, string_types)
+        and infile != "-"
     )
-    if infile == "-" or irregular_fh:
-        infile = "stdin"
 
-    if keys == ["", ""]:
-        return fstr
+    filename = fstr = None
+    if use_cache:
+        with phase("cache.get"):
+            assignments = cache.get(infile)
+    else:
+        assignments = None
+    if assignments is None:
+        filename, fstr = _read(infile)
+        if not filter_values:
+            return [fstr for _ in keys_list]
+
+        visitor = AssignQuerierVisitor(
+            None if use_cache or None in filter_values else filter_values
+        )
+        with phase("scan"):
+            statements = (
+                None
+                if use_cache or visitor.names is None
+                else find_statements(fstr, visitor.names)
+            )
+        # Fast path: parse only the statements assigning the queried names
+        for statement in (fstr,) if statements is None else statements:
+            with phase("ast.parse"):
+                tree = ast.parse(statement, filename=filename)
+            with phase("visit"):
+                visitor.visit(tree)
+        log.debug("visitor.assignments: {} ;".format(visitor.assignments))
+
+        assignments = visitor.assignments
+        if _STAR_IMPORT.search(fstr):
+            # Not a name, so marks the star imports without clashing with any
+            assignments["*"] = [((), _Dynamic)]
+        if use_cache:
+            with phase("convert"):
+                assignments = OrderedDict(
+                    (name, [(subkey, _materialise(node)) for subkey, node in pairs])
+                    for name, pairs in assignments.items()
+                )
+            with phase("cache.set"):
+                cache.set(infile, fstr, assignments)
+
+    evaluate = _Evaluation(infile, fstr, filename, env)
+    resolve = partial(_resolve, assignments=assignments, fstr=fstr, evaluate=evaluate)
+    if return_exceptions:
+        resolve = _returning_exceptions(resolve)
+    return list(map(resolve, keys_list))
+
+
+def _returning_exceptions(f):
+    def wrapper(*args, **kwargs):
+        try:
+            return f(*args, **kwargs)
+        except Exception as e:
+            return e
 
-    visitor.visit(ast.parse(fstr, filename=infile))
+    return wrapper
 
-    log.debug("visitor.candidates: {} ;".format(visitor.candidates))
-    r = (
-        reduce(operator.getitem, keys[2:-1], visitor.candidates[1])[keys[-1]]
-        if len(keys) > 2
-        else visitor.candidates[1]
+
+def parse_file(infile, keys, cache=None, env=None):
+    return parse_file_queries(infile=infile, keys_list=[keys], cache=cache, env=env)[0]
+
+
+def _format(r, format_str, no_eval):
+    from django_settings_cli.parser.template import compile_template
+
+    with phase("format"):
+        return compile_template(format_str, no_eval).render(r)
+
+
+def query_py_parser(
+    infile,
+    query=".",
+    format_str=None,
+    no_eval=False,
+    cache=None,
+    return_exceptions=False,
+    env=None,
+):
+    """
+    Query the Django settings file
+
+    :param infile: Input filename or file-like object
+    :type infile: ```Union[str, TextIOWrapper, StringIO]```
+
+    :param query: Query string, e.g., ".DATABASES.default"; or a list of them
+    :type query: ```Union[str, List[str]]```
+
+    :param format_str: Format string, applied to each resolved value
+    :type format_str: ```Optional[str]```
+
+    :param no_eval: Only substitute names in the format str, not expressions
+    :type no_eval: ```bool```
+
+    :param cache: Cache of the extracted assignments, used when `infile` is a filename
+    :type cache: ```Optional[FileCache]```
+
+    :param return_exceptions: Return, rather than raise, the error of a failed query
+    :type return_exceptions: ```bool```
+
+    :param env: Environment for the evaluated `os.environ`; default the process's
+    :type env: ```Optional[Mapping[str, str]]```
+
+    :return: Resolved value; or, when `query` is a list, an `OrderedDict` keyed by query
+    :rtype: ```Union[Any, OrderedDict]```
+    """
+    queries = [query] if isinstance(query, string_types) else query
+    results = parse_file_queries(
+        infile=infile,
+        keys_list=[
+            compile_query(q) if is_extended(q) else q.split(".") for q in queries
+        ],
+        cache=cache,
+        return_exceptions=return_exceptions,
+        env=env,
     )
-    return r
+    return _query_results(query, results, format_str, no_eval, return_exceptions)
+
 
+def _query_results(query, results, format_str, no_eval, return_exceptions):
+    """
+    Format the `results` of `query`
 
-def query_py_parser(infile, query=".", format_str=None, no_eval=False):
-    keys = query.split(".")
-    r = parse_file(infile=infile, keys=keys)
+    :return: Resolved value; or, when `query` is a list, an `OrderedDict` keyed by query
+    :rtype: ```Union[Any, OrderedDict]```
+    """
     if format_str:
-        ref = {"format_str": format_str}
-        d = dict(
-            tuple(
-                eval_parens(k=k, r=r, ref=ref, no_eval=no_eval)
-                for k in parenthetic_contents(format_str)
+        format_result = partial(_format, format_str=format_str, no_eval=no_eval)
+        if return_exceptions:
+            format_result = _returning_exceptions(format_result)
+        results = [r if isinstance(r, Exception) else format_result(r) for r in results]
+    if isinstance(query, string_types):
+        return results[0]
+    return OrderedDict(zip(query, results))
+
+
+def _cli_query(infile, query, queries):
+    """
+    Reconcile the positional `query` with the `-q` `queries`
+
+    :return: The infile, and the query string—or list of them
+    :rtype: ```Tuple[Union[str, TextIOWrapper], Union[str, List[str]]]```
+    """
+    if queries:
+        if query is not None and not query.startswith("."):
+            # `parse -q .A -q .B settings.py`: the positional is the infile
+            if infile is not stdin:
+                raise ValueError("Unexpected argument: {!r}".format(query))
+            infile, query = query, None
+        return infile, ([] if query is None else [query]) + queries
+    return infile, "." if query is None else query
+
+
+def _cli_env(env_vars, clean_env):
+    """
+    The environment for the `StaticEvaluator`, from `-e NAME=VALUE` and `--clean-env`
+
+    :return: Environment; `None` for this process's
+    :rtype: ```Optional[dict]```
+    """
+    if not env_vars and not clean_env:
+        return None
+    env = {} if clean_env else dict(environ)
+    for env_var in env_vars or ():
+        name, sep, value = env_var.partition("=")
+        if not sep:
+            raise ValueError("Expected NAME=VALUE, got: {!r}".format(env_var))
+        env[name] = value
+    return env
+
+
+def _output(r, query, outfile, raw_strings, json_lines, output_format="json"):
+    with phase("serialize"):
+        if json_lines or output_format == "ndjson":
+            stream_json_lines(
+                outfile,
+                (
+                    OrderedDict((("query", q), ("value", v)))
+                    for q, v in (
+                        ((query, r),) if isinstance(query, string_types) else r.items()
+                    )
+                ),
+            )
+        elif output_format in ("dotenv", "shell"):
+            stream_env_lines(outfile, r, query, shell=output_format == "shell")
+        else:
+            stream_tree_as_json(
+                outfile, r, raw_strings, compact=output_format == "compact"
             )
-        )
-        format_str = ref["format_str"]
-        r = format_str.format(**d)
-    return r
 
 
 def query_py_with_output(
-    infile, query=".", raw_strings=False, format_str=None, no_eval=False, outfile=None
+    infile,
+    query=".",
+    raw_strings=False,
+    format_str=None,
+    no_eval=False,
+    outfile=None,
+    queries=None,
+    json_lines=False,
+    output_format="json",
+    no_cache=False,
+    clear_cache=False,
+    batch=None,
+    jobs=None,
+    chunk_size=8,
+    watch=False,
+    interval=1.0,
+    env_vars=None,
+    clean_env=False,
+    xpath=False,
+    snapshot=None,
+    dump=False,
 ):
+    from django_settings_cli.parser.cache import FileCache
+
+    env = _cli_env(env_vars, clean_env)
+
+    cache = None if no_cache else FileCache.from_environ()
+    if clear_cache and cache is not None:
+        cache.clear()
+        if query is None and not queries:
+            return
+
+    infile, query = _cli_query(infile, query, queries)
+
+    if watch:
+        from django_settings_cli.parser.watch import watch as watch_files
+
+        if infile is stdin and not batch:
+            raise ValueError("--watch needs an infile, or --batch paths")
+        return stream_json_lines(
+            outfile,
+            watch_files(
+                filenames=list(expand_paths(batch)) if batch else [infile],
+                queries=[query] if isinstance(query, string_types) else query,
+                format_str=format_str,
+                no_eval=no_eval,
+                interval=interval,
+                env=env,
+            ),
+            flush=True,
+        )
+
+    if batch:
+        from django_settings_cli.parser.batch import query_batch
+
+        return stream_json_lines(
+            outfile,
+            query_batch(
+                paths=batch,
+                queries=[query] if isinstance(query, string_types) else query,
+                format_str=format_str,
+                no_eval=no_eval,
+                cache=cache,
+                env=env,
+                jobs=jobs,
+                chunk_size=chunk_size,
+            ),
+        )
+
+    if dump:
+        from django_settings_cli.parser.dump import dump_file
+
+        if query not in (None, ".") and infile is stdin:
+            # `parse --dump settings.py`: the positional is the infile
+            infile = query
+        values = dump_file(infile, jobs=jobs, env=env)
+        query = [".{}".format(name) for name in values]
+        r = _query_results(query, list(values.values()), format_str, no_eval, False)
+        return _output(r, query, outfile, raw_strings, json_lines, output_format)
+
+    if snapshot:
+        from django_settings_cli.snapshot import Snapshot
+
+        with Snapshot(snapshot) as compiled:
+            if infile is stdin:
+                r = compiled.query(query, format_str=format_str, no_eval=no_eval)
+                return _output(
+                    r, query, outfile, raw_strings, json_lines, output_format
+                )
+            elif compiled.fresh(infile, env):
+                try:
+                    r = compiled.query(query, format_str=format_str, no_eval=no_eval)
+                except KeyError as e:
+                    # e.g., a name that is assigned, but not a setting
+                    log.debug("snapshot: KeyError: {} ;".format(e))
+                else:
+                    return _output(
+                        r, query, outfile, raw_strings, json_lines, output_format
+                    )
+            else:
+                log.warning("Stale snapshot {}, parsing {}".format(snapshot, infile))
+
+    if xpath:
+        from django_settings_cli.parser.query import xpath as xpath_query
+
+        filename, fstr = _read(infile)
+        results = [
+            xpath_query(fstr, q, filename=filename)
+            for q in ((query,) if isinstance(query, string_types) else query)
+        ]
+        r = _query_results(query, results, format_str, no_eval, False)
+        return _output(r, query, outfile, raw_strings, json_lines, output_format)
+
     r = query_py_parser(
-        format_str=format_str, infile=infile, no_eval=no_eval, query=query
+        format_str=format_str,
+        infile=infile,
+        no_eval=no_eval,
+        query=query,
+        cache=cache,
+        env=env,
     )
 
-    stream_tree_as_json(outfile, r, raw_strings)
+    _output(r, query, outfile, raw_strings, json_lines, output_format)
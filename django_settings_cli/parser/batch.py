@@ -0,0 +1,110 @@
+"""
+Fleet mode: query many settings files across a pool of worker processes.
+"""
+
+from collections import OrderedDict
+from functools import partial
+from multiprocessing import Pool, cpu_count
+
+from django_settings_cli.parser import query_py_parser
+from django_settings_cli.utils import expand_paths
+
+
+def _query_file(filename, queries, format_str, no_eval, cache, env):
+    try:
+        results = query_py_parser(
+            infile=filename,
+            query=queries,
+            format_str=format_str,
+            no_eval=no_eval,
+            cache=cache,
+            return_exceptions=True,
+            env=env,
+        ).items()
+    except Exception as e:
+        results = [(query, e) for query in queries]
+
+    return [
+        OrderedDict(
+            (
+                ("path", filename),
+                ("query", query),
+                (
+                    ("error", "{}: {}".format(type(value).__name__, value))
+                    if isinstance(value, Exception)
+                    else ("value", value)
+                ),
+            )
+        )
+        for query, value in results
+    ]
+
+
+def query_batch(
+    paths,
+    queries,
+    format_str=None,
+    no_eval=False,
+    cache=None,
+    env=None,
+    jobs=None,
+    chunk_size=8,
+):
+    """
+    Query every file, yielding records as each file completes (not in input order)
+
+    :param paths: Directories, globs, filenames or @FILE lists, as in `expand_paths`
+    :type paths: ```Iterable[str]```
+
+    :param queries: Query strings, e.g., `[".DEBUG", ".DATABASES.default"]`
+    :type queries: ```List[str]```
+
+    :param format_str: Format string, applied to each resolved value
+    :type format_str: ```Optional[str]```
+
+    :param no_eval: Only substitute names in the format str, not expressions
+    :type no_eval: ```bool```
+
+    :param cache: Cache of the extracted assignments
+    :type cache: ```Optional[FileCache]```
+
+    :param env: Environment for the evaluated `os.environ`; default the process's
+    :type env: ```Optional[Mapping[str, str]]```
+
+    :param jobs: Worker processes; `None` for the CPU count, 1 to run in-process
+    :type jobs: ```Optional[int]```
+
+    :param chunk_size: Files sent to a worker at a time
+    :type chunk_size: ```int```
+
+    :return: `OrderedDict`s of path, query and value—or error—per file and query
+    :rtype: ```Iterator[OrderedDict]```
+    """
+    query_file = partial(
+        _query_file,
+        queries=queries,
+        format_str=format_str,
+        no_eval=no_eval,
+        cache=cache,
+        env=env,
+    )
+    filenames = expand_paths(paths)
+    jobs = jobs or cpu_count()
+
+    if jobs == 1:
+        for filename in filenames:
+            for record in query_file(filename):
+                yield record
+        return
+
+    pool = Pool(jobs)
+    try:
+        for records in pool.imap_unordered(query_file, filenames, chunk_size):
+            for record in records:
+                yield record
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+__all__ = ["query_batch"]
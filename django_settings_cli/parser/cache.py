@@ -0,0 +1,266 @@
+"""
+Caches of the top-level assignments extracted from settings files: on-disk, and
+in-memory for the resident server.
+
+Entries are validated by `stat` (mtime and size), then by content hash; and are
+evicted least-recently-used first once the cache exceeds its size bound.
+"""
+
+import pickle
+from collections import OrderedDict
+from hashlib import sha1, sha256
+from os import (
+    O_CREAT,
+    O_TRUNC,
+    O_WRONLY,
+    environ,
+    fdopen,
+    getpid,
+    listdir,
+    makedirs,
+)
+from os import open as os_open
+from os import path, remove, replace, stat, utime
+from sys import modules
+from threading import Lock, get_ident
+
+from django_settings_cli import get_logger
+from django_settings_cli.parser import _nameToLevel, _read
+
+log = get_logger(modules[__name__].__name__)
+log.setLevel(_nameToLevel[environ.get("DJANGO_SETTING_CLI_LOG_LEVEL", "INFO")])
+
+_ENTRY_EXT = ".pickle"
+
+# Of what is cached—assignments, or fingerprint trees; entries of any other are misses
+_ENTRY_FORMAT = 3
+
+
+def content_hash(fstr):
+    """
+    Hash the contents of a settings file
+
+    :param fstr: File contents
+    :type fstr: ```str```
+
+    :return: Hex digest
+    :rtype: ```str```
+    """
+    return sha256(fstr.encode("utf-8")).hexdigest()
+
+
+def _stat_key(filename):
+    st = stat(filename)
+    return getattr(st, "st_mtime_ns", st.st_mtime), st.st_size
+
+
+def _revalidate(cached, filename):
+    """
+    Check `cached` against `filename`, refreshing its `stat` when only that changed
+
+    :return: Whether the entry is still valid, and whether its `stat` was refreshed
+    :rtype: ```Tuple[bool, bool]```
+    """
+    stat_key = _stat_key(filename)
+    if cached["stat"] == stat_key:
+        return True, False
+    # Read, and hashed, as when cached
+    digest = content_hash(_read(filename)[1])
+    if cached["hash"] != digest:
+        log.debug("cache stale: {} ;".format(filename))
+        return False, False
+    cached["stat"] = stat_key
+    return True, True
+
+
+class FileCache(object):
+    """
+    Cache, in `directory`, of the extracted assignments of each settings file.
+
+    Keyed by the absolute path of the settings file; holding its `stat`, its
+    content hash and the `name -> [(subkey, value), …]` of its assignments.
+    """
+
+    def __init__(self, directory, max_size=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+
+    @classmethod
+    def from_environ(cls):
+        """
+        Construct from `DJANGO_SETTING_CLI_CACHE_DIR` and `DJANGO_SETTING_CLI_CACHE_SIZE`
+
+        :return: The cache, or `None` when no cache directory is configured
+        :rtype: ```Optional[FileCache]```
+        """
+        directory = environ.get("DJANGO_SETTING_CLI_CACHE_DIR")
+        if not directory:
+            return None
+        if "DJANGO_SETTING_CLI_CACHE_SIZE" in environ:
+            return cls(directory, int(environ["DJANGO_SETTING_CLI_CACHE_SIZE"]))
+        return cls(directory)
+
+    def _entry(self, filename):
+        return path.join(
+            self.directory,
+            sha1(path.abspath(filename).encode("utf-8")).hexdigest() + _ENTRY_EXT,
+        )
+
+    def get(self, filename):
+        """
+        Get the cached assignments of `filename`, if its entry is still valid
+
+        :param filename: Settings filename
+        :type filename: ```str```
+
+        :return: Name to `(subkey, value)` pairs, or `None` on a miss
+        :rtype: ```Optional[OrderedDict]```
+        """
+        entry = self._entry(filename)
+        try:
+            with open(entry, "rb") as f:
+                cached = pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if cached.get("format") != _ENTRY_FORMAT:
+            return None
+
+        valid, refreshed = _revalidate(cached, filename)
+        if not valid:
+            return None
+        elif refreshed:
+            self._write(entry, cached)
+        else:
+            # Mark as recently used, for LRU eviction
+            utime(entry, None)
+
+        log.debug("cache hit: {} ;".format(filename))
+        return cached["assignments"]
+
+    def set(self, filename, fstr, assignments):
+        """
+        Cache the assignments of `filename`, evicting the least recently used entries
+
+        :param filename: Settings filename
+        :type filename: ```str```
+
+        :param fstr: Contents of `filename`, as parsed
+        :type fstr: ```str```
+
+        :param assignments: Name to `(subkey, value)` pairs
+        :type assignments: ```OrderedDict```
+        """
+        if not path.isdir(self.directory):
+            makedirs(self.directory)
+        self._write(
+            self._entry(filename),
+            {
+                "format": _ENTRY_FORMAT,
+                "stat": _stat_key(filename),
+                "hash": content_hash(fstr),
+                "assignments": assignments,
+            },
+        )
+        self.evict()
+
+    def _write(self, entry, cached):
+        # Unique to this process and thread—without importing `tempfile`—then renamed
+        # into place, so readers only ever see whole entries
+        temp = "{}.{:d}.{:d}.tmp".format(entry, getpid(), get_ident())
+        with fdopen(os_open(temp, O_WRONLY | O_CREAT | O_TRUNC, 0o600), "wb") as f:
+            pickle.dump(cached, f, pickle.HIGHEST_PROTOCOL)
+        replace(temp, entry)
+
+    def _entries(self):
+        if not path.isdir(self.directory):
+            return []
+        return [
+            path.join(self.directory, name)
+            for name in listdir(self.directory)
+            if name.endswith(_ENTRY_EXT)
+        ]
+
+    def evict(self):
+        """Remove the least recently used entries until within `max_size`"""
+        entries = sorted(
+            (st.st_mtime, st.st_size, entry)
+            for st, entry in ((stat(entry), entry) for entry in self._entries())
+        )
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_size:
+                break
+            log.debug("cache evict: {} ;".format(entry))
+            remove(entry)
+            total -= size
+
+    def clear(self):
+        """Remove every entry"""
+        for entry in self._entries():
+            remove(entry)
+
+
+class MemoryCache(object):
+    """
+    Thread-safe, in-memory counterpart of `FileCache`, bounded to `max_entries` files.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, filename):
+        """
+        Get the cached assignments of `filename`, if its entry is still valid
+
+        :param filename: Settings filename
+        :type filename: ```str```
+
+        :return: Name to `(subkey, value)` pairs, or `None` on a miss
+        :rtype: ```Optional[OrderedDict]```
+        """
+        key = path.abspath(filename)
+        with self._lock:
+            cached = self._entries.pop(key, None)
+            if cached is None:
+                return None
+            # Reinsert as the most recently used
+            self._entries[key] = cached
+
+        if not _revalidate(cached, filename)[0]:
+            return None
+        log.debug("cache hit: {} ;".format(filename))
+        return cached["assignments"]
+
+    def set(self, filename, fstr, assignments):
+        """
+        Cache the assignments of `filename`, evicting the least recently used entries
+
+        :param filename: Settings filename
+        :type filename: ```str```
+
+        :param fstr: Contents of `filename`, as parsed
+        :type fstr: ```str```
+
+        :param assignments: Name to `(subkey, value)` pairs
+        :type assignments: ```OrderedDict```
+        """
+        cached = {
+            "stat": _stat_key(filename),
+            "hash": content_hash(fstr),
+            "assignments": assignments,
+        }
+        with self._lock:
+            self._entries.pop(path.abspath(filename), None)
+            self._entries[path.abspath(filename)] = cached
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
+
+
+__all__ = ["FileCache", "MemoryCache", "content_hash"]
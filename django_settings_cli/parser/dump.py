@@ -0,0 +1,196 @@
+"""
+Whole-file extraction: every top-level assignment of a settings file, converted in
+parallel. The source is split, without parsing it, into ranges of whole top-level
+statements; a pool of worker processes parses and converts each range; and the results
+are merged in source order, the last write to each name winning.
+"""
+
+import ast
+import re
+from collections import OrderedDict
+from multiprocessing import Pool, cpu_count
+
+from django_settings_cli.parser import (
+    _STAR_IMPORT,
+    AssignQuerierVisitor,
+    _Dynamic,
+    _Evaluation,
+    _materialise,
+    _read,
+    parse_file_queries,
+)
+from django_settings_cli.profiling import phase
+from django_settings_cli.utils import string_types
+
+# Below this many characters, the pool costs more than it saves
+PARALLEL_THRESHOLD = 1024 * 1024
+
+# The start of a line that may start a top-level statement. A range split anywhere
+# else—within brackets, a string or a compound statement—fails to parse
+_STATEMENT_START = re.compile(
+    r"^(?!(?:else|elif|except|finally)\b)[A-Za-z_]", re.MULTILINE
+)
+
+
+def split_statements(source, ranges):
+    """
+    Split `source` into about `ranges` ranges, each starting at a line that may start
+    a top-level statement
+
+    :param source: Python source
+    :type source: ```str```
+
+    :param ranges: Ranges wanted
+    :type ranges: ```int```
+
+    :return: `(start, end)` offsets of each range, in source order
+    :rtype: ```List[Tuple[int, int]]```
+    """
+    size = max(len(source) // max(ranges, 1), 1)
+    spans, start = [], 0
+    while start < len(source):
+        match = _STATEMENT_START.search(source, start + size)
+        end = len(source) if match is None else match.start()
+        spans.append((start, end))
+        start = end
+    return spans
+
+
+def convert_statements(source, filename="<unknown>"):
+    """
+    Parse and convert the assignments of `source`
+
+    :param source: Python source, of whole top-level statements
+    :type source: ```str```
+
+    :param filename: Filename, for syntax errors
+    :type filename: ```str```
+
+    :return: `(lineno, col_offset, name, subkey, value)` of each assignment, in source
+      order; `value` is `_Dynamic` when not a literal
+    :rtype: ```List[Tuple[int, int, str, tuple, Any]]```
+    """
+    visitor = AssignQuerierVisitor()
+    visitor.visit(ast.parse(source, filename=filename))
+    return sorted(
+        (
+            (node.lineno, node.col_offset, name, subkey, _materialise(node))
+            for name, pairs in visitor.assignments.items()
+            for subkey, node in pairs
+        ),
+        key=lambda record: record[:2],
+    )
+
+
+def _merge(records):
+    """
+    Fold the assignments, in order, into each name's final value
+
+    :return: Name to value, and the names that must be evaluated instead
+    :rtype: ```Tuple[OrderedDict, set]```
+    """
+    values, dynamic = OrderedDict(), set()
+    for _, _, name, subkey, value in records:
+        if value is _Dynamic:
+            values.setdefault(name, None)
+            dynamic.add(name)
+        elif not subkey:
+            values[name] = value
+            dynamic.discard(name)
+        elif name not in dynamic and isinstance(values.get(name), dict):
+            values[name][subkey[0]] = value
+        else:
+            values.setdefault(name, None)
+            dynamic.add(name)
+    return values, dynamic
+
+
+def dump_file(infile, jobs=None, env=None, threshold=PARALLEL_THRESHOLD):
+    """
+    Extract every top-level assignment of `infile`, converting its statements across
+    `jobs` worker processes
+
+    Values that are not literals—or that augment or assign into one that is not—are
+    evaluated statically, with the whole file, as `parse` does. With star imports, the
+    settings they bring in are the base, which those of `infile` override.
+
+    :param infile: Input filename or file-like object
+    :type infile: ```Union[str, TextIOWrapper, StringIO]```
+
+    :param jobs: Worker processes; `None` for the CPU count, 1 to run in-process
+    :type jobs: ```Optional[int]```
+
+    :param env: Environment for the evaluated `os.environ`; default the process's
+    :type env: ```Optional[Mapping[str, str]]```
+
+    :param threshold: Characters of source below which to run in-process
+    :type threshold: ```int```
+
+    :return: Top-level name to its value, in order of first assignment—by the star
+      imports, then by `infile`
+    :rtype: ```OrderedDict```
+    """
+    filename, fstr = _read(infile)
+    jobs = jobs or cpu_count()
+    if jobs == 1 or len(fstr) < threshold:
+        ranges = [fstr]
+    else:
+        with phase("split"):
+            ranges = [
+                fstr[start:end] for start, end in split_statements(fstr, jobs * 4)
+            ]
+
+    with phase("convert"):
+        try:
+            if len(ranges) == 1:
+                chunks = [convert_statements(fstr, filename)]
+            else:
+                pool = Pool(jobs)
+                try:
+                    chunks = pool.map(convert_statements, ranges)
+                finally:
+                    pool.terminate()
+                    pool.join()
+        except SyntaxError:
+            if len(ranges) == 1:
+                raise
+            # Split within a statement the heuristic missed: no ranges then
+            chunks = [convert_statements(fstr, filename)]
+
+    with phase("merge"):
+        values, dynamic = _merge(record for chunk in chunks for record in chunk)
+
+    star_import = _STAR_IMPORT.search(fstr) is not None
+    if not dynamic and not star_import:
+        return values
+
+    from io import StringIO
+
+    source = (
+        infile if isinstance(infile, string_types) and infile != "-" else StringIO(fstr)
+    )
+    if star_import:
+        # Seeded with the settings the star imports bring in, then this file's on top.
+        # Any of this file's may come from, or be overridden by, the star imports too
+        with phase("evaluate"):
+            settings = _Evaluation(source, fstr, filename, env)([""])
+        dynamic = set(values)
+        values, assigned = OrderedDict(settings), values
+        for name, value in assigned.items():
+            values.setdefault(name, value)
+    if dynamic:
+        names = [name for name in values if name in dynamic]
+        for name, value in zip(
+            names,
+            parse_file_queries(
+                source,
+                [["", name] for name in names],
+                return_exceptions=True,
+                env=env,
+            ),
+        ):
+            values[name] = None if isinstance(value, Exception) else value
+    return values
+
+
+__all__ = ["PARALLEL_THRESHOLD", "convert_statements", "dump_file", "split_statements"]
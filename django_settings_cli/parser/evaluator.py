@@ -0,0 +1,1014 @@
+"""
+Static partial evaluator: the effective values of a settings module from its AST alone,
+without importing it—or Django. Statements are evaluated in source order into a symbol
+table, folding constants, `os.environ`—an injectable mapping—`os.path` and `pathlib`
+calls, string concatenation, f-strings, `.format` and references to earlier names.
+Other settings modules—`from .base import *`—are followed, and evaluated once into a
+`ModuleCache`. Whatever cannot be evaluated is unknown, and is `None` in the values
+returned.
+"""
+
+import ast
+import operator
+import re
+from collections import OrderedDict
+from functools import partial
+from os import environ, linesep, path, pathsep, sep
+from string import Formatter
+from sys import modules
+from threading import Lock
+
+from django_settings_cli import get_logger
+from django_settings_cli.parser import _nameToLevel
+from django_settings_cli.parser.cache import _stat_key
+from django_settings_cli.parser.limits import (
+    CHECKED_METHODS,
+    MAX_SIZE,
+    TooLarge,
+    check_size,
+    checked_format,
+    checked_join,
+    checked_lshift,
+    checked_mod,
+    checked_mul,
+    checked_pow,
+)
+from django_settings_cli.parser.parser_utils import mutated_name
+from django_settings_cli.utils import env_digest, read_text
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+log = get_logger(modules[__name__].__name__)
+log.setLevel(_nameToLevel[environ.get("DJANGO_SETTING_CLI_LOG_LEVEL", "INFO")])
+
+
+class NotStatic(Exception):
+    """The expression cannot be evaluated statically"""
+
+
+class _Unknown(object):
+    def __repr__(self):
+        return "<unknown>"
+
+    def __reduce__(self):
+        return "UNKNOWN"
+
+
+UNKNOWN = _Unknown()
+
+
+class Namespace(object):
+    """A module, reduced to the attributes that are safe to evaluate"""
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def __repr__(self):
+        return "<namespace {}>".format(self.name)
+
+
+class _Environ(MutableMapping):
+    """
+    `os.environ` of one evaluation: reads `env`, recording the names read, and writes
+    into a layer over it—so `env`, shared with other evaluations, is never mutated
+    """
+
+    def __init__(self, env):
+        self.env = env
+        # Name to value written; `None` once deleted
+        self.written = {}
+        # Names read from `env`; `None` once all of it is, e.g., by `dict(os.environ)`
+        self.names = set()
+
+    def read(self, names):
+        """Record the `names` read from `env`; `None` for all of it"""
+        if names is None:
+            self.names = None
+        elif self.names is not None:
+            self.names.update(name for name in names if name not in self.written)
+
+    def mapping(self):
+        """`env`, as written, without recording any read"""
+        if not self.written:
+            return self.env
+        env = dict(self.env)
+        for name, value in self.written.items():
+            if value is None:
+                env.pop(name, None)
+            else:
+                env[name] = value
+        return env
+
+    def __getitem__(self, name):
+        if name in self.written:
+            value = self.written[name]
+        else:
+            self.read((name,))
+            value = self.env.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name, value):
+        self.written[name] = value
+
+    def __delitem__(self, name):
+        self[name]
+        self.written[name] = None
+
+    def __iter__(self):
+        self.read(None)
+        return iter(self.mapping())
+
+    def __len__(self):
+        self.read(None)
+        return len(self.mapping())
+
+    def copy(self):
+        return dict(self)
+
+    def __repr__(self):
+        return "<environ>"
+
+
+class _SafeFormatter(Formatter):
+    """
+    `str.format`, without access to private attributes of its arguments, nor results
+    larger than `MAX_SIZE`; one per call, as it counts the characters formatted
+    """
+
+    def __init__(self):
+        self.size = 0
+
+    def get_field(self, field_name, args, kwargs):
+        if any(part.startswith("_") for part in re.split(r"[.\[]", field_name)[1:]):
+            raise NotStatic("Private attribute in format field: {}".format(field_name))
+        return super(_SafeFormatter, self).get_field(field_name, args, kwargs)
+
+    def format_field(self, value, format_spec):
+        field = checked_format(value, format_spec)
+        self.size += len(field)
+        if self.size > MAX_SIZE:
+            raise TooLarge()
+        return field
+
+
+_SAFE_BUILTINS = {
+    f.__name__: f
+    for f in (
+        abs,
+        bool,
+        dict,
+        float,
+        frozenset,
+        int,
+        len,
+        list,
+        max,
+        min,
+        round,
+        set,
+        sorted,
+        str,
+        tuple,
+    )
+}
+
+_SAFE_METHODS = {
+    str: frozenset(
+        (
+            "capitalize",
+            "encode",
+            "endswith",
+            "format",
+            "join",
+            "lower",
+            "lstrip",
+            "partition",
+            "replace",
+            "rpartition",
+            "rsplit",
+            "rstrip",
+            "split",
+            "splitlines",
+            "startswith",
+            "strip",
+            "title",
+            "upper",
+        )
+    ),
+    bytes: frozenset(("decode",)),
+    dict: frozenset(("copy", "get", "items", "keys", "values")),
+    _Environ: frozenset(("copy", "get", "items", "keys", "values")),
+    list: frozenset(("copy", "count", "index")),
+    tuple: frozenset(("count", "index")),
+}
+
+_SAFE_PATH_ATTRIBUTES = frozenset(
+    (
+        "absolute",
+        "anchor",
+        "as_posix",
+        "joinpath",
+        "name",
+        "parent",
+        "parents",
+        "parts",
+        "relative_to",
+        "resolve",
+        "stem",
+        "suffix",
+        "suffixes",
+        "with_name",
+        "with_suffix",
+    )
+)
+
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.LShift: checked_lshift,
+    ast.Mod: checked_mod,
+    ast.Mult: checked_mul,
+    ast.Pow: checked_pow,
+    ast.RShift: operator.rshift,
+    ast.Sub: operator.sub,
+}
+
+_UNARY_OPERATORS = {
+    ast.Invert: operator.invert,
+    ast.Not: operator.not_,
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+_COMPARISON_OPERATORS = {
+    ast.Eq: operator.eq,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.NotEq: operator.ne,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+_CONVERSIONS = {-1: lambda value: value, 115: str, 114: repr, 97: ascii}
+
+
+def _namespaces(env):
+    """Importable modules, by name, with `os.environ` and `os.getenv` reading `env`"""
+    os_path = Namespace(
+        "os.path",
+        {
+            name: getattr(path, name)
+            for name in (
+                "abspath",
+                "basename",
+                "dirname",
+                "isabs",
+                "join",
+                "normpath",
+                "realpath",
+                "split",
+                "splitext",
+                "sep",
+            )
+        },
+    )
+    namespaces = {
+        "os": Namespace(
+            "os",
+            {
+                "environ": env,
+                "getenv": env.get,
+                "linesep": linesep,
+                "path": os_path,
+                "pathsep": pathsep,
+                "sep": sep,
+            },
+        ),
+        "os.path": os_path,
+    }
+    return namespaces
+
+
+def _pathlib():
+    """The `pathlib` namespace, imported only once a settings module imports it"""
+    try:
+        from pathlib import Path, PurePath
+    except ImportError:
+        return None
+    return Namespace("pathlib", {"Path": Path, "PurePath": PurePath})
+
+
+def _is_path(value):
+    """Whether `value` is a `pathlib` path—never, unless `pathlib` was imported"""
+    pathlib = modules.get("pathlib")
+    return pathlib is not None and isinstance(value, pathlib.PurePath)
+
+
+def mutated_names(node):
+    """Names whose values the method call statements in `node` may mutate"""
+    for node in ast.walk(node):
+        name = mutated_name(node)
+        if name is not None:
+            yield name
+
+
+def _escapes(environ, values):
+    """Whether `environ` is among `values`, or within any of their containers"""
+    stack, seen = list(values), set()
+    while stack:
+        value = stack.pop()
+        if value is environ:
+            return True
+        elif isinstance(value, (dict, list, tuple, set, frozenset)):
+            if id(value) not in seen:
+                seen.add(id(value))
+                stack.extend(value.values() if isinstance(value, dict) else value)
+    return False
+
+
+def bound_names(node):
+    """Names that the statement—or assignment target—`node` may bind or mutate"""
+    for name in mutated_names(node):
+        yield name
+    for node in ast.walk(node):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            yield node.id
+        elif isinstance(node, ast.Subscript) and isinstance(node.ctx, ast.Store):
+            value = node.value
+            while isinstance(value, ast.Subscript):
+                value = value.value
+            if isinstance(value, ast.Name):
+                yield value.id
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name != "*":
+                    yield (alias.asname or alias.name).partition(".")[0]
+        elif isinstance(
+            node, (ast.FunctionDef, ast.ClassDef, getattr(ast, "AsyncFunctionDef", ()))
+        ):
+            yield node.name
+
+
+def _copy(value):
+    """Copy the containers of `value`, so that an importer cannot mutate its module"""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        return type(value)(map(_copy, value))
+    elif isinstance(value, _Environ):
+        # Its evaluation recorded reading all of it, by `_escapes`
+        return dict(value.mapping())
+    return value
+
+
+def to_python(value, keep_sets=False):
+    """
+    Convert an evaluated value for output: paths to strings, sets to lists—unless
+    `keep_sets`—and whatever is unknown—or is a module or function—to `None`
+    """
+    if isinstance(value, dict):
+        return {
+            to_python(k, keep_sets): to_python(v, keep_sets) for k, v in value.items()
+        }
+    elif isinstance(value, (list, tuple)):
+        return type(value)(to_python(v, keep_sets) for v in value)
+    elif isinstance(value, (set, frozenset)):
+        if keep_sets:
+            return type(value)(to_python(v, keep_sets) for v in value)
+        return [to_python(v) for v in value]
+    elif isinstance(value, _Environ):
+        return to_python(dict(value.mapping()), keep_sets)
+    elif _is_path(value):
+        return str(value)
+    elif value is UNKNOWN or isinstance(value, Namespace) or callable(value):
+        return None
+    return value
+
+
+def setting_names(symbols):
+    """
+    The names of the settings among the evaluated `symbols`, in order: those a star
+    import binds, but modules, functions and classes
+
+    :param symbols: Name to evaluated value
+    :type symbols: ```Mapping[str, Any]```
+
+    :rtype: ```List[str]```
+    """
+    return [
+        name
+        for name, value in symbols.items()
+        if not name.startswith("_")
+        and not isinstance(value, Namespace)
+        and not callable(value)
+    ]
+
+
+class _Module(object):
+    __slots__ = ("env_names", "env_digest", "symbols", "stat_keys")
+
+    def __init__(self, env_names, env_digest, symbols, stat_keys):
+        # Names read from the environment—`None` for all of it—and their digest
+        self.env_names = env_names
+        self.env_digest = env_digest
+        self.symbols = symbols
+        # `stat` of the module, and of every module it imports, transitively
+        self.stat_keys = stat_keys
+
+
+class ModuleCache(object):
+    """
+    Evaluated symbols of settings modules, by filename. An entry is invalidated when
+    its module—or any module it imports, transitively—changes on disk, or when any
+    environment variable it read differs. Thread-safe, and bounded to the
+    `max_modules` most recently used.
+    """
+
+    def __init__(self, max_modules=128):
+        self.max_modules = max_modules
+        self.modules = OrderedDict()
+        self._lock = Lock()
+
+    def _valid(self, module, env):
+        if env_digest(env, module.env_names) != module.env_digest:
+            return False
+        try:
+            return all(
+                _stat_key(filename) == stat_key
+                for filename, stat_key in module.stat_keys.items()
+            )
+        except OSError:
+            return False
+
+    def get(self, filename, env, importing=frozenset()):
+        """
+        Evaluate the module `filename`, or get its cached evaluation
+
+        :param filename: Settings module filename
+        :type filename: ```str```
+
+        :param env: Environment seen by `os.environ` and `os.getenv`
+        :type env: ```dict```
+
+        :param importing: Modules being imported, to break circular imports
+        :type importing: ```frozenset```
+
+        :return: The evaluated module
+        :rtype: ```_Module```
+        """
+        filename = path.abspath(filename)
+        with self._lock:
+            module = self.modules.pop(filename, None)
+            if module is not None:
+                # Reinsert as the most recently used
+                self.modules[filename] = module
+        if module is not None and self._valid(module, env):
+            return module
+        elif filename in importing:
+            raise NotStatic("Circular import of {}".format(filename))
+
+        # Evaluated outside the lock, as it imports—so gets—other modules; threads
+        # racing on one module evaluate it more than once, to the same symbols
+        stat_key = _stat_key(filename)
+        source = read_text(filename)
+        evaluator = StaticEvaluator(
+            env=env, filename=filename, modules=self, importing=importing
+        )
+        symbols = evaluator.run(ast.parse(source, filename=filename))
+        evaluator.stat_keys[filename] = stat_key
+        env_names = evaluator.env_names
+        module = _Module(
+            env_names, env_digest(env, env_names), symbols, evaluator.stat_keys
+        )
+        with self._lock:
+            self.modules.pop(filename, None)
+            self.modules[filename] = module
+            while len(self.modules) > self.max_modules:
+                self.modules.popitem(last=False)
+        log.debug("evaluated module: {} ;".format(filename))
+        return module
+
+    def clear(self):
+        with self._lock:
+            self.modules.clear()
+
+
+# Shared by the evaluations in this process, e.g., of many leaves of one base module
+modules_cache = ModuleCache()
+
+
+class StaticEvaluator(object):
+    """
+    Evaluate a settings module, statement by statement, into `symbols`
+
+    :param env: Environment seen by `os.environ` and `os.getenv`; default the process's
+    :type env: ```Optional[Mapping[str, str]]```
+
+    :param filename: Filename of the module, for `__file__` and relative imports
+    :type filename: ```Optional[str]```
+
+    :param modules: Cache of the settings modules imported; default `modules_cache`
+    :type modules: ```Optional[ModuleCache]```
+
+    :param importing: Modules being imported, to break circular imports
+    :type importing: ```frozenset```
+    """
+
+    def __init__(self, env=None, filename=None, modules=None, importing=frozenset()):
+        # Shared—e.g., with the modules imported, and the `ModuleCache`—so never written
+        self.env = dict(environ) if env is None else env
+        self.environ = _Environ(self.env)
+        self.namespaces = _namespaces(self.environ)
+        self.filename = None if filename is None else path.abspath(filename)
+        self.modules = modules_cache if modules is None else modules
+        self.importing = importing | frozenset((self.filename,))
+        # `stat` of each settings module imported, transitively
+        self.stat_keys = {}
+        self.symbols = {}
+        if filename is not None:
+            self.symbols["__file__"] = self.filename
+
+    def _module_filename(self, module, level):
+        """The file of the settings module `module`, relative to `level` packages up"""
+        parts = module.split(".") if module else []
+        if level:
+            if self.filename is None:
+                return None
+            root = path.dirname(self.filename)
+            for _ in range(level - 1):
+                root = path.dirname(root)
+            roots = (root,)
+        else:
+            # The directory containing the outermost package of this module, else cwd
+            root = path.dirname(self.filename or path.abspath("settings.py"))
+            while path.isfile(path.join(root, "__init__.py")):
+                root = path.dirname(root)
+            roots = (root, path.abspath(""))
+        for root in roots:
+            candidate = path.join(root, *parts)
+            for filename in candidate + ".py", path.join(candidate, "__init__.py"):
+                if path.isfile(filename):
+                    return filename
+        return None
+
+    def _import(self, stmt):
+        """The evaluated settings module imported from by `stmt`, else `None`"""
+        filename = self._module_filename(stmt.module, stmt.level)
+        if filename is None:
+            log.debug("evaluator: cannot find module {!r} ;".format(stmt.module))
+            return None
+        try:
+            module = self.modules.get(filename, self.environ.mapping(), self.importing)
+        except (NotStatic, SyntaxError, IOError, OSError) as e:
+            log.debug("evaluator: cannot import {}: {} ;".format(filename, e))
+            return None
+        self.stat_keys.update(module.stat_keys)
+        self.environ.read(module.env_names)
+        return module
+
+    def _namespace(self, name, default=None):
+        """The namespace of the module `name`, `default` if not one of `_namespaces`"""
+        if name == "pathlib" and name not in self.namespaces:
+            namespace = _pathlib()
+            if namespace is not None:
+                self.namespaces[name] = namespace
+        return self.namespaces.get(name, default)
+
+    def _import_from(self, stmt):
+        namespace = self._namespace(stmt.module) if not stmt.level else None
+        module = None if namespace is not None else self._import(stmt)
+        if namespace is not None:
+            attributes = namespace.attributes
+        elif module is not None:
+            attributes = module.symbols
+        else:
+            attributes = {}
+
+        for alias in stmt.names:
+            if alias.name != "*":
+                self.symbols[alias.asname or alias.name] = _copy(
+                    attributes.get(alias.name, UNKNOWN)
+                )
+            elif module is None:
+                log.debug("evaluator: star import of {} ;".format(stmt.module))
+            else:
+                names = module.symbols.get("__all__")
+                if not isinstance(names, (list, tuple)):
+                    names = (
+                        name for name in module.symbols if not name.startswith("_")
+                    )
+                for name in names:
+                    self.symbols[name] = _copy(module.symbols.get(name, UNKNOWN))
+
+    def _augmented(self, stmt):
+        """`target op= value`, evaluated—without mutating—as `target = target op value`"""
+        op = _BINARY_OPERATORS.get(type(stmt.op))
+        try:
+            if op is None:
+                raise NotStatic(type(stmt.op).__name__)
+            current = self.evaluate(
+                ast.Name(id=stmt.target.id, ctx=ast.Load())
+                if isinstance(stmt.target, ast.Name)
+                else ast.Subscript(
+                    value=stmt.target.value, slice=stmt.target.slice, ctx=ast.Load()
+                )
+            )
+            value = check_size(op(current, self.evaluate(stmt.value)))
+        except Exception as e:
+            log.debug("evaluator: {}: {} ;".format(type(e).__name__, e))
+            self.forget(stmt)
+        else:
+            self.bind(stmt.target, value)
+
+    def run(self, module):
+        """
+        Evaluate each statement of `module`, in order
+
+        :param module: Parsed settings module
+        :type module: ```ast.Module```
+
+        :return: Name to value—`UNKNOWN` where it cannot be evaluated—of every name
+          bound at the top level
+        :rtype: ```dict```
+        """
+        for stmt in module.body:
+            self.execute(stmt)
+        if _escapes(self.environ, self.symbols.values()):
+            # e.g., `ENV = os.environ`: a setting holding all of it
+            self.environ.read(None)
+        return self.symbols
+
+    @property
+    def env_names(self):
+        """
+        The names read from `env`, e.g., by `os.environ.get("DEBUG")`—including by the
+        modules imported—so far; `None` when all of it was
+
+        :rtype: ```Optional[frozenset]```
+        """
+        names = self.environ.names
+        return None if names is None else frozenset(names)
+
+    def execute(self, stmt):
+        """Evaluate the statement `stmt` into `symbols`"""
+        if isinstance(stmt, ast.Assign):
+            value = self.evaluate_or_unknown(stmt.value)
+            for target in stmt.targets:
+                self.bind(target, value)
+        elif isinstance(stmt, getattr(ast, "AnnAssign", ())) and stmt.value:
+            self.bind(stmt.target, self.evaluate_or_unknown(stmt.value))
+        elif isinstance(stmt, ast.Import):
+            for alias in stmt.names:
+                if alias.asname is None:
+                    name = alias.name.partition(".")[0]
+                    namespace = self._namespace(name, UNKNOWN)
+                else:
+                    name = alias.asname
+                    namespace = self._namespace(alias.name, UNKNOWN)
+                self.symbols[name] = namespace
+        elif isinstance(stmt, ast.ImportFrom):
+            self._import_from(stmt)
+        elif isinstance(stmt, ast.AugAssign) and isinstance(
+            stmt.target, (ast.Name, ast.Subscript)
+        ):
+            self._augmented(stmt)
+        elif isinstance(stmt, ast.If):
+            try:
+                test = self.evaluate(stmt.test)
+            except NotStatic:
+                self.forget(stmt)
+            else:
+                for s in stmt.body if test else stmt.orelse:
+                    self.execute(s)
+        elif not isinstance(stmt, ast.Pass):
+            # e.g., `try`, `for`, `def`, or `X.append(…)`: whatever they bind, or
+            # mutate, is unknown
+            self.forget(stmt)
+
+    def forget(self, node):
+        """Make whatever `node` binds, or mutates, unknown"""
+        mutated = frozenset(mutated_names(node))
+        for name in bound_names(node):
+            if name in mutated and isinstance(self.symbols.get(name), Namespace):
+                # e.g., `os.makedirs(…)`: calls into a module, leaving settings be
+                continue
+            self.symbols[name] = UNKNOWN
+
+    def bind(self, target, value):
+        if isinstance(target, ast.Name):
+            self.symbols[target.id] = value
+        elif isinstance(target, ast.Subscript):
+            try:
+                container = self.evaluate(target.value)
+                if not isinstance(container, (dict, list, _Environ)):
+                    raise NotStatic(type(container).__name__)
+                container[self.evaluate(_slice(target))] = value
+                self._check_root(target)
+            except (NotStatic, LookupError, TooLarge, TypeError) as e:
+                log.debug("evaluator: cannot assign {!r}: {} ;".format(target, e))
+                self.forget(target)
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            try:
+                values = None if value is UNKNOWN else list(value)
+            except TypeError:
+                values = None
+            if values is None or len(values) != len(target.elts):
+                self.forget(target)
+            else:
+                for elt, v in zip(target.elts, values):
+                    self.bind(elt, v)
+
+    def _check_root(self, target):
+        """
+        Check the name assigned into by `target`, e.g., `D` of `D["a"]["b"] = X`: each
+        such assignment may grow it—by an alias, or even into a cycle—unchecked
+        """
+        while isinstance(target, ast.Subscript):
+            target = target.value
+        if isinstance(target, ast.Name):
+            check_size(self.symbols.get(target.id))
+
+    def evaluate_or_unknown(self, node):
+        try:
+            return self.evaluate(node)
+        except NotStatic as e:
+            log.debug("evaluator: {} ;".format(e))
+            return UNKNOWN
+
+    def _element(self, node):
+        """Evaluate an element of a collection; unknown elements are `None`"""
+        value = self.evaluate_or_unknown(node)
+        return None if value is UNKNOWN else value
+
+    def evaluate(self, node):
+        """
+        Evaluate the expression `node`
+
+        :param node: AST expression
+        :type node: ```ast.expr```
+
+        :return: Its value
+        :rtype: ```Any```
+
+        :raises NotStatic: When it cannot be evaluated statically
+        """
+        method = getattr(self, "evaluate_{}".format(type(node).__name__), None)
+        if method is None:
+            raise NotStatic(type(node).__name__)
+        try:
+            # Names are checked as bound
+            value = method(node)
+            return value if isinstance(node, ast.Name) else check_size(value)
+        except NotStatic:
+            raise
+        except Exception as e:
+            # The expression itself fails, e.g., `"a" + 1` or `{}["missing"]`
+            raise NotStatic("{}: {}".format(type(e).__name__, e))
+
+    def evaluate_Constant(self, node):
+        return node.value
+
+    def evaluate_Str(self, node):
+        return node.s
+
+    def evaluate_Bytes(self, node):
+        return node.s
+
+    def evaluate_Num(self, node):
+        return node.n
+
+    def evaluate_NameConstant(self, node):
+        return node.value
+
+    def evaluate_Name(self, node):
+        if node.id in self.symbols:
+            value = self.symbols[node.id]
+            if value is UNKNOWN:
+                raise NotStatic("{} is unknown".format(node.id))
+            return value
+        elif node.id in _SAFE_BUILTINS:
+            return _SAFE_BUILTINS[node.id]
+        raise NotStatic("{} is undefined".format(node.id))
+
+    def evaluate_List(self, node):
+        return [
+            item
+            for elt in node.elts
+            for item in (
+                self.evaluate(elt.value)
+                if isinstance(elt, ast.Starred)
+                else (self._element(elt),)
+            )
+        ]
+
+    def evaluate_Tuple(self, node):
+        return tuple(self.evaluate_List(node))
+
+    def evaluate_Set(self, node):
+        return set(self.evaluate_List(node))
+
+    def evaluate_Dict(self, node):
+        d = {}
+        for key, value in zip(node.keys, node.values):
+            if key is None:
+                d.update(self.evaluate(value))
+                continue
+            key = self.evaluate_or_unknown(key)
+            if key is not UNKNOWN:
+                d[key] = self._element(value)
+        return d
+
+    def evaluate_JoinedStr(self, node):
+        return checked_join("", map(self.evaluate, node.values))
+
+    def evaluate_FormattedValue(self, node):
+        value = _CONVERSIONS[node.conversion](self.evaluate(node.value))
+        return checked_format(
+            value, "" if node.format_spec is None else self.evaluate(node.format_spec)
+        )
+
+    def evaluate_BinOp(self, node):
+        op = _BINARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise NotStatic(type(node.op).__name__)
+        return op(self.evaluate(node.left), self.evaluate(node.right))
+
+    def evaluate_UnaryOp(self, node):
+        return _UNARY_OPERATORS[type(node.op)](self.evaluate(node.operand))
+
+    def evaluate_BoolOp(self, node):
+        is_and = isinstance(node.op, ast.And)
+        for value in node.values:
+            value = self.evaluate(value)
+            if bool(value) != is_and:
+                return value
+        return value
+
+    def evaluate_Compare(self, node):
+        left = self.evaluate(node.left)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = self.evaluate(comparator)
+            if not _COMPARISON_OPERATORS[type(op)](left, right):
+                return False
+            left = right
+        return True
+
+    def evaluate_IfExp(self, node):
+        return self.evaluate(node.body if self.evaluate(node.test) else node.orelse)
+
+    def evaluate_Subscript(self, node):
+        return self.evaluate(node.value)[self.evaluate(_slice(node))]
+
+    def evaluate_Slice(self, node):
+        return slice(
+            *(
+                None if part is None else self.evaluate(part)
+                for part in (node.lower, node.upper, node.step)
+            )
+        )
+
+    def evaluate_Attribute(self, node):
+        value = self.evaluate(node.value)
+        if isinstance(value, Namespace):
+            if node.attr in value.attributes:
+                return value.attributes[node.attr]
+        elif isinstance(value, str) and node.attr in ("format", "format_map"):
+            return (
+                (lambda *args, **kwargs: _SafeFormatter().vformat(value, args, kwargs))
+                if node.attr == "format"
+                else (lambda mapping: _SafeFormatter().vformat(value, (), mapping))
+            )
+        elif isinstance(value, str) and node.attr in CHECKED_METHODS:
+            return partial(CHECKED_METHODS[node.attr], value)
+        elif node.attr in _SAFE_METHODS.get(type(value), ()) or (
+            _is_path(value) and node.attr in _SAFE_PATH_ATTRIBUTES
+        ):
+            return getattr(value, node.attr)
+        raise NotStatic("{}.{}".format(type(value).__name__, node.attr))
+
+    def evaluate_Call(self, node):
+        # Callables are only ever obtained from the allowed builtins, namespaces and
+        # methods, so whatever `func` evaluates to is safe to call
+        func = self.evaluate(node.func)
+        if not callable(func) or isinstance(func, Namespace):
+            raise NotStatic("{!r} is not callable".format(func))
+        args = []
+        for arg in node.args:
+            if isinstance(arg, ast.Starred):
+                args.extend(self.evaluate(arg.value))
+            else:
+                args.append(self.evaluate(arg))
+        kwargs = {}
+        for keyword in node.keywords:
+            if keyword.arg is None:
+                kwargs.update(self.evaluate(keyword.value))
+            else:
+                kwargs[keyword.arg] = self.evaluate(keyword.value)
+        return func(*args, **kwargs)
+
+
+class OverlayEvaluator(StaticEvaluator):
+    """
+    Evaluate a settings module as a copy-on-write layer over an evaluated `base`
+    module, whose symbols are shared, never copied nor mutated: `symbols` holds only
+    the names the overlay binds, then falls back to the base's. A container is copied—
+    shallowly, its elements still shared—only when assigned into, along with the
+    containers enclosing it; so each overlay costs the size of its overrides.
+
+    :param base: Evaluated base module, e.g., of `ModuleCache.get`
+    :type base: ```_Module```
+
+    :param base_filename: Filename of the base module; importing from it binds its
+      symbols without copying them
+    :type base_filename: ```str```
+    """
+
+    def __init__(self, base, base_filename, **kwargs):
+        from collections import ChainMap
+
+        super(OverlayEvaluator, self).__init__(**kwargs)
+        self.base_filename = path.abspath(base_filename)
+        self.symbols = ChainMap(self.symbols, base.symbols)
+        # The containers copied into this layer, by `id`, which it alone may mutate
+        self._owned = {}
+
+    def _import_from(self, stmt):
+        filename = self._module_filename(stmt.module, stmt.level)
+        if filename is None or path.abspath(filename) != self.base_filename:
+            return super(OverlayEvaluator, self)._import_from(stmt)
+        base = self.symbols.maps[1]
+        for alias in stmt.names:
+            if alias.name != "*":
+                self.symbols[alias.asname or alias.name] = base.get(alias.name, UNKNOWN)
+
+    def _own(self, value):
+        if id(value) in self._owned or not isinstance(value, (dict, list)):
+            return value
+        value = type(value)(value)
+        self._owned[id(value)] = value
+        return value
+
+    def _writable(self, node):
+        """The container `node` evaluates to, copied into this layer if it is shared"""
+        if isinstance(node, ast.Name):
+            value = self._own(self.evaluate(node))
+            self.symbols[node.id] = value
+            return value
+        elif isinstance(node, ast.Subscript):
+            parent = self._writable(node.value)
+            key = self.evaluate(_slice(node))
+            value = parent[key] = self._own(parent[key])
+            return value
+        return self.evaluate(node)
+
+    def bind(self, target, value):
+        if not isinstance(target, ast.Subscript):
+            return super(OverlayEvaluator, self).bind(target, value)
+        try:
+            container = self._writable(target.value)
+            if not isinstance(container, (dict, list, _Environ)):
+                raise NotStatic(type(container).__name__)
+            container[self.evaluate(_slice(target))] = value
+            self._check_root(target)
+        except (NotStatic, LookupError, TooLarge, TypeError) as e:
+            log.debug("evaluator: cannot assign {!r}: {} ;".format(target, e))
+            self.forget(target)
+
+
+def _slice(node):
+    """The slice expression of the subscript `node` (wrapped in `ast.Index` before 3.9)"""
+    return (
+        node.slice.value
+        if isinstance(node.slice, getattr(ast, "Index", ()))
+        else node.slice
+    )
+
+
+__all__ = [
+    "ModuleCache",
+    "Namespace",
+    "NotStatic",
+    "OverlayEvaluator",
+    "StaticEvaluator",
+    "UNKNOWN",
+    "bound_names",
+    "modules_cache",
+    "mutated_names",
+    "setting_names",
+    "to_python",
+]
@@ -0,0 +1,173 @@
+"""
+Bounds on the values built from settings—by the static evaluator, and by `--format`
+templates: their size, and the operators, format specs and `str` methods that could
+build a much larger one in a single step. Kept free of the evaluator, and of `pathlib`,
+so that rendering a template imports neither.
+"""
+
+import operator
+import re
+
+# Results beyond this many items—characters, elements, or bits of an int—are too large,
+# the items of nested containers counted as often as they recur (see `size`).
+# The operations that could build a much larger one in a single step—e.g.,
+# `"x" * 10 ** 9` or `f"{1:>999999999}"`—are checked before they run.
+# So the text of any value, e.g., as formatted by `str` or `%s`, is bounded too
+MAX_SIZE = 1 << 20
+
+
+class TooLarge(ValueError):
+    """The result would be larger than `MAX_SIZE` items"""
+
+    def __init__(self):
+        super(TooLarge, self).__init__("Result larger than {:d} items".format(MAX_SIZE))
+
+
+def size(value, limit=MAX_SIZE):
+    """
+    The items of `value`: the characters of a string or path, the bytes of an int, or
+    the elements of a container plus, recursively, their items. A container referenced
+    more than once is counted each time, as when formatted, so `[[0] * 1000] * 1000`
+    is a million items. Counting stops—and so does a cycle—once past `limit`.
+
+    :param value: Any value
+    :type value: ```Any```
+
+    :param limit: Count no further than this
+    :type limit: ```int```
+
+    :return: The number of items, at most a little past `limit`
+    :rtype: ```int```
+    """
+    total = 0
+    stack = [value]
+    while stack and total <= limit:
+        value = stack.pop()
+        if isinstance(value, (str, bytes)):
+            total += len(value)
+        elif isinstance(value, int):
+            total += value.bit_length() // 8
+        elif isinstance(value, dict):
+            total += len(value)
+            if total <= limit:
+                stack.extend(value.keys())
+                stack.extend(value.values())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            total += len(value)
+            if total <= limit:
+                stack.extend(value)
+        elif getattr(value, "__fspath__", None) is not None:
+            total += len(str(value))
+    return total
+
+
+def check_size(value):
+    """`value`, unless larger than `MAX_SIZE`"""
+    if (isinstance(value, int) and value.bit_length() > MAX_SIZE) or size(
+        value
+    ) > MAX_SIZE:
+        raise TooLarge()
+    return value
+
+
+# The width and precision of a format spec, e.g., `0>8` or `.3f`
+_FORMAT_SPEC = re.compile(r"(?:.?[<>=^])?[-+ ]?z?#?0?(\d*)[,_]?(?:\.(\d+))?")
+
+# The width and precision of a `%` conversion, e.g., `%(name)-8s` or `%.*f`
+_PERCENT_SPEC = re.compile(r"%(?:\([^)]*\))?[-#0 +]*(\*|\d*)(?:\.(\*|\d*))?")
+
+
+def checked_format(value, format_spec):
+    """`format`, its width and precision checked"""
+    match = _FORMAT_SPEC.match(format_spec)
+    if match is not None and any(n and int(n) > MAX_SIZE for n in match.groups()):
+        raise TooLarge()
+    return format(value, format_spec)
+
+
+def checked_mul(left, right):
+    """`*`, its repetitions checked"""
+    for sequence, times in ((left, right), (right, left)):
+        if isinstance(sequence, (str, bytes, list, tuple)) and isinstance(times, int):
+            if size(sequence) * times > MAX_SIZE:
+                raise TooLarge()
+    return operator.mul(left, right)
+
+
+def checked_pow(left, right):
+    """`**`, on ints, its bits checked"""
+    if (
+        isinstance(left, int)
+        and isinstance(right, int)
+        and (left.bit_length() - 1) * right > MAX_SIZE
+    ):
+        raise TooLarge()
+    return operator.pow(left, right)
+
+
+def checked_lshift(left, right):
+    """`<<`, on ints, its bits checked"""
+    if (
+        isinstance(left, int)
+        and isinstance(right, int)
+        and left.bit_length() + right > MAX_SIZE
+    ):
+        raise TooLarge()
+    return operator.lshift(left, right)
+
+
+def checked_mod(left, right):
+    """`%`, on numbers—or formatting, its widths and repetitions checked"""
+    if isinstance(left, (str, bytes)):
+        specs = _PERCENT_SPEC.findall(
+            left.decode("latin-1") if isinstance(left, bytes) else left
+        )
+        if any(
+            "*" in spec or any(n and int(n) > MAX_SIZE for n in spec) for spec in specs
+        ):
+            raise TooLarge()
+        if isinstance(right, dict):
+            args = list(right.values())
+        else:
+            args = right if isinstance(right, tuple) else (right,)
+        # Each conversion may format any one argument—by name, as often as not
+        if len(specs) * max([size(arg) for arg in args] or [0]) > MAX_SIZE:
+            raise TooLarge()
+    return operator.mod(left, right)
+
+
+def checked_join(sep, iterable):
+    """`sep.join(iterable)`, its length checked"""
+    items = list(iterable)
+    if sum(map(len, items)) + len(sep) * max(len(items) - 1, 0) > MAX_SIZE:
+        raise TooLarge()
+    return sep.join(items)
+
+
+def checked_replace(s, old, new, count=-1):
+    """`s.replace(old, new, count)`, its length checked"""
+    times = s.count(old)
+    if count >= 0:
+        times = min(times, count)
+    if len(s) + times * (len(new) - len(old)) > MAX_SIZE:
+        raise TooLarge()
+    return s.replace(old, new, count)
+
+
+# The `str` methods that could build a result larger than `MAX_SIZE` in one call
+CHECKED_METHODS = {"join": checked_join, "replace": checked_replace}
+
+__all__ = [
+    "CHECKED_METHODS",
+    "MAX_SIZE",
+    "TooLarge",
+    "check_size",
+    "checked_format",
+    "checked_join",
+    "checked_lshift",
+    "checked_mod",
+    "checked_mul",
+    "checked_pow",
+    "checked_replace",
+    "size",
+]
@@ -1,8 +1,6 @@
 # from typing import Hashable
 import ast
-from itertools import takewhile
 from os import environ
-from string import ascii_letters, digits
 from sys import modules, version
 
 from django_settings_cli import get_logger
@@ -18,6 +16,33 @@ log.setLevel(_nameToLevel[environ.get("DJANGO_SETTING_CLI_LOG_LEVEL", "INFO")])
 
 raw_types = frozenset(("str", "unicode", "int", "long", "type(None)"))
 
+# What Python 3.8+ parses every literal to; checked by `type`, as `isinstance` against
+# the deprecated `ast.Str` and `ast.Num` is slow
+_Constant = getattr(ast, "Constant", None)
+
+
+def mutated_name(node):
+    """
+    The name whose value the method call statement `node` may mutate, e.g.,
+    `INSTALLED_APPS` of `INSTALLED_APPS.append(…)` or `LOGGING["loggers"].update(…)`
+
+    :param node: Statement
+    :type node: ```ast.stmt```
+
+    :return: The root name of the call's receiver; `None` if not a method call
+    :rtype: ```Optional[str]```
+    """
+    if not (
+        isinstance(node, ast.Expr)
+        and isinstance(node.value, ast.Call)
+        and isinstance(node.value.func, ast.Attribute)
+    ):
+        return None
+    value = node.value.func.value
+    while isinstance(value, (ast.Attribute, ast.Subscript)):
+        value = value.value
+    return value.id if isinstance(value, ast.Name) else None
+
 
 def get_value(node):
     if type(node) in raw_types:
@@ -48,6 +73,22 @@ def astdict_to_dict(node):
     return dict(zip(map(get_value, node.keys), map(get_value, node.values)))
 
 
+def get_subscript_key(node):
+    """
+    Get the key of a subscript, e.g., `"k"` from `A["k"]`
+
+    :param node: AST subscript node
+    :type node: ```ast.Subscript```
+
+    :return: Python value of the key
+    :rtype: ```Any```
+    """
+    # `ast.Index` was removed in Python 3.9, the slice is now the node itself
+    return get_value(
+        node.slice.value if type(node.slice).__name__ == "Index" else node.slice
+    )
+
+
 def collection_to_value(node):
     if type(node) in raw_types:
         return node
@@ -70,48 +111,107 @@ def resolve_collection(node):
     return map(it, node)
 
 
-def node_to_python(node):
-    if isinstance(node.value, ast.Dict):
-        return astdict_to_dict(node.value)
-    elif isinstance(node.value, ast.Str):
-        return node.value.s
-    elif isinstance(node.value, ast.Num):
-        return node.value.n
-    elif isinstance(node.value, ast.List):
-        return list(resolve_collection(node.value.elts))
-    elif isinstance(node.value, ast.Tuple):
-        return tuple(resolve_collection(node.value.elts))
-    elif version[0] == "3" and isinstance(node.value, (ast.Constant, ast.NameConstant)):
-        return node.value.value
+def expr_to_python(node):
+    """
+    Convert a literal expression—and, recursively, its elements—to Python
+
+    :param node: AST expression
+    :type node: ```ast.expr```
+
+    :return: Python value; `None` for non-literals
+    :rtype: ```Any```
+    """
+    if type(node) is _Constant:
+        return node.value
+    elif isinstance(node, ast.Dict):
+        return dict(
+            (expr_to_python(key), expr_to_python(value))
+            for key, value in zip(node.keys, node.values)
+            # `None` keys are `**` unpackings, which cannot be resolved statically
+            if key is not None
+        )
+    elif isinstance(node, ast.Str):
+        return node.s
+    elif isinstance(node, ast.Num):
+        return node.n
+    elif isinstance(node, ast.List):
+        return list(map(expr_to_python, node.elts))
+    elif isinstance(node, ast.Tuple):
+        return tuple(map(expr_to_python, node.elts))
+    elif version[0] == "3" and isinstance(node, (ast.Constant, ast.NameConstant)):
+        return node.value
+    elif (
+        isinstance(node, ast.UnaryOp)
+        and isinstance(node.op, (ast.USub, ast.UAdd))
+        and isinstance(node.operand, ast.Num)
+    ):
+        return -node.operand.n if isinstance(node.op, ast.USub) else node.operand.n
     log.debug(
         "NotImplemented for: {value}, of type: {typ} ;".format(
-            value=node.value, typ=type(node.value)
+            value=node, typ=type(node)
         )
     )
 
 
-# From: https://stackoverflow.com/a/4285211
-def parenthetic_contents(s):
-    """Generate parenthesized contents in string as pairs (level, contents)."""
-    stack = []
-    for i, c in enumerate(s):
-        if c == "{":
-            stack.append(i)
-        elif c == "}" and stack:
-            start = stack.pop()
-            yield s[start + 1 : i]
+def is_literal(node):
+    """
+    Whether `expr_to_python` fully converts `node`: a literal, of literals
 
+    :param node: AST expression
+    :type node: ```ast.expr```
 
-def eval_parens(k, r, ref, no_eval):
-    num = sum(1 for _ in takewhile(lambda ch: ch in ascii_letters + digits, k))
+    :rtype: ```bool```
+    """
+    if type(node) is _Constant:
+        return True
+    elif isinstance(node, ast.Dict):
+        return all(key is not None for key in node.keys) and all(
+            map(is_literal, node.keys + node.values)
+        )
+    elif isinstance(node, (ast.List, ast.Tuple)):
+        return all(map(is_literal, node.elts))
+    elif isinstance(node, ast.UnaryOp):
+        return isinstance(node.op, (ast.USub, ast.UAdd)) and isinstance(
+            node.operand, ast.Num
+        )
+    return isinstance(node, (ast.Str, ast.Num)) or (
+        version[0] == "3" and isinstance(node, (ast.Constant, ast.NameConstant))
+    )
 
-    val = r[k[:num]]
-    if k[num:]:
-        if not no_eval:
-            evil = '"{}"{}'.format(
-                r[k[:num]], k[num:].replace(k[:num], '"{}"'.format(r[k[:num]]))
-            )
-            val = eval(evil, r)
-        ref["format_str"] = ref["format_str"].replace(k, k[:num])
 
-    return k[:num], val
+def node_to_python(node):
+    return expr_to_python(node.value)
+
+
+def descend(node, keys):
+    """
+    Descend through dict, list and tuple literals along `keys`, without converting
+    anything but the dict keys compared along the way.
+
+    :param node: AST expression
+    :type node: ```ast.expr```
+
+    :param keys: Keys to descend, e.g., `("default", "ENGINE")`
+    :type keys: ```tuple```
+
+    :return: The node reached, and the keys that could not be descended statically
+    :rtype: ```Tuple[ast.expr, tuple]```
+    """
+    for i, key in enumerate(keys):
+        if isinstance(node, ast.Dict):
+            if not all(
+                isinstance(k, (ast.Str, ast.Num, ast.NameConstant)) for k in node.keys
+            ):
+                return node, keys[i:]
+            # Later duplicates win, as in the evaluated dict
+            for k, value in zip(reversed(node.keys), reversed(node.values)):
+                if get_value(k) == key:
+                    node = value
+                    break
+            else:
+                raise KeyError(key)
+        elif isinstance(node, (ast.List, ast.Tuple)) and isinstance(key, int):
+            node = node.elts[key]
+        else:
+            return node, keys[i:]
+    return node, ()
@@ -0,0 +1,475 @@
+"""
+Query engine: queries beyond `.NAME.key.key`—compiled once into steps, then matched
+against the assignments, walking the AST and converting only what matches.
+
+    .DATABASES.*.ENGINE             every database's engine
+    ..HOST                          every `HOST`, at any depth
+    .INSTALLED_APPS[0]              first app; also `[-1]` and slices, `[1:3]`
+    .DATABASES["default"]           quoted key, which may contain `.`
+    .DATABASES[?ENGINE =~ "mysql"]  databases whose engine matches the regex;
+                                    also `==`, `!=`, `<`, `<=`, `>`, `>=`, and `[?KEY]`
+
+A query of only keys and indexes resolves to one value, else to the list of values
+matched. `xpath` instead searches the whole AST, as XML, with astpath and lxml.
+"""
+
+import ast
+import operator
+import re
+from collections import OrderedDict, namedtuple
+from sys import version
+
+from django_settings_cli.parser.parser_utils import (
+    expr_to_python,
+    get_value,
+    is_literal,
+)
+
+Key = namedtuple("Key", ("key",))
+Index = namedtuple("Index", ("index",))
+Slice = namedtuple("Slice", ("slice",))
+Wildcard = namedtuple("Wildcard", ())
+Filter = namedtuple("Filter", ("keys", "op", "value"))
+Recursive = namedtuple("Recursive", ("step",))
+
+_COMPARISONS = OrderedDict(
+    (
+        ("==", operator.eq),
+        ("!=", operator.ne),
+        ("<=", operator.le),
+        (">=", operator.ge),
+        ("<", operator.lt),
+        (">", operator.gt),
+        ("=~", lambda value, pattern: re.search(pattern, value) is not None),
+    )
+)
+
+_FILTER = re.compile(
+    r"^\s*(?:@\.?)?(?P<path>[^\s=!<>~]*)\s*"
+    r"(?:(?P<op>{ops})\s*(?P<value>.+?))?\s*$".format(
+        ops="|".join(map(re.escape, _COMPARISONS))
+    )
+)
+
+_NAME_END = re.compile(r"[.\[]")
+
+_LITERAL_KEYS = (ast.Str, ast.Num) + ((ast.Constant,) if version[0] == "3" else ())
+
+
+def is_extended(query):
+    """
+    Whether `query` needs this engine, rather than a split on "."
+
+    :param query: Query string
+    :type query: ```str```
+
+    :rtype: ```bool```
+    """
+    return "*" in query or "[" in query or ".." in query
+
+
+def _bracket(query, pos):
+    """Parse the `[…]` at `pos`: the step, and the offset just past the `]`"""
+    quote, i = None, pos + 1
+    while i < len(query):
+        ch = query[i]
+        if quote:
+            if ch == "\\":
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "]":
+            break
+        i += 1
+    else:
+        raise ValueError("Unclosed '[' in query: {!r}".format(query))
+
+    inner = query[pos + 1 : i].strip()
+    if inner == "*":
+        step = Wildcard()
+    elif inner[:1] in "'\"" and len(inner) > 1:
+        step = Key(ast.literal_eval(inner))
+    elif inner.startswith("?"):
+        match = _FILTER.match(inner[1:])
+        if match is None or not match.group("path") and not match.group("op"):
+            raise ValueError("Invalid filter in query: {!r}".format(inner))
+        step = Filter(
+            tuple(match.group("path").split(".")) if match.group("path") else (),
+            match.group("op"),
+            (
+                None
+                if match.group("value") is None
+                else ast.literal_eval(match.group("value"))
+            ),
+        )
+    elif ":" in inner:
+        step = Slice(
+            slice(*(int(part) if part.strip() else None for part in inner.split(":")))
+        )
+    else:
+        try:
+            step = Index(int(inner))
+        except ValueError:
+            raise ValueError("Invalid index in query: {!r}".format(inner))
+    return step, i + 1
+
+
+def parse_query(query):
+    """
+    Parse `query` into its steps
+
+    :param query: Query string, e.g., `.DATABASES.*.ENGINE`
+    :type query: ```str```
+
+    :return: Steps
+    :rtype: ```Tuple[Union[Key, Index, Slice, Wildcard, Filter, Recursive], ...]```
+    """
+    if not query.startswith(".") and not query.startswith("["):
+        raise ValueError("Query must start with '.': {!r}".format(query))
+    steps, pos = [], 0
+    while pos < len(query):
+        recursive = query.startswith("..", pos)
+        if recursive:
+            pos += 2
+        elif query[pos] == ".":
+            pos += 1
+        if pos < len(query) and query[pos] == "[":
+            step, pos = _bracket(query, pos)
+        else:
+            match = _NAME_END.search(query, pos)
+            end = len(query) if match is None else match.start()
+            name = query[pos:end]
+            if not name:
+                if pos == len(query) and not steps and not recursive:
+                    break
+                raise ValueError("Empty key in query: {!r}".format(query))
+            step, pos = (Wildcard() if name == "*" else Key(name)), end
+        steps.append(Recursive(step) if recursive else step)
+    return tuple(steps)
+
+
+class _Root(object):
+    """The settings module: its children are the top-level names"""
+
+    __slots__ = ()
+
+
+_ROOT = _Root()
+
+
+class Query(object):
+    """
+    A compiled query
+
+    :param query: Query string
+    :type query: ```str```
+    """
+
+    __slots__ = ("query", "steps", "single", "names")
+
+    def __init__(self, query):
+        self.query = query
+        self.steps = parse_query(query)
+        self.single = all(isinstance(step, (Key, Index)) for step in self.steps)
+        # Top-level names the query may match, or `None` for any
+        self.names = (
+            frozenset((self.steps[0].key,))
+            if self.steps and isinstance(self.steps[0], Key)
+            else None
+        )
+
+    def __repr__(self):
+        return "{}({!r})".format(type(self).__name__, self.query)
+
+    def search(self, assignments, top_level, evaluate):
+        """
+        Match the query against the settings
+
+        :param assignments: Name to `(subkey, node)` pairs, as of `AssignQuerierVisitor`
+        :type assignments: ```OrderedDict```
+
+        :param top_level: The value—AST node or Python value—of a top-level name
+        :type top_level: ```Callable[[str], Any]```
+
+        :param evaluate: Statically evaluated value at keys; `_UNKNOWN` if unknown.
+          At the root, `[""]`, the settings, by name
+        :type evaluate: ```Callable[[List[str]], Any]```
+
+        :return: The value matched; or, unless `single`, the list of values matched
+        :rtype: ```Any```
+        """
+        walk = _Walk(assignments, top_level, evaluate)
+        matches = []
+        walk.search(self.steps, 0, _ROOT, (), matches)
+        if self.single:
+            if not matches:
+                raise KeyError(self.query)
+            return walk.value(*matches[0])
+        return [walk.value(node, path) for node, path in matches]
+
+
+class _Walk(object):
+    __slots__ = ("assignments", "top_level", "evaluate", "unknown", "names")
+
+    def __init__(self, assignments, top_level, evaluate):
+        from django_settings_cli.parser import _UNKNOWN
+
+        self.assignments = assignments
+        self.top_level = top_level
+        self.evaluate = evaluate
+        self.unknown = _UNKNOWN
+        self.names = None
+
+    def top_level_names(self):
+        """
+        The top-level names: those assigned; and, with star imports, every setting
+        they bring in too, as evaluated
+        """
+        if self.names is None:
+            names = [name for name in self.assignments if name != "*"]
+            if "*" in self.assignments:
+                settings = self.evaluate([""])
+                if settings is not self.unknown:
+                    names = list(settings) + [
+                        name for name in names if name not in settings
+                    ]
+            self.names = names
+        return self.names
+
+    def expand(self, node, path):
+        """`node`, evaluated if an AST expression that isn't a container literal"""
+        if isinstance(node, ast.AST) and not isinstance(
+            node, (ast.Dict, ast.List, ast.Tuple)
+        ):
+            if is_literal(node):
+                return expr_to_python(node)
+            value = self.evaluate(["", path[0]] + list(path[1:]))
+            return None if value is self.unknown else value
+        return node
+
+    def value(self, node, path):
+        """Convert the matched `node` to Python"""
+        if isinstance(node, ast.AST):
+            if is_literal(node):
+                return expr_to_python(node)
+            value = self.evaluate([""] + list(path))
+            return None if value is self.unknown else value
+        return node
+
+    def children(self, node, path):
+        """`(key, child)` of each child of `node`"""
+        if node is _ROOT:
+            return [(name, self.top_level(name)) for name in self.top_level_names()]
+        node = self.expand(node, path)
+        if isinstance(node, ast.Dict):
+            items = OrderedDict()
+            for key, value in zip(node.keys, node.values):
+                if isinstance(key, _LITERAL_KEYS):
+                    items[get_value(key)] = value
+            return list(items.items())
+        elif isinstance(node, (ast.List, ast.Tuple)):
+            return [
+                (i, elt)
+                for i, elt in enumerate(node.elts)
+                if not isinstance(elt, getattr(ast, "Starred", ()))
+            ]
+        elif isinstance(node, dict):
+            return list(node.items())
+        elif isinstance(node, (list, tuple)):
+            return list(enumerate(node))
+        return []
+
+    def child(self, node, path, key):
+        """The child of `node` at `key`; `self` when there is none"""
+        if node is _ROOT:
+            try:
+                return self.top_level(key)
+            except KeyError:
+                return self
+        for child_key, child in reversed(self.children(node, path)):
+            if child_key == key or (
+                isinstance(child_key, int)
+                and not isinstance(child_key, bool)
+                and "{}".format(child_key) == key
+            ):
+                return child
+        return self
+
+    def matches(self, step, node, path):
+        """`(child, path)` of each child of `node` that `step` matches"""
+        if isinstance(step, Key):
+            child = self.child(node, path, step.key)
+            return [] if child is self else [(child, path + (step.key,))]
+        elif isinstance(step, Index):
+            children = self.children(node, path)
+            if children and all(isinstance(key, int) for key, _ in children):
+                index = step.index + len(children) if step.index < 0 else step.index
+                if 0 <= index < len(children):
+                    return [(children[index][1], path + (index,))]
+                return []
+            child = self.child(node, path, step.index)
+            return [] if child is self else [(child, path + (step.index,))]
+        elif isinstance(step, Slice):
+            children = self.children(node, path)
+            return [
+                (child, path + (key,))
+                for key, child in children[step.slice]
+                if isinstance(key, int)
+            ]
+        elif isinstance(step, Wildcard):
+            return [(child, path + (key,)) for key, child in self.children(node, path)]
+        elif isinstance(step, Filter):
+            return [
+                (child, path + (key,))
+                for key, child in self.children(node, path)
+                if self.test(step, child, path + (key,))
+            ]
+        raise TypeError(step)
+
+    def test(self, step, node, path):
+        """Whether the filter `step` holds for `node`"""
+        for key in step.keys:
+            node = self.child(node, path, key)
+            if node is self:
+                return False
+            path += (key,)
+        if step.op is None:
+            return True
+        value = self.value(node, path)
+        try:
+            return _COMPARISONS[step.op](value, step.value)
+        except TypeError:
+            return False
+
+    def search(self, steps, i, node, path, out):
+        """Append `(node, path)` of every match of `steps[i:]` from `node` to `out`"""
+        if i == len(steps):
+            out.append((node, path))
+            return
+        step = steps[i]
+        if isinstance(step, Recursive):
+            if (
+                node is not _ROOT
+                or not isinstance(step.step, Key)
+                or step.step.key in self.top_level_names()
+            ):
+                for child, child_path in self.matches(step.step, node, path):
+                    self.search(steps, i + 1, child, child_path, out)
+            for key, child in self.children(node, path):
+                self.search(steps, i, child, path + (key,), out)
+        else:
+            for child, child_path in self.matches(step, node, path):
+                self.search(steps, i + 1, child, child_path, out)
+
+
+_queries = {}
+
+
+def compile_query(query):
+    """
+    Compile `query`, or get it from the queries compiled before
+
+    :rtype: ```Query```
+    """
+    compiled = _queries.get(query)
+    if compiled is None:
+        if len(_queries) >= 256:
+            _queries.clear()
+        compiled = _queries[query] = Query(query)
+    return compiled
+
+
+def query_values(query, values):
+    """
+    Resolve `query` against settings already converted to Python
+
+    :param query: Query string
+    :type query: ```str```
+
+    :param values: Top-level name to value
+    :type values: ```Mapping[str, Any]```
+
+    :return: Resolved value; or, for a query of many values, the list of them
+    :rtype: ```Any```
+    """
+    if query == ".":
+        return values
+    elif not is_extended(query):
+        value = values
+        try:
+            for key in query.split(".")[1:]:
+                value = value[int(key) if isinstance(value, list) else key]
+        except (IndexError, KeyError, TypeError, ValueError):
+            raise KeyError(query)
+        return value
+
+    from django_settings_cli.parser import _UNKNOWN
+
+    return compile_query(query).search(
+        values, values.__getitem__, lambda keys: _UNKNOWN
+    )
+
+
+def _node_value(node, source):
+    if isinstance(node, ast.expr) and is_literal(node):
+        return expr_to_python(node)
+    segment = getattr(ast, "get_source_segment", None)
+    if segment is not None and getattr(node, "end_lineno", None) is not None:
+        return segment(source, node)
+    import astor
+
+    return astor.to_source(node).rstrip("\n")
+
+
+def xpath(source, expression, filename="<unknown>"):
+    """
+    Search the AST of `source`, as astpath's XML, with an XPath expression
+
+    :param source: Python source
+    :type source: ```str```
+
+    :param expression: XPath, e.g., `//Assign[targets/Name/@id="DEBUG"]/value`
+    :type expression: ```str```
+
+    :param filename: Filename, for syntax errors
+    :type filename: ```str```
+
+    :return: For each match: a literal's value, else the matched node's source; or
+      the string matched, e.g., of an attribute
+    :rtype: ```list```
+    """
+    from astpath import file_contents_to_xml_ast
+
+    node_mappings = {}
+    xml = file_contents_to_xml_ast(
+        source, node_mappings=node_mappings, filename=filename
+    )
+    results = []
+    for match in xml.xpath(expression):
+        if not hasattr(match, "tag"):
+            results.append("{}".format(match))
+            continue
+        node = node_mappings.get(match)
+        if node is not None:
+            results.append(_node_value(node, source))
+            continue
+        # A field, e.g., `value` or `targets`: its nodes
+        nodes = [
+            _node_value(node_mappings[child], source)
+            for child in match
+            if child in node_mappings
+        ]
+        results.append(nodes[0] if len(nodes) == 1 else nodes)
+    return results
+
+
+__all__ = [
+    "Query",
+    "compile_query",
+    "is_extended",
+    "parse_query",
+    "query_values",
+    "xpath",
+]
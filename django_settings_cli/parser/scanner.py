@@ -0,0 +1,126 @@
+"""
+Lightweight scanner that finds the top-level statements assigning given names, so
+that only those statements—not the whole file—need to be `ast.parse`d.
+"""
+
+import re
+import tokenize
+from os import environ
+from sys import modules
+
+from django_settings_cli import get_logger
+from django_settings_cli.parser import _nameToLevel
+
+log = get_logger(modules[__name__].__name__)
+log.setLevel(_nameToLevel[environ.get("DJANGO_SETTING_CLI_LOG_LEVEL", "INFO")])
+
+_TRIPLE_QUOTES = ('"""', "'''")
+
+_CONTINUATIONS = ("\\", ",", "(", "[", "{")
+
+
+def _line_start(source, pos):
+    return source.rfind("\n", 0, pos) + 1
+
+
+def _previous_line(source, start):
+    """The last non-blank, non-comment line before the line at `start`"""
+    end = start - 1
+    while end > 0:
+        line_start = _line_start(source, end)
+        line = source[line_start:end].split("#", 1)[0].strip()
+        if line:
+            return line
+        end = line_start - 1
+    return ""
+
+
+def _statement_end(source, start):
+    """Offset just past the logical line starting at `start`, found by tokenizing it"""
+    pos = [start]
+
+    def readline():
+        end = source.find("\n", pos[0])
+        end = len(source) if end == -1 else end + 1
+        line = source[pos[0] : end]
+        pos[0] = end
+        return line
+
+    for token in tokenize.generate_tokens(readline):
+        if token[0] == tokenize.NEWLINE:
+            return pos[0]
+        elif token[0] in (tokenize.ENDMARKER, tokenize.ERRORTOKEN):
+            break
+    return None
+
+
+def find_statement_spans(source, names):
+    """
+    Find the top-level statements assigning to—or subscript assigning into,
+    augmenting, or calling a method of—any of `names`, in source order.
+
+    :param source: Python source
+    :type source: ```str```
+
+    :param names: Top-level names
+    :type names: ```Iterable[str]```
+
+    :return: `(start, end)` offsets of each statement; or `None` when the scan cannot
+      decide, e.g., if any of `names` is assigned other than at the start of a line
+    :rtype: ```Optional[List[Tuple[int, int]]]```
+    """
+    assign_re = re.compile(
+        r"(?<![\w.])(?:{names})\s*(?:\[[^\n]*?\]\s*)*"
+        r"(?:(?:\*\*|//|<<|>>|[-+*/%&|^@])?=(?!=)|\.\s*[A-Za-z_])".format(
+            names="|".join(map(re.escape, sorted(names)))
+        )
+    )
+    has_triple_quotes = any(quotes in source for quotes in _TRIPLE_QUOTES)
+
+    spans = []
+    end = 0
+    for match in assign_re.finditer(source):
+        start = match.start()
+        if start < end:
+            # Within the statement just found, e.g., `A = B = 1` or `A = f(A=1)`
+            continue
+        elif start != _line_start(source, start):
+            log.debug("scanner: not at line start: {!r} ;".format(match.group()))
+            return None
+        elif _previous_line(source, start).endswith(_CONTINUATIONS) or (
+            has_triple_quotes
+            and any(source.count(quotes, 0, start) & 1 for quotes in _TRIPLE_QUOTES)
+        ):
+            log.debug("scanner: may be within an expression or string ;")
+            return None
+
+        try:
+            end = _statement_end(source, start)
+        except (tokenize.TokenError, SyntaxError):
+            end = None
+        if end is None:
+            return None
+        spans.append((start, end))
+
+    return spans
+
+
+def find_statements(source, names):
+    """
+    Find the source of the top-level statements assigning to—or subscript assigning
+    into, augmenting, or calling a method of—any of `names`, in source order.
+
+    :param source: Python source
+    :type source: ```str```
+
+    :param names: Top-level names
+    :type names: ```Iterable[str]```
+
+    :return: Statement sources; or `None` when the scan cannot decide
+    :rtype: ```Optional[List[str]]```
+    """
+    spans = find_statement_spans(source, names)
+    return None if spans is None else [source[start:end] for start, end in spans]
+
+
+__all__ = ["find_statement_spans", "find_statements"]
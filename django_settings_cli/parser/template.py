@@ -0,0 +1,331 @@
+"""
+`--format` templates: compiled once—each placeholder parsed, and checked against a small
+allow-list of expressions—then rendered against any number of records without `eval`.
+
+    {ENGINE[ENGINE.rfind(".")+1:]}://{USER}@{HOST or "localhost"}:{PORT}/{NAME!r}
+"""
+
+import ast
+import operator
+from collections import namedtuple
+from sys import version
+
+from django_settings_cli.parser.limits import (
+    CHECKED_METHODS,
+    checked_format,
+    checked_mod,
+    checked_mul,
+)
+from django_settings_cli.utils import string_types
+
+# Methods callable from a placeholder, on `str` values
+SAFE_METHODS = frozenset(
+    (
+        "endswith",
+        "find",
+        "join",
+        "lower",
+        "lstrip",
+        "partition",
+        "replace",
+        "rfind",
+        "rpartition",
+        "rsplit",
+        "rstrip",
+        "split",
+        "startswith",
+        "strip",
+        "title",
+        "upper",
+    )
+)
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: checked_mul,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: checked_mod,
+}
+
+_UNARY_OPERATORS = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+    ast.Not: operator.not_,
+}
+
+_CONVERSIONS = {
+    None: lambda value: value,
+    "s": str,
+    "r": repr,
+    "a": lambda value: repr(value).encode("ascii", "backslashreplace").decode("ascii"),
+}
+
+_Field = namedtuple("_Field", ("evaluate", "conversion", "format_spec"))
+
+
+def _split_field(field):
+    """Split `expr!conversion:format_spec` at the top level: not in brackets or quotes"""
+    depth, quote, i = 0, None, 0
+    while i < len(field):
+        ch = field[i]
+        if quote:
+            if ch == "\\":
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch in "([{":
+            depth += 1
+        elif ch in ")]}":
+            depth -= 1
+        elif depth == 0 and ch == "!" and field[i + 1 : i + 2] != "=":
+            conversion, _, format_spec = field[i + 1 :].partition(":")
+            return field[:i], conversion, format_spec
+        elif depth == 0 and ch == ":":
+            return field[:i], None, field[i + 1 :]
+        i += 1
+    return field, None, ""
+
+
+def parse_template(format_str):
+    """
+    Split `format_str` into its literal text and placeholders
+
+    :param format_str: Format string, e.g., `postgres://{USER}@{HOST}`
+    :type format_str: ```str```
+
+    :return: Literal strings, and the `(expression, conversion, format_spec)` of each
+      placeholder, in order
+    :rtype: ```List[Union[str, Tuple[str, Optional[str], str]]]```
+    """
+    parts, literal, i = [], [], 0
+    while i < len(format_str):
+        ch = format_str[i]
+        if ch in "{}" and format_str[i + 1 : i + 2] == ch:
+            literal.append(ch)
+            i += 2
+            continue
+        elif ch == "}":
+            raise ValueError("Single '}' encountered in format string")
+        elif ch != "{":
+            literal.append(ch)
+            i += 1
+            continue
+
+        depth, quote, end = 1, None, i + 1
+        while depth and end < len(format_str):
+            c = format_str[end]
+            if quote:
+                if c == "\\":
+                    end += 1
+                elif c == quote:
+                    quote = None
+            elif c in "'\"":
+                quote = c
+            elif c in "{[(":
+                depth += 1
+            elif c in "}])":
+                depth -= 1
+            end += 1
+        if depth:
+            raise ValueError("Single '{' encountered in format string")
+        if literal:
+            parts.append("".join(literal))
+            literal = []
+        parts.append(_split_field(format_str[i + 1 : end - 1]))
+        i = end
+    if literal:
+        parts.append("".join(literal))
+    return parts
+
+
+def _compile(node, expression):
+    """
+    Compile the placeholder expression `node` into a function of the record, allowing
+    only names, literals, subscripts and slices, `SAFE_METHODS` calls, arithmetic,
+    `not`, `and`, `or` and conditional expressions. Repetition, `%` and the `join` and
+    `replace` methods are checked against `MAX_SIZE` as they run, as is each format spec
+
+    :raises ValueError: On anything else
+    """
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda record: record[name]
+    elif isinstance(node, (ast.Str, ast.Num)) or (
+        version[0] == "3" and isinstance(node, ast.Constant)
+    ):
+        value = ast.literal_eval(node)
+        return lambda record: value
+    elif isinstance(node, (ast.List, ast.Tuple)):
+        elts = [_compile(elt, expression) for elt in node.elts]
+        container = list if isinstance(node, ast.List) else tuple
+        return lambda record: container(elt(record) for elt in elts)
+    elif isinstance(node, ast.Subscript):
+        value = _compile(node.value, expression)
+        index = _compile(
+            (
+                node.slice.value
+                if isinstance(node.slice, getattr(ast, "Index", ()))
+                else node.slice
+            ),
+            expression,
+        )
+        return lambda record: value(record)[index(record)]
+    elif isinstance(node, ast.Slice):
+        lower, upper, step = (
+            (lambda record: None) if part is None else _compile(part, expression)
+            for part in (node.lower, node.upper, node.step)
+        )
+        return lambda record: slice(lower(record), upper(record), step(record))
+    elif (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr in SAFE_METHODS
+        and not node.keywords
+        and not any(isinstance(arg, getattr(ast, "Starred", ())) for arg in node.args)
+    ):
+        obj = _compile(node.func.value, expression)
+        args = [_compile(arg, expression) for arg in node.args]
+        method = node.func.attr
+
+        def call(record):
+            value = obj(record)
+            if not isinstance(value, string_types):
+                raise TypeError(
+                    "{}() of {} in {!r}".format(
+                        method, type(value).__name__, expression
+                    )
+                )
+            if method in CHECKED_METHODS:
+                return CHECKED_METHODS[method](value, *(arg(record) for arg in args))
+            return getattr(value, method)(*(arg(record) for arg in args))
+
+        return call
+    elif isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        op = _BINARY_OPERATORS[type(node.op)]
+        left, right = _compile(node.left, expression), _compile(node.right, expression)
+        return lambda record: op(left(record), right(record))
+    elif isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        op = _UNARY_OPERATORS[type(node.op)]
+        operand = _compile(node.operand, expression)
+        return lambda record: op(operand(record))
+    elif isinstance(node, ast.BoolOp):
+        values = [_compile(value, expression) for value in node.values]
+        if isinstance(node.op, ast.Or):
+
+            def boolop(record):
+                for value in values:
+                    result = value(record)
+                    if result:
+                        return result
+                return result
+
+        else:
+
+            def boolop(record):
+                for value in values:
+                    result = value(record)
+                    if not result:
+                        return result
+                return result
+
+        return boolop
+    elif isinstance(node, ast.IfExp):
+        test, body, orelse = (
+            _compile(n, expression) for n in (node.test, node.body, node.orelse)
+        )
+        return lambda record: body(record) if test(record) else orelse(record)
+    raise ValueError(
+        "Not allowed in a format placeholder: {} in {!r}".format(
+            type(node).__name__, expression
+        )
+    )
+
+
+def _leading_name(expression):
+    """`ENGINE` of `ENGINE[ENGINE.rfind(".")+1:]`"""
+    end = 0
+    while end < len(expression) and (
+        expression[end].isalnum() or expression[end] == "_"
+    ):
+        end += 1
+    return expression[:end]
+
+
+class FormatTemplate(object):
+    """
+    A compiled format string
+
+    :param format_str: Format string, e.g., `{ENGINE[ENGINE.rfind(".")+1:]}://{USER}`
+    :type format_str: ```str```
+
+    :param no_eval: Substitute each placeholder's leading name, ignoring the rest of
+      its expression
+    :type no_eval: ```bool```
+    """
+
+    def __init__(self, format_str, no_eval=False):
+        self.format_str = format_str
+        self.parts = []
+        for part in parse_template(format_str):
+            if isinstance(part, string_types):
+                self.parts.append(part)
+                continue
+            expression, conversion, format_spec = part
+            if conversion not in _CONVERSIONS:
+                raise ValueError("Unknown conversion: {!r}".format(conversion))
+            elif "{" in format_spec:
+                raise ValueError("Nested placeholders are not supported")
+            if no_eval:
+                expression = _leading_name(expression)
+            try:
+                node = ast.parse(expression.strip(), mode="eval").body
+            except SyntaxError:
+                raise ValueError("Invalid placeholder: {!r}".format(expression))
+            self.parts.append(
+                _Field(
+                    _compile(node, expression), _CONVERSIONS[conversion], format_spec
+                )
+            )
+
+    def render(self, record):
+        """
+        :param record: Values for the placeholders' names, e.g., a settings dict
+        :type record: ```Mapping[str, Any]```
+
+        :return: The rendered string
+        :rtype: ```str```
+        """
+        return "".join(
+            (
+                part
+                if isinstance(part, string_types)
+                else checked_format(
+                    part.conversion(part.evaluate(record)), part.format_spec
+                )
+            )
+            for part in self.parts
+        )
+
+
+_templates = {}
+
+
+def compile_template(format_str, no_eval=False):
+    """
+    Compile `format_str`, or get it from the templates compiled before
+
+    :rtype: ```FormatTemplate```
+    """
+    key = format_str, no_eval
+    template = _templates.get(key)
+    if template is None:
+        if len(_templates) >= 256:
+            _templates.clear()
+        template = _templates[key] = FormatTemplate(format_str, no_eval)
+    return template
+
+
+__all__ = ["FormatTemplate", "SAFE_METHODS", "compile_template", "parse_template"]
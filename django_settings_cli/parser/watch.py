@@ -0,0 +1,250 @@
+"""
+Watch mode: re-evaluate queries as settings files change, emitting only the values that
+differ. A change—to a file, or to a settings module it imports—is detected by
+inotify—when `inotify_simple` is installed—else by polling `stat`, and is gated on the
+content hash; only the statements whose source changed are parsed and materialised
+again. Values are resolved, and evaluated, as `parse` resolves them.
+"""
+
+import ast
+from collections import OrderedDict
+from os import environ, path
+from sys import modules
+
+from django_settings_cli import get_logger
+from django_settings_cli.parser import (
+    _STAR_IMPORT,
+    AssignQuerierVisitor,
+    _Dynamic,
+    _Evaluation,
+    _filter_value,
+    _format,
+)
+from django_settings_cli.parser import _materialise as _materialise_node
+from django_settings_cli.parser import _nameToLevel, _read, _resolve
+from django_settings_cli.parser.cache import _stat_key, content_hash
+from django_settings_cli.parser.query import compile_query, is_extended
+from django_settings_cli.parser.scanner import find_statements
+
+log = get_logger(modules[__name__].__name__)
+log.setLevel(_nameToLevel[environ.get("DJANGO_SETTING_CLI_LOG_LEVEL", "INFO")])
+
+_UNSET = object()
+
+
+def _materialise(statement, names):
+    """
+    `(name, subkey, value)` of each assignment to `names`—or, when `None`, to any
+    name—in `statement`; `value` is `_Dynamic` when not a literal
+    """
+    visitor = AssignQuerierVisitor(
+        None if names is None else [(name,) for name in names]
+    )
+    visitor.visit(ast.parse(statement))
+    return [
+        (name, subkey, _materialise_node(node))
+        for name, pairs in visitor.assignments.items()
+        for subkey, node in pairs
+    ]
+
+
+class WatchedFile(object):
+    """
+    The last seen state of one settings file: its `stat`, content hash, materialised
+    statements—keyed by their source—and the value last emitted for each query
+    """
+
+    def __init__(self, filename, queries, format_str=None, no_eval=False, env=None):
+        self.filename = filename
+        self.queries = queries
+        self.format_str = format_str
+        self.no_eval = no_eval
+        self.env = env
+        self.keys_list = [
+            compile_query(q) if is_extended(q) else q.split(".") for q in queries
+        ]
+        filter_values = [
+            _filter_value(keys) for keys in self.keys_list if keys != ["", ""]
+        ]
+        self.names = (
+            None
+            if None in filter_values
+            else frozenset(filter_value[0] for filter_value in filter_values)
+        )
+        self.stat_key = self.digest = None
+        # `stat` of each module imported, transitively, when last evaluated
+        self.stat_keys = {}
+        self.statements = {}
+        self.values = {}
+
+    def _assignments(self, fstr):
+        statements = None if self.names is None else find_statements(fstr, self.names)
+        if statements is None:
+            log.debug("watch: scanner undecided, parsing {} ;".format(self.filename))
+            statements = [fstr]
+
+        memo, assignments = {}, OrderedDict()
+        for statement in statements:
+            materialised = memo.get(statement)
+            if materialised is None:
+                materialised = self.statements.get(statement)
+            if materialised is None:
+                materialised = _materialise(statement, self.names)
+            memo[statement] = materialised
+            for name, subkey, value in materialised:
+                assignments.setdefault(name, []).append((subkey, value))
+        # Forget the statements no longer in the file
+        self.statements = memo
+        if _STAR_IMPORT.search(fstr):
+            # As `parse_file_queries` marks the star imports
+            assignments["*"] = [((), _Dynamic)]
+        return assignments
+
+    def _imports_changed(self):
+        try:
+            return any(
+                _stat_key(filename) != stat_key
+                for filename, stat_key in self.stat_keys.items()
+            )
+        except OSError:
+            return True
+
+    def refresh(self):
+        """
+        Re-evaluate the queries if the file changed
+
+        :return: `OrderedDict`s of path, query and value—or error—of each query whose
+          result differs from the last one returned
+        :rtype: ```List[OrderedDict]```
+        """
+        try:
+            stat_key = _stat_key(self.filename)
+        except OSError:
+            stat_key = None
+        if (
+            stat_key is not None
+            and stat_key == self.stat_key
+            and not self._imports_changed()
+        ):
+            return []
+        self.stat_key = stat_key
+
+        try:
+            fstr = _read(self.filename)[1]
+        except (IOError, OSError, SyntaxError, ValueError) as e:
+            self.digest = None
+            results = [e] * len(self.queries)
+        else:
+            digest = content_hash(fstr)
+            if digest == self.digest and not self._imports_changed():
+                return []
+            self.digest = digest
+            try:
+                assignments = self._assignments(fstr)
+            except SyntaxError as e:
+                results = [e] * len(self.queries)
+            else:
+                evaluate = _Evaluation(self.filename, fstr, self.filename, self.env)
+                results = []
+                for keys in self.keys_list:
+                    try:
+                        value = _resolve(keys, assignments, fstr, evaluate)
+                        if self.format_str:
+                            value = _format(value, self.format_str, self.no_eval)
+                        results.append(value)
+                    except Exception as e:
+                        results.append(e)
+                self.stat_keys = dict(evaluate.stat_keys)
+
+        events = []
+        for query, result in zip(self.queries, results):
+            item = (
+                ("error", "{}: {}".format(type(result).__name__, result))
+                if isinstance(result, Exception)
+                else ("value", result)
+            )
+            if self.values.get(query, _UNSET) != item:
+                self.values[query] = item
+                events.append(
+                    OrderedDict((("path", self.filename), ("query", query), item))
+                )
+        return events
+
+
+def _inotify_wait(filenames, interval):
+    """
+    Block until a change to a directory containing `filenames`—which catches editors
+    that save by renaming over the file—or for at most `interval` seconds.
+    `None` when `inotify_simple` is unavailable.
+    """
+    try:
+        from inotify_simple import INotify, flags
+    except ImportError:
+        return None
+
+    inotify = INotify()
+    mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.DELETE
+    for directory in frozenset(
+        path.dirname(path.abspath(filename)) for filename in filenames
+    ):
+        inotify.add_watch(directory, mask)
+    return lambda: inotify.read(timeout=int(interval * 1000), read_delay=50)
+
+
+def watch(
+    filenames,
+    queries,
+    format_str=None,
+    no_eval=False,
+    interval=1.0,
+    wait=None,
+    env=None,
+):
+    """
+    Yield the results of the queries on each file—initially, and then whenever they
+    change—until interrupted
+
+    :param filenames: Settings files
+    :type filenames: ```Iterable[str]```
+
+    :param queries: Query strings, e.g., `[".DEBUG", ".DATABASES.default"]`
+    :type queries: ```List[str]```
+
+    :param format_str: Format string, applied to each resolved value
+    :type format_str: ```Optional[str]```
+
+    :param no_eval: Only substitute names in the format str, not expressions
+    :type no_eval: ```bool```
+
+    :param interval: Seconds between polls; with inotify, between checks regardless
+    :type interval: ```float```
+
+    :param wait: Blocks until the files may have changed; default inotify, else sleep
+    :type wait: ```Optional[Callable[[], Any]]```
+
+    :param env: Environment for the evaluated `os.environ`; default the process's
+    :type env: ```Optional[Mapping[str, str]]```
+
+    :return: `OrderedDict`s of path, query and value—or error—as each result changes
+    :rtype: ```Iterator[OrderedDict]```
+    """
+    watched = [
+        WatchedFile(filename, queries, format_str=format_str, no_eval=no_eval, env=env)
+        for filename in filenames
+    ]
+    if wait is None:
+        wait = _inotify_wait((w.filename for w in watched), interval)
+    if wait is None:
+        from time import sleep
+
+        log.debug("watch: inotify_simple unavailable, polling ;")
+        wait = lambda: sleep(interval)
+
+    while True:
+        for watched_file in watched:
+            for event in watched_file.refresh():
+                yield event
+        wait()
+
+
+__all__ = ["WatchedFile", "watch"]
@@ -0,0 +1,232 @@
+"""
+Per-phase instrumentation: wall time, and net allocated memory blocks, of each phase of
+a `parse` or `emit`—reading, parsing, walking, converting, evaluating, formatting,
+serialising…—written as a JSON line to stderr or a file, with optional cProfile
+statistics and a tracemalloc snapshot.
+
+Enabled by `--profile`, or by `DJANGO_SETTING_CLI_PROFILE`: `1` (stderr), or the trace
+filename. When disabled, each phase is a shared no-op context manager.
+"""
+
+from collections import OrderedDict
+from os import environ
+from sys import stderr
+
+try:
+    from time import perf_counter as _clock
+except ImportError:
+    from time import time as _clock
+
+try:
+    from sys import getallocatedblocks as _allocated_blocks
+except ImportError:
+    _allocated_blocks = lambda: 0
+
+_profiler = None
+
+
+class _NullPhase(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase(object):
+    __slots__ = ("totals", "start", "blocks")
+
+    def __init__(self, totals):
+        self.totals = totals
+
+    def __enter__(self):
+        self.blocks = _allocated_blocks()
+        self.start = _clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = _clock() - self.start
+        totals = self.totals
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] += _allocated_blocks() - self.blocks
+        return False
+
+
+class Profiler(object):
+    """
+    Totals—calls, seconds and net allocated blocks—of each phase, by name; phases
+    nest, and each is inclusive of those within it
+
+    :param trace: Filename the trace is appended to, or `"-"` for stderr
+    :type trace: ```str```
+
+    :param cprofile: Filename for cProfile statistics, readable by `pstats`
+    :type cprofile: ```Optional[str]```
+
+    :param tracemalloc: Filename for a tracemalloc snapshot, loadable by
+      `tracemalloc.Snapshot.load`
+    :type tracemalloc: ```Optional[str]```
+    """
+
+    def __init__(self, trace="-", cprofile=None, tracemalloc=None):
+        self.trace = trace
+        self.cprofile = cprofile
+        self.tracemalloc = tracemalloc
+        self.phases = OrderedDict()
+        self._cprofiler = None
+        self.start = _clock()
+
+    def phase(self, name):
+        totals = self.phases.get(name)
+        if totals is None:
+            totals = self.phases[name] = [0, 0.0, 0]
+        return _Phase(totals)
+
+    def enable(self):
+        if self.tracemalloc:
+            import tracemalloc
+
+            tracemalloc.start()
+        if self.cprofile:
+            from cProfile import Profile
+
+            self._cprofiler = Profile()
+            self._cprofiler.enable()
+        self.start = _clock()
+
+    def disable(self):
+        """
+        Stop, writing the trace, and the cProfile statistics or tracemalloc snapshot
+
+        :return: The trace
+        :rtype: ```OrderedDict```
+        """
+        seconds = _clock() - self.start
+        if self._cprofiler is not None:
+            self._cprofiler.disable()
+            self._cprofiler.dump_stats(self.cprofile)
+
+        trace = OrderedDict(
+            (
+                ("seconds", seconds),
+                (
+                    "phases",
+                    [
+                        OrderedDict(
+                            (
+                                ("phase", name),
+                                ("calls", calls),
+                                ("seconds", phase_seconds),
+                                ("allocated_blocks", blocks),
+                            )
+                        )
+                        for name, (calls, phase_seconds, blocks) in self.phases.items()
+                    ],
+                ),
+            )
+        )
+        if self.tracemalloc:
+            import tracemalloc
+
+            trace["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.take_snapshot().dump(self.tracemalloc)
+            tracemalloc.stop()
+
+        from json import dumps
+
+        line = "{}\n".format(dumps(trace, separators=(",", ":")))
+        if self.trace == "-":
+            stderr.write(line)
+        else:
+            with open(self.trace, "at") as f:
+                f.write(line)
+        return trace
+
+
+def phase(name):
+    """
+    Time the `with` block as the phase `name`, when profiling
+
+    :param name: Phase name, e.g., `"ast.parse"`
+    :type name: ```str```
+
+    :return: Context manager
+    :rtype: ```Union[_Phase, _NullPhase]```
+    """
+    return _NULL_PHASE if _profiler is None else _profiler.phase(name)
+
+
+def start(trace="-", cprofile=None, tracemalloc=None):
+    """
+    Start profiling, until `stop`
+
+    :rtype: ```Profiler```
+    """
+    global _profiler
+    _profiler = Profiler(trace=trace, cprofile=cprofile, tracemalloc=tracemalloc)
+    _profiler.enable()
+    return _profiler
+
+
+def stop():
+    """
+    Stop profiling, writing its outputs
+
+    :return: The trace; `None` when not profiling
+    :rtype: ```Optional[OrderedDict]```
+    """
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return None if profiler is None else profiler.disable()
+
+
+def _parser_cli_args(parser):
+    parser.add_argument(
+        "--profile",
+        help="Write per-phase wall time and allocations, as a JSON line, to stderr"
+        " (default: $DJANGO_SETTING_CLI_PROFILE: 1, or the trace filename)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile-out", help="Append the --profile trace to this file, not stderr"
+    )
+    parser.add_argument(
+        "--profile-cprofile", help="With --profile, write cProfile stats to this file"
+    )
+    parser.add_argument(
+        "--profile-tracemalloc",
+        help="With --profile, write a tracemalloc snapshot to this file",
+    )
+    return parser
+
+
+def start_from_cli(kwargs):
+    """
+    Start profiling if asked to by the CLI arguments—which are removed from
+    `kwargs`—or `DJANGO_SETTING_CLI_PROFILE`
+
+    :param kwargs: Parsed CLI arguments
+    :type kwargs: ```dict```
+
+    :return: Whether profiling was started
+    :rtype: ```bool```
+    """
+    profile = kwargs.pop("profile", False)
+    trace = kwargs.pop("profile_out", None)
+    cprofile = kwargs.pop("profile_cprofile", None)
+    tracemalloc = kwargs.pop("profile_tracemalloc", None)
+
+    env = environ.get("DJANGO_SETTING_CLI_PROFILE", "")
+    if not profile and not trace and env in ("", "0"):
+        return False
+    if trace is None:
+        trace = env if env not in ("", "0", "1") else "-"
+    start(trace=trace, cprofile=cprofile, tracemalloc=tracemalloc)
+    return True
+
+
+__all__ = ["Profiler", "phase", "start", "start_from_cli", "stop"]
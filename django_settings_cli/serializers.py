@@ -0,0 +1,260 @@
+"""
+Output serializers, streamed to the output chunk by chunk rather than built as one
+string: indented or compact JSON, JSON Lines, `.env` and shell `export` lines.
+
+JSON is encoded by `orjson`, when installed, else by `json.JSONEncoder.iterencode`.
+That trades streaming for speed: `orjson` encodes the whole document into one `bytes`
+chunk, held in memory with the value, where `iterencode` yields chunks as it walks the
+value. Settings are small enough for the one chunk; values of more than
+`STREAM_THRESHOLD` items—characters, or elements—are streamed instead. Values of at
+most `ORJSON_THRESHOLD` items are encoded by `json` too: sooner than `orjson` imports.
+"""
+
+import re
+from json import JSONEncoder
+
+from django_settings_cli.utils import FORMATS, string_types
+
+_UNSAFE_NAME_CHARS = re.compile(r"\W")
+
+_BARE_VALUE = re.compile(r"^[\w@%+=:,./-]*$")
+
+# Values of more items than this are streamed, rather than encoded at once by `orjson`
+STREAM_THRESHOLD = 1 << 20
+
+# Values of more items than this are worth importing `orjson` for
+ORJSON_THRESHOLD = 1 << 12
+
+# Streamed chunks are joined up to about this many characters, each one write
+_CHUNK_SIZE = 64 * 1024
+
+
+def _larger_than(value, threshold):
+    """
+    Whether `value` has more than `threshold` items: the characters of its strings and
+    keys, and its elements, counted through nested containers—stopping once past it
+    """
+    total = 0
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, string_types):
+            total += len(value)
+        elif isinstance(value, dict):
+            total += len(value)
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            total += len(value)
+            stack.extend(value)
+        if total > threshold:
+            return True
+    return False
+
+
+def _orjson():
+    """`orjson`, imported when first needed; `None` if not installed"""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def iterencode(value, indent=True, stream=None):
+    """
+    Encode `value` as a JSON text, in chunks
+
+    :param value: JSON serialisable value
+    :type value: ```Any```
+
+    :param indent: Indent by 2 spaces, else compact—no whitespace at all
+    :type indent: ```bool```
+
+    :param stream: Encode chunk by chunk with `json`, rather than all at once with
+      `orjson`—slower, but never holding the whole text in memory; default only for
+      values larger than `STREAM_THRESHOLD`. Values no larger than `ORJSON_THRESHOLD`
+      are encoded with `json` regardless
+    :type stream: ```Optional[bool]```
+
+    :return: `str` chunks; or one UTF-8 `bytes` chunk, from `orjson`
+    :rtype: ```Iterator[Union[str, bytes]]```
+    """
+    orjson = None
+    if not stream and _larger_than(value, ORJSON_THRESHOLD):
+        orjson = _orjson()
+        if stream is None and _larger_than(value, STREAM_THRESHOLD):
+            orjson = None
+    if orjson is not None:
+        try:
+            yield orjson.dumps(
+                value,
+                option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0),
+            )
+            return
+        except TypeError:
+            # e.g., integers beyond 64 bits, which `json` handles
+            pass
+
+    encoder = JSONEncoder(
+        indent=2 if indent else None,
+        separators=(",", ": ") if indent else (",", ":"),
+    )
+    pieces, size = [], 0
+    for piece in encoder.iterencode(value):
+        pieces.append(piece)
+        size += len(piece)
+        if size >= _CHUNK_SIZE:
+            yield "".join(pieces)
+            pieces, size = [], 0
+    if pieces:
+        yield "".join(pieces)
+
+
+def write_chunks(stream, chunks):
+    """
+    Write `str` and UTF-8 `bytes` chunks to the text `stream`, `bytes` to its
+    underlying binary buffer—when it has one—rather than decoded to a copy
+
+    :param stream: Text stream
+    :type stream: ```TextIO```
+
+    :param chunks: Chunks
+    :type chunks: ```Iterable[Union[str, bytes]]```
+    """
+    for chunk in chunks:
+        if isinstance(chunk, string_types):
+            stream.write(chunk)
+            continue
+        buffer = getattr(stream, "buffer", None)
+        if buffer is None:
+            stream.write(chunk.decode("utf-8"))
+        else:
+            stream.flush()
+            buffer.write(chunk)
+
+
+def _env_name(keys):
+    name = "__".join(_UNSAFE_NAME_CHARS.sub("_", "{}".format(key)) for key in keys)
+    return "_{}".format(name) if name[:1].isdigit() else name
+
+
+def _env_value(value):
+    if isinstance(value, string_types):
+        return value
+    elif value is None:
+        return ""
+    elif isinstance(value, bool):
+        return "true" if value else "false"
+    elif isinstance(value, (int, float)):
+        return "{!r}".format(value)
+    return "".join(
+        chunk if isinstance(chunk, string_types) else chunk.decode("utf-8")
+        for chunk in iterencode(value, indent=False)
+    )
+
+
+def flatten(value, prefix=()):
+    """
+    Flatten nested dicts into their leaves
+
+    :param value: Value
+    :type value: ```Any```
+
+    :param prefix: Keys to `value`
+    :type prefix: ```Tuple[Any, ...]```
+
+    :return: Keys to, and value of, each leaf: anything but a nonempty dict
+    :rtype: ```Iterator[Tuple[Tuple[Any, ...], Any]]```
+    """
+    if isinstance(value, dict) and value:
+        for key, item in value.items():
+            for leaf in flatten(item, prefix + (key,)):
+                yield leaf
+    else:
+        yield prefix, value
+
+
+def env_items(r, query):
+    """
+    Name the leaves of a query's result as environment variables, keys joined by `__`.
+    Dict results are flattened relative to the query, so `.DATABASES.default` gives
+    `ENGINE`, `NAME`, `OPTIONS__sslmode`…; any other result is named by the query's
+    last key. Results of many queries are named by their full query, e.g.,
+    `DATABASES__default__NAME`.
+
+    :param r: Result of `query`
+    :type r: ```Any```
+
+    :param query: Query string, or query strings
+    :type query: ```Union[str, List[str]]```
+
+    :return: Name and string value of each variable
+    :rtype: ```Iterator[Tuple[str, str]]```
+    """
+    single = isinstance(query, string_types)
+    for q in (query,) if single else query:
+        keys = tuple(key for key in q.split(".")[1:] if key)
+        if not keys:
+            raise ValueError("Environment variables need a query below the root")
+        result = r if single else r[q]
+        if not single:
+            leaves = flatten(result, keys)
+        elif isinstance(result, dict) and result:
+            leaves = flatten(result)
+        else:
+            leaves = flatten(result, keys[-1:])
+        for prefix, value in leaves:
+            yield _env_name(prefix), _env_value(value)
+
+
+def _dotenv_quote(value):
+    if _BARE_VALUE.match(value):
+        return value
+    elif "'" not in value and "\n" not in value:
+        return "'{}'".format(value)
+    return '"{}"'.format(
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+def iter_env_lines(r, query, shell=False):
+    """
+    Render a query's result as `.env` lines, or as shell `export` lines
+
+    :param r: Result of `query`
+    :type r: ```Any```
+
+    :param query: Query string, or query strings
+    :type query: ```Union[str, List[str]]```
+
+    :param shell: `export NAME='value'`—for `eval` by a POSIX shell—rather than `.env`
+    :type shell: ```bool```
+
+    :return: Lines, each ending in a newline
+    :rtype: ```Iterator[str]```
+    """
+    if shell:
+        try:
+            from shlex import quote
+        except ImportError:
+            from pipes import quote
+
+        line_format, quote_value = "export {}={}\n", quote
+    else:
+        line_format, quote_value = "{}={}\n", _dotenv_quote
+
+    for name, value in env_items(r, query):
+        yield line_format.format(name, quote_value(value))
+
+
+__all__ = [
+    "FORMATS",
+    "ORJSON_THRESHOLD",
+    "STREAM_THRESHOLD",
+    "env_items",
+    "flatten",
+    "iter_env_lines",
+    "iterencode",
+    "write_chunks",
+]
@@ -0,0 +1,266 @@
+"""
+Resident server over a Unix socket, and the thin client that forwards to it.
+
+Requests and responses are one JSON object per line:
+
+    {"command": "parse", "kwargs": {"infile": "/abs/settings.py", "query": ".DEBUG"}}
+    {"result": false}
+
+An emit's result is the emitted source and the encoding of the file it was read from.
+
+Files are parsed once and held in a `MemoryCache` until they change on disk.
+"""
+
+from json import dumps, loads
+from os import environ, path, remove
+from signal import SIGTERM, signal
+from sys import exit, stdin, stdout
+
+__desc__ = "Serve parse and emit requests over a Unix socket"
+
+
+def _parser_cli_args(parser):
+    # Not `socket_path`, which would override the global `--socket`
+    parser.add_argument(
+        "listen_path",
+        metavar="socket_path",
+        help="Unix socket to listen on (default: --socket, else"
+        " $DJANGO_SETTING_CLI_SOCKET)",
+        nargs="?",
+    )
+    return parser
+
+
+def _read_infile(infile):
+    """Filenames are sent absolute, as the server's cwd differs; stdin is sent whole"""
+    if infile is stdin:
+        return None, stdin.read()
+    return path.abspath(infile), None
+
+
+def _parse(infile, source, query, format_str=None, no_eval=False, cache=None, env=None):
+    from io import StringIO
+
+    from django_settings_cli.parser import query_py_parser
+
+    return query_py_parser(
+        infile=StringIO(source) if infile is None else infile,
+        query=query,
+        format_str=format_str,
+        no_eval=no_eval,
+        cache=cache,
+        env=env,
+    )
+
+
+def _emit(infile, source, query, input_s, merge, patch=None):
+    """The emitted source, and the encoding it is to be written in"""
+    from io import StringIO
+
+    from django_settings_cli.emitter import MergeStrategy, _emit_source
+
+    source, encoding = _emit_source(
+        infile=StringIO(source) if infile is None else infile,
+        query=query,
+        input_s=input_s,
+        merge=MergeStrategy(merge),
+        patch=patch,
+    )
+    return {"source": source, "encoding": encoding}
+
+
+def _handle(server, line):
+    request = loads(line.decode("utf-8"))
+    try:
+        kwargs = request["kwargs"]
+        if request["command"] == "parse":
+            result = _parse(cache=server.cache, **kwargs)
+        elif request["command"] == "emit":
+            result = _emit(**kwargs)
+        else:
+            raise ValueError("Unknown command: {!r}".format(request["command"]))
+        response = {"result": result}
+    except Exception as e:
+        response = {"error": "{}: {}".format(type(e).__name__, e)}
+    return dumps(response).encode("utf-8") + b"\n"
+
+
+def make_server(socket_path):
+    """
+    Construct—without starting—the threaded server on `socket_path`
+
+    :param socket_path: Unix socket to listen on
+    :type socket_path: ```str```
+
+    :return: The server, with its `MemoryCache` as `cache`
+    :rtype: ```UnixStreamServer```
+    """
+    # Imported here so that the client path pays for none of this
+    try:
+        from socketserver import (
+            StreamRequestHandler,
+            ThreadingMixIn,
+            UnixStreamServer,
+        )
+    except ImportError:
+        from SocketServer import StreamRequestHandler, ThreadingMixIn, UnixStreamServer
+
+    from django_settings_cli.parser.cache import MemoryCache
+
+    class SettingsRequestHandler(StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                self.wfile.write(_handle(self.server, line))
+
+    class SettingsServer(ThreadingMixIn, UnixStreamServer):
+        daemon_threads = True
+
+    server = SettingsServer(socket_path, SettingsRequestHandler)
+    server.cache = MemoryCache()
+    return server
+
+
+def serve(socket_path):
+    """
+    Serve parse and emit requests on `socket_path` until interrupted
+
+    :param socket_path: Unix socket to listen on
+    :type socket_path: ```str```
+    """
+    if not socket_path:
+        raise ValueError("No socket path; pass one or set DJANGO_SETTING_CLI_SOCKET")
+    if path.exists(socket_path):
+        remove(socket_path)
+    server = make_server(socket_path)
+    signal(SIGTERM, lambda signum, frame: exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        remove(socket_path)
+
+
+def request(socket_path, command, kwargs):
+    """
+    Send one request to the server on `socket_path`
+
+    :param socket_path: Unix socket the server is listening on
+    :type socket_path: ```str```
+
+    :param command: "parse" or "emit"
+    :type command: ```str```
+
+    :param kwargs: Keyword arguments of the command
+    :type kwargs: ```dict```
+
+    :return: The result
+    :rtype: ```Any```
+    """
+    import socket
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        f = sock.makefile("rwb")
+        f.write(dumps({"command": command, "kwargs": kwargs}).encode("utf-8") + b"\n")
+        f.flush()
+        response = loads(f.readline().decode("utf-8"))
+    finally:
+        sock.close()
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return response["result"]
+
+
+def client(socket_path, command, kwargs):
+    """
+    Run a `parse` or `emit` CLI invocation on the server, writing its output locally
+
+    :param socket_path: Unix socket the server is listening on
+    :type socket_path: ```str```
+
+    :param command: "parse" or "emit"
+    :type command: ```str```
+
+    :param kwargs: Keyword arguments, as parsed from the CLI
+    :type kwargs: ```dict```
+    """
+    if command == "parse":
+        from django_settings_cli.parser import _cli_env, _cli_query, _output
+
+        if any(
+            map(
+                kwargs.get,
+                ("batch", "clear_cache", "watch", "xpath", "snapshot", "dump"),
+            )
+        ):
+            raise NotImplementedError(
+                "--batch, --clear-cache, --watch, --xpath, --snapshot and --dump run"
+                " locally"
+            )
+        infile, query = _cli_query(
+            kwargs["infile"], kwargs["query"], kwargs.get("queries")
+        )
+        infile, source = _read_infile(infile)
+        env = _cli_env(kwargs.get("env_vars"), kwargs.get("clean_env"))
+        r = request(
+            socket_path,
+            "parse",
+            {
+                "infile": infile,
+                "source": source,
+                "query": query,
+                "format_str": kwargs.get("format_str"),
+                "no_eval": kwargs.get("no_eval", False),
+                # Settings are evaluated with the client's environment
+                "env": dict(environ) if env is None else env,
+            },
+        )
+        _output(
+            r,
+            query,
+            outfile=kwargs.get("outfile"),
+            raw_strings=kwargs.get("raw_strings", False),
+            json_lines=kwargs.get("json_lines", False),
+            output_format=kwargs.get("output_format", "json"),
+        )
+    elif command == "emit":
+        from django_settings_cli.emitter import load_patch
+        from django_settings_cli.utils import write_if_changed
+
+        if kwargs.get("batch"):
+            raise NotImplementedError("--batch runs locally")
+
+        infile, query, outfile = kwargs["infile"], kwargs["query"], kwargs["outfile"]
+        if query is not None and not query.startswith(".") and infile is stdin:
+            infile, query = query, None
+        if kwargs.get("in_place"):
+            if infile is stdin:
+                raise ValueError("--in-place needs an infile")
+            outfile = infile
+        infile, source = _read_infile(infile)
+        patch = kwargs.get("patch")
+        r = request(
+            socket_path,
+            "emit",
+            {
+                "infile": infile,
+                "source": source,
+                "query": query,
+                "input_s": kwargs["input_s"],
+                "merge": str(kwargs["merge"]),
+                "patch": None if patch is None else load_patch(patch),
+            },
+        )
+        if outfile is None:
+            stdout.write(r["source"])
+        else:
+            # In the file's own PEP 263 encoding, as a local emit writes it
+            write_if_changed(outfile, r["source"], r["encoding"])
+    else:
+        raise NotImplementedError(command)
+
+
+__all__ = ["client", "make_server", "request", "serve"]
@@ -0,0 +1,437 @@
+"""
+Precompiled settings snapshots: the statically evaluated settings of a file, as one
+compact JSON text, with an open-addressing hash index of the byte span of every
+subtree in it. A lookup mmaps the snapshot, hashes the path, probes the index and
+decodes only that span—never parsing Python—so costs the same however large the
+settings are.
+
+A snapshot is fresh while its source, every settings module that imports—transitively—
+and the environment variables it read when evaluated are unchanged.
+
+Layout, little-endian:
+
+    header   magic, version, index slots, SHA-256 of the source, the offsets of the
+             sections below, and the SHA-1 of the environment variables read
+    names    the top-level names, newline separated
+    sources  SHA-256 of each settings module evaluated, by filename, as JSON
+    env      the names of the environment variables read, as JSON; `null` for all
+    index    `slots` × (path hash, key offset, key length, value offset, value length)
+    keys     each path, its keys NUL separated
+    values   the settings, as JSON
+"""
+
+import struct
+from argparse import ArgumentParser
+from collections import OrderedDict
+from hashlib import sha1
+from json import dumps, loads
+from os import environ, path, remove, replace
+
+from django_settings_cli.parser import _cli_env, _query_results, _returning_exceptions
+from django_settings_cli.parser.query import Index, Key, compile_query, is_extended
+from django_settings_cli.profiling import phase
+from django_settings_cli.utils import string_types
+
+__desc__ = "Compile a settings file into a snapshot, for `parse --snapshot`"
+
+MAGIC = b"DJSNAPSH"
+VERSION = 3
+
+_HEADER = struct.Struct("<8sHI32sQQQQQ20sQQQQ")
+_SLOT = struct.Struct("<QQIQI")
+
+
+def _path_key(keys):
+    return "\0".join("{}".format(key) for key in keys).encode("utf-8")
+
+
+def _path_hash(key):
+    return struct.unpack("<Q", sha1(key).digest()[:8])[0]
+
+
+def _encode(value, keys, out, spans):
+    """Append `value`, as JSON, to `out`; and the span of each subtree to `spans`"""
+    start = len(out)
+    if isinstance(value, dict):
+        out += b"{"
+        for i, (key, child) in enumerate(value.items()):
+            if i:
+                out += b","
+            key = "{}".format(key)
+            out += dumps(key).encode("utf-8") + b":"
+            _encode(child, keys + (key,), out, spans)
+        out += b"}"
+    elif isinstance(value, (list, tuple)):
+        out += b"["
+        for i, child in enumerate(value):
+            if i:
+                out += b","
+            _encode(child, keys + (i,), out, spans)
+        out += b"]"
+    else:
+        out += dumps(value, default=str).encode("utf-8")
+    spans.append((keys, start, len(out) - start))
+
+
+def build_snapshot(
+    settings, source_hash, sources=None, env_digest=None, env_names=None
+):
+    """
+    Serialise `settings` as a snapshot
+
+    :param settings: Top-level names to their values
+    :type settings: ```OrderedDict```
+
+    :param source_hash: SHA-256 hex digest of the source
+    :type source_hash: ```str```
+
+    :param sources: SHA-256 hex digest of each settings module evaluated, by filename
+    :type sources: ```Optional[Mapping[str, str]]```
+
+    :param env_digest: SHA-1 hex digest, of `utils.env_digest`, of the environment
+      variables read when evaluated; when `None`, the snapshot is never fresh
+    :type env_digest: ```Optional[str]```
+
+    :param env_names: Names of the environment variables read; `None` for all of them
+    :type env_names: ```Optional[Iterable[str]]```
+
+    :return: Snapshot
+    :rtype: ```bytes```
+    """
+    values, spans = bytearray(), []
+    for name, value in settings.items():
+        _encode(value, (name,), values, spans)
+
+    slots = 8
+    while slots < 2 * len(spans):
+        slots *= 2
+    table, keys = [None] * slots, bytearray()
+    for span_keys, offset, length in spans:
+        key = _path_key(span_keys)
+        slot = _path_hash(key) & (slots - 1)
+        while table[slot] is not None:
+            slot = (slot + 1) & (slots - 1)
+        table[slot] = _SLOT.pack(_path_hash(key), len(keys), len(key), offset, length)
+        keys += key
+
+    names = "\n".join(settings).encode("utf-8")
+    sources = dumps(OrderedDict(sorted((sources or {}).items()))).encode("utf-8")
+    env = dumps(None if env_names is None else sorted(env_names)).encode("utf-8")
+    empty = _SLOT.pack(0, 0, 0, 0, 0)
+    index = b"".join(empty if entry is None else entry for entry in table)
+    names_offset = _HEADER.size
+    sources_offset = names_offset + len(names)
+    env_offset = sources_offset + len(sources)
+    index_offset = env_offset + len(env)
+    keys_offset = index_offset + len(index)
+    values_offset = keys_offset + len(keys)
+    return b"".join(
+        (
+            _HEADER.pack(
+                MAGIC,
+                VERSION,
+                slots,
+                bytes(bytearray.fromhex(source_hash)),
+                names_offset,
+                index_offset,
+                keys_offset,
+                values_offset,
+                len(names),
+                bytes(bytearray.fromhex(env_digest or "00" * 20)),
+                sources_offset,
+                len(sources),
+                env_offset,
+                len(env),
+            ),
+            names,
+            sources,
+            env,
+            index,
+            bytes(keys),
+            bytes(values),
+        )
+    )
+
+
+class Snapshot(object):
+    """
+    A compiled snapshot, mmapped
+
+    :param filename: Snapshot filename
+    :type filename: ```str```
+    """
+
+    def __init__(self, filename):
+        from mmap import ACCESS_READ, mmap
+
+        self.filename = filename
+        with open(filename, "rb") as f:
+            self._buffer = mmap(f.fileno(), 0, access=ACCESS_READ)
+        if len(self._buffer) < _HEADER.size:
+            raise ValueError("Not a settings snapshot: {!r}".format(filename))
+        (
+            magic,
+            version,
+            self._slots,
+            source_hash,
+            names_offset,
+            self._index_offset,
+            self._keys_offset,
+            self._values_offset,
+            names_length,
+            env_digest,
+            sources_offset,
+            sources_length,
+            env_offset,
+            env_length,
+        ) = _HEADER.unpack_from(self._buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(
+                "Not a version {} snapshot: {!r}".format(VERSION, filename)
+            )
+        self.source_hash = "".join("{:02x}".format(b) for b in bytearray(source_hash))
+        self.env_digest = "".join("{:02x}".format(b) for b in bytearray(env_digest))
+        names = self._buffer[names_offset : names_offset + names_length]
+        self.names = tuple(names.decode("utf-8").split("\n")) if names else ()
+        self.sources = loads(
+            self._buffer[sources_offset : sources_offset + sources_length].decode(
+                "utf-8"
+            )
+        )
+        self.env_names = loads(
+            self._buffer[env_offset : env_offset + env_length].decode("utf-8")
+        )
+
+    def close(self):
+        self._buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def _span(self, keys):
+        """The `(offset, length)` of the value at `keys`; `None` if not indexed"""
+        key = _path_key(keys)
+        path_hash = _path_hash(key)
+        mask = self._slots - 1
+        slot = path_hash & mask
+        for _ in range(self._slots):
+            entry_hash, key_offset, key_length, offset, length = _SLOT.unpack_from(
+                self._buffer, self._index_offset + slot * _SLOT.size
+            )
+            if not length:
+                return None
+            elif entry_hash == path_hash:
+                key_offset += self._keys_offset
+                if self._buffer[key_offset : key_offset + key_length] == key:
+                    return self._values_offset + offset, length
+            slot = (slot + 1) & mask
+        return None
+
+    def get(self, keys):
+        """
+        Decode the value at `keys`
+
+        :param keys: Keys, from the top-level name, e.g., `("DATABASES", "default")`
+        :type keys: ```Sequence[Union[str, int]]```
+
+        :rtype: ```Any```
+        """
+        if not keys:
+            return OrderedDict((name, self.get((name,))) for name in self.names)
+        # The longest indexed prefix—all of `keys`, but for, e.g., negative indexes
+        for end in range(len(keys), 0, -1):
+            span = self._span(keys[:end])
+            if span is not None:
+                break
+        else:
+            raise KeyError(".{}".format(".".join(map("{}".format, keys))))
+        offset, length = span
+        value = loads(self._buffer[offset : offset + length].decode("utf-8"))
+        for key in keys[end:]:
+            try:
+                value = value[int(key) if isinstance(value, list) else key]
+            except (IndexError, KeyError, TypeError, ValueError):
+                raise KeyError(".{}".format(".".join(map("{}".format, keys))))
+        return value
+
+    def fresh(self, infile, env=None):
+        """
+        Whether the snapshot was compiled from the current `infile`, and the current
+        settings modules it imports, with the values in `env` of the variables read
+
+        :param infile: Settings filename
+        :type infile: ```str```
+
+        :param env: Environment for the evaluated `os.environ`; default the process's
+        :type env: ```Optional[Mapping[str, str]]```
+
+        :rtype: ```bool```
+        """
+        from django_settings_cli.parser.cache import content_hash
+        from django_settings_cli.utils import env_digest, read_text
+
+        if (
+            env_digest(environ if env is None else env, self.env_names)
+            != self.env_digest
+        ):
+            return False
+        try:
+            return content_hash(read_text(infile)) == self.source_hash and all(
+                content_hash(read_text(filename)) == source_hash
+                for filename, source_hash in self.sources.items()
+                if filename != path.abspath(infile)
+            )
+        except (IOError, OSError, SyntaxError, ValueError):
+            return False
+
+    def _resolve(self, query):
+        from django_settings_cli.parser import _UNKNOWN
+
+        if query == ".":
+            return self.get(())
+        elif not is_extended(query):
+            return self.get(tuple(query.split(".")[1:]))
+        compiled = compile_query(query)
+        if compiled.single:
+            return self.get(
+                tuple(
+                    step.key if isinstance(step, Key) else step.index
+                    for step in compiled.steps
+                    if isinstance(step, (Key, Index))
+                )
+            )
+        return compiled.search(
+            OrderedDict.fromkeys(self.names),
+            lambda name: self.get((name,)),
+            lambda keys: _UNKNOWN,
+        )
+
+    def query(self, query=".", format_str=None, no_eval=False, return_exceptions=False):
+        """
+        Query the snapshot, as `query_py_parser` does a settings file; the root query
+        is every setting, rather than the source
+
+        :param query: Query string, e.g., ".DATABASES.default"; or a list of them
+        :type query: ```Union[str, List[str]]```
+
+        :return: Resolved value; or, when `query` is a list, an `OrderedDict` keyed by
+          query
+        :rtype: ```Union[Any, OrderedDict]```
+        """
+        resolve = (
+            _returning_exceptions(self._resolve)
+            if return_exceptions
+            else (self._resolve)
+        )
+        with phase("snapshot"):
+            results = [
+                resolve(q)
+                for q in ((query,) if isinstance(query, string_types) else query)
+            ]
+        return _query_results(query, results, format_str, no_eval, return_exceptions)
+
+
+def compile_snapshot(infile, outfile=None, env=None):
+    """
+    Evaluate the settings of `infile` statically, and write them as a snapshot
+
+    :param infile: Settings filename
+    :type infile: ```str```
+
+    :param outfile: Snapshot filename; default `infile`, with the extension `.snapshot`
+    :type outfile: ```Optional[str]```
+
+    :param env: Environment for the evaluated `os.environ`; default the process's
+    :type env: ```Optional[Mapping[str, str]]```
+
+    :return: Snapshot filename
+    :rtype: ```str```
+    """
+    from tempfile import NamedTemporaryFile
+
+    from django_settings_cli.parser.cache import content_hash
+    from django_settings_cli.parser.evaluator import (
+        modules_cache,
+        setting_names,
+        to_python,
+    )
+    from django_settings_cli.utils import read_text
+
+    if outfile is None:
+        outfile = "{}.snapshot".format(path.splitext(infile)[0])
+    env = dict(environ if env is None else env)
+    with phase("read"):
+        source = read_text(infile)
+    with phase("evaluate"):
+        module = modules_cache.get(infile, env)
+    with phase("serialize"):
+        data = build_snapshot(
+            OrderedDict(
+                (name, to_python(module.symbols[name]))
+                for name in setting_names(module.symbols)
+            ),
+            content_hash(source),
+            sources=dict(
+                (filename, content_hash(read_text(filename)))
+                for filename in module.stat_keys
+            ),
+            env_digest=module.env_digest,
+            env_names=module.env_names,
+        )
+    with phase("write"):
+        with NamedTemporaryFile(
+            "wb",
+            dir=path.dirname(path.abspath(outfile)),
+            prefix=".{}.".format(path.basename(outfile)),
+            delete=False,
+        ) as f:
+            f.write(data)
+        try:
+            replace(f.name, outfile)
+        except OSError:
+            remove(f.name)
+            raise
+    return outfile
+
+
+def _parser_cli_args(parser=None):
+    parser = ArgumentParser(description=__desc__) if parser is None else parser
+    parser.add_argument("infile", help="Input file")
+    parser.add_argument(
+        "-o",
+        "--outfile",
+        help="Snapshot file (default: the infile, with the extension .snapshot)",
+    )
+    parser.add_argument(
+        "-e",
+        "--env",
+        help="NAME=VALUE seen by the settings' os.environ when evaluated statically;"
+        " repeat for many",
+        dest="env_vars",
+        action="append",
+    )
+    parser.add_argument(
+        "--clean-env",
+        help="Evaluate with only the --env variables, not this process's environment",
+        action="store_true",
+    )
+    return parser
+
+
+def compile_with_output(infile, outfile=None, env_vars=None, clean_env=False):
+    """Compile `infile` into a snapshot, printing its filename"""
+    print(compile_snapshot(infile, outfile=outfile, env=_cli_env(env_vars, clean_env)))
+
+
+__all__ = [
+    "MAGIC",
+    "Snapshot",
+    "VERSION",
+    "build_snapshot",
+    "compile_snapshot",
+    "compile_with_output",
+]
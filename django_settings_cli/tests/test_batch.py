@@ -0,0 +1,84 @@
+from os import mkdir, path
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest import main as unittest_main
+
+from django_settings_cli.emitter import MergeStrategy
+from django_settings_cli.emitter.batch import emit_batch
+from django_settings_cli.parser.batch import query_batch
+
+
+class TestBatch(TestCase):
+    def setUp(self):
+        self.tempdir = mkdtemp()
+        mkdir(path.join(self.tempdir, "proj"))
+        for filename, s in (
+            ("a.py", "DEBUG = True\nSECRET_KEY = 'a'\n"),
+            ("b.py", "DEBUG = False\n"),
+            (path.join("proj", "settings.py"), "DEBUG = (\n"),
+        ):
+            with open(path.join(self.tempdir, filename), "wt") as f:
+                f.write(s)
+
+    def tearDown(self):
+        rmtree(self.tempdir)
+
+    def query(self, jobs):
+        return sorted(
+            (
+                path.relpath(record["path"], self.tempdir),
+                record["query"],
+                record.get("value", record.get("error", "").partition(":")[0]),
+            )
+            for record in query_batch(
+                paths=[self.tempdir], queries=[".DEBUG", ".SECRET_KEY"], jobs=jobs
+            )
+        )
+
+    def test_query_batch(self):
+        expected = [
+            ("a.py", ".DEBUG", True),
+            ("a.py", ".SECRET_KEY", "a"),
+            ("b.py", ".DEBUG", False),
+            ("b.py", ".SECRET_KEY", "KeyError"),
+            (path.join("proj", "settings.py"), ".DEBUG", "SyntaxError"),
+            (path.join("proj", "settings.py"), ".SECRET_KEY", "SyntaxError"),
+        ]
+        self.assertEqual(self.query(jobs=1), expected)
+        self.assertEqual(self.query(jobs=2), expected)
+
+    def test_emit_batch(self):
+        def emit(jobs):
+            return sorted(
+                (
+                    path.relpath(record["path"], self.tempdir),
+                    record["status"],
+                    record.get("error", "").partition(":")[0],
+                )
+                for record in emit_batch(
+                    paths=[path.join(self.tempdir, "**", "*.py")],
+                    query=".DEBUG",
+                    input_s="False",
+                    merge=MergeStrategy.upsert,
+                    jobs=jobs,
+                )
+            )
+
+        self.assertEqual(
+            emit(jobs=2),
+            [
+                ("a.py", "changed", ""),
+                ("b.py", "unchanged", ""),
+                (path.join("proj", "settings.py"), "failed", "SyntaxError"),
+            ],
+        )
+        self.assertEqual(
+            [status for _, status, _ in emit(jobs=1)][:2], ["unchanged"] * 2
+        )
+        with open(path.join(self.tempdir, "a.py"), "rt") as f:
+            self.assertEqual(f.read(), "DEBUG = False\nSECRET_KEY = 'a'\n")
+
+
+if __name__ == "__main__":
+    unittest_main()
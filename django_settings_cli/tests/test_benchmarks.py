@@ -0,0 +1,62 @@
+import ast
+from glob import glob
+from os import path
+from tempfile import gettempdir
+from unittest import TestCase
+from unittest import main as unittest_main
+
+from django_settings_cli.benchmarks import compare, run
+from django_settings_cli.benchmarks.generator import (
+    SHAPES,
+    generate_settings,
+    parse_size,
+)
+from django_settings_cli.parser import query_py_parser
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+
+class TestBenchmarks(TestCase):
+    def test_parse_size(self):
+        self.assertEqual(parse_size("1KB"), 1024)
+        self.assertEqual(parse_size("50MB"), 50 * 1024 * 1024)
+        self.assertEqual(parse_size(7), 7)
+        self.assertRaises(ValueError, parse_size, "big")
+
+    def test_generate_settings(self):
+        for shape in SHAPES:
+            source, queries = generate_settings("8KB", shape)
+            self.assertGreaterEqual(len(source), 8 * 1024)
+            ast.parse(source)
+            results = query_py_parser(StringIO(source), query=queries)
+            self.assertEqual(results[".DEBUG"], False)
+            self.assertNotIn(None, results.values())
+
+    def test_run_and_compare(self):
+        tmpdirs = path.join(gettempdir(), "django_settings_cli_bench*")
+        before = set(glob(tmpdirs))
+        with patch("django_settings_cli.benchmarks._literal_tree") as literal_tree:
+            results = run(sizes=("1KB",), shapes=("mixed",), cases=("emit",), repeat=1)
+            # Only the inputs of the cases run are built
+            literal_tree.assert_not_called()
+        self.assertEqual(list(results["results"]), ["emit[mixed,1KB]"])
+        self.assertEqual(set(glob(tmpdirs)), before)
+        self.assertEqual(compare(results, results), [])
+
+        slower = {"results": {"emit[mixed,1KB]": {"min": 1.0}}}
+        faster = {"results": {"emit[mixed,1KB]": {"min": 0.5}}}
+        self.assertEqual(compare(faster, slower), [("emit[mixed,1KB]", 0.5, 1.0)])
+        self.assertEqual(compare(slower, faster), [])
+        self.assertEqual(compare(faster, slower, threshold=1.5), [])
+
+
+if __name__ == "__main__":
+    unittest_main()
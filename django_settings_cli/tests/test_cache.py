@@ -0,0 +1,71 @@
+from os import listdir, path, utime
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest import main as unittest_main
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from django_settings_cli.parser import query_py_parser
+from django_settings_cli.parser.cache import FileCache
+
+
+class TestCache(TestCase):
+    def setUp(self):
+        self.tempdir = mkdtemp()
+        self.cache = FileCache(path.join(self.tempdir, "cache"))
+        self.settings_py = path.join(self.tempdir, "settings.py")
+        self.write_settings("DEBUG = True\nDATABASES = {'default': {'NAME': 'a'}}\n")
+
+    def tearDown(self):
+        rmtree(self.tempdir)
+
+    def write_settings(self, s):
+        with open(self.settings_py, "wt") as f:
+            f.write(s)
+
+    def query(self, query):
+        return query_py_parser(infile=self.settings_py, query=query, cache=self.cache)
+
+    def test_hit_skips_parse(self):
+        self.assertEqual(self.query(".DATABASES.default.NAME"), "a")
+        with patch("django_settings_cli.parser.ast.parse") as ast_parse:
+            self.assertEqual(
+                list(self.query([".DEBUG", ".DATABASES.default"]).values()),
+                [True, {"NAME": "a"}],
+            )
+            ast_parse.assert_not_called()
+
+    def test_stale_on_change(self):
+        self.assertTrue(self.query(".DEBUG"))
+        self.write_settings("DEBUG = False\n")
+        self.assertFalse(self.query(".DEBUG"))
+
+    def test_revalidate_by_source_encoding(self):
+        with open(self.settings_py, "wb") as f:
+            f.write(b"# -*- coding: latin-1 -*-\r\nNAME = '\xe9t\xe9'\r\n")
+        self.assertEqual(self.query(".NAME"), "\xe9t\xe9")
+        utime(self.settings_py, (0, 0))
+        with patch("django_settings_cli.parser.ast.parse") as ast_parse:
+            self.assertEqual(self.query(".NAME"), "\xe9t\xe9")
+            ast_parse.assert_not_called()
+
+    def test_evict_and_clear(self):
+        self.query(".DEBUG")
+        self.assertEqual(len(listdir(self.cache.directory)), 1)
+        self.cache.max_size = 0
+        self.cache.evict()
+        self.assertEqual(len(listdir(self.cache.directory)), 0)
+
+        self.cache.max_size = 1024
+        self.query(".DEBUG")
+        self.assertEqual(len(listdir(self.cache.directory)), 1)
+        self.cache.clear()
+        self.assertEqual(len(listdir(self.cache.directory)), 0)
+
+
+if __name__ == "__main__":
+    unittest_main()
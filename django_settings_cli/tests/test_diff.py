@@ -0,0 +1,145 @@
+from collections import OrderedDict
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest import main as unittest_main
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from django_settings_cli.diff import diff, diff_files, fingerprint, format_path
+from django_settings_cli.parser.cache import FileCache
+
+base_py = """
+import os
+
+DEBUG = False
+DATABASES = {"default": {"HOST": os.environ.get("DB_HOST", "localhost"), "PORT": 5432}}
+INSTALLED_APPS = ["a", "b"]
+LOGGING = {"django.request": {"level": "ERROR"}}
+"""
+
+production_py = """
+from base import *
+
+DATABASES["default"]["HOST"] = "db.internal"
+INSTALLED_APPS += ["c"]
+SECRET_KEY = "secret"
+"""
+
+
+class TestDiff(TestCase):
+    def setUp(self):
+        self.tempdir = mkdtemp()
+        self.base = path.join(self.tempdir, "base.py")
+        self.production = path.join(self.tempdir, "production.py")
+        for filename, source in (self.base, base_py), (self.production, production_py):
+            with open(filename, "wt") as f:
+                f.write(source)
+
+    def tearDown(self):
+        rmtree(self.tempdir)
+
+    def test_fingerprint(self):
+        a = fingerprint({"A": {"x": 1, "y": [1, 2]}, "B": "b"})
+        b = fingerprint(OrderedDict((("B", "b"), ("A", {"y": [1, 2], "x": 1}))))
+        self.assertEqual(a.digest, b.digest)
+        self.assertNotEqual(a.digest, fingerprint({"A": {"x": 1}, "B": "b"}).digest)
+        self.assertNotEqual(fingerprint(1).digest, fingerprint("1").digest)
+        self.assertEqual(list(diff(a, b)), [])
+
+    def test_sets(self):
+        a = fingerprint({"A": {"x", "y", "z"}})
+        self.assertEqual(a.digest, fingerprint({"A": frozenset("zyx")}).digest)
+        self.assertNotEqual(a.digest, fingerprint({"A": ["x", "y", "z"]}).digest)
+        self.assertEqual(
+            [
+                (change.op, format_path(change.path), sorted(change.new))
+                for change in diff(a, fingerprint({"A": {"x", "y", "w"}}))
+            ],
+            [("changed", ".A", ["w", "x", "y"])],
+        )
+
+        # Not by their order, which varies with the hash seed
+        with open(self.production, "wt") as f:
+            f.write("ALLOWED_HOSTS = {'c', 'b', 'a'}\n")
+        with open(self.base, "wt") as f:
+            f.write("ALLOWED_HOSTS = {'a', 'b', 'c'}\n")
+        self.assertEqual(list(diff_files(self.base, [self.production], env={})), [])
+
+    def test_diff(self):
+        changes = list(
+            diff(
+                fingerprint({"A": {"x": 1, "y": [1, 2]}, "B": "b"}),
+                fingerprint({"A": {"x": 2, "y": [1]}, "C": None}),
+            )
+        )
+        self.assertEqual(
+            [(change.op, format_path(change.path)) for change in changes],
+            [
+                ("changed", ".A.x"),
+                ("removed", ".A.y[1]"),
+                ("removed", ".B"),
+                ("added", ".C"),
+            ],
+        )
+        self.assertEqual(
+            format_path(("LOGGING", "django.request")), ".LOGGING['django.request']"
+        )
+
+    def test_diff_files(self):
+        records = list(diff_files(self.base, [self.production, self.base], env={}))
+        self.assertEqual(
+            [(r["op"], r["query"], r.get("old"), r.get("new")) for r in records],
+            [
+                ("changed", ".DATABASES.default.HOST", "localhost", "db.internal"),
+                ("added", ".INSTALLED_APPS[2]", None, "c"),
+                ("added", ".SECRET_KEY", None, "secret"),
+            ],
+        )
+        self.assertTrue(all(r["path"] == self.production for r in records))
+
+    def test_cache(self):
+        cache = FileCache(path.join(self.tempdir, "cache"))
+        expected = list(diff_files(self.base, [self.production], env={}, cache=cache))
+        self.assertIsNotNone(cache.get(self.production))
+        self.assertEqual(
+            list(diff_files(self.base, [self.production], env={}, cache=cache)),
+            expected,
+        )
+        # Invalidated by the environment variables read, not by others
+        self.assertEqual(
+            cache.get(self.production)["env_names"], frozenset(("DB_HOST",))
+        )
+        with patch(
+            "django_settings_cli.parser.evaluator.modules_cache.get"
+        ) as modules_get:
+            self.assertEqual(
+                list(
+                    diff_files(
+                        self.base, [self.production], env={"PWD": "/"}, cache=cache
+                    )
+                ),
+                expected,
+            )
+        modules_get.assert_not_called()
+        self.assertEqual(
+            list(
+                diff_files(self.base, [self.base], env={"DB_HOST": "db"}, cache=cache)
+            ),
+            [],
+        )
+        # And by changes to what is imported
+        with open(self.base, "at") as f:
+            f.write("DEBUG = True\n")
+        self.assertEqual(
+            list(diff_files(self.base, [self.production], env={}, cache=cache)),
+            expected,
+        )
+
+
+if __name__ == "__main__":
+    unittest_main()
@@ -0,0 +1,89 @@
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Thread
+from unittest import TestCase
+from unittest import main as unittest_main
+from weakref import ref
+
+from django_settings_cli.document import SettingsDocument
+
+settings_py = """
+import os
+
+DEBUG = False
+DATABASES = {"default": {"ENGINE": "django.db.backends.postgresql", "NAME": "db"}}
+DATABASES["replica"] = {"HOST": os.environ.get("DB_HOST", "localhost")}
+INSTALLED_APPS = ["a"]
+INSTALLED_APPS += ["b"]
+"""
+
+
+class TestSettingsDocument(TestCase):
+    def test_query(self):
+        document = SettingsDocument(settings_py, env={"DB_HOST": "db.internal"})
+        self.assertEqual(document.names, ("DEBUG", "DATABASES", "INSTALLED_APPS"))
+        self.assertIn("DEBUG", document)
+        self.assertFalse(document.query(".DEBUG"))
+        self.assertEqual(document.query(".DATABASES.replica.HOST"), "db.internal")
+        self.assertEqual(document.query(".INSTALLED_APPS"), ["a", "b"])
+        results = document.query(
+            [".DATABASES.default", ".MISSING"],
+            format_str='{ENGINE[ENGINE.rfind(".")+1:]}://{NAME}',
+            return_exceptions=True,
+        )
+        self.assertEqual(results[".DATABASES.default"], "postgresql://db")
+        self.assertIsInstance(results[".MISSING"], KeyError)
+        self.assertRaises(KeyError, document.query, ".MISSING")
+
+    def test_values_are_not_shared(self):
+        document = SettingsDocument(settings_py)
+        document.query(".DATABASES.default")["NAME"] = "changed"
+        document.query(".INSTALLED_APPS").append("c")
+        self.assertEqual(document.query(".DATABASES.default.NAME"), "db")
+        self.assertEqual(document.query(".INSTALLED_APPS"), ["a", "b"])
+
+        other = SettingsDocument("OTHER = 1\n")
+        self.assertEqual(other.names, ("OTHER",))
+        self.assertRaises(KeyError, other.query, ".DEBUG")
+
+    def test_concurrent_queries(self):
+        document = SettingsDocument(settings_py, env={})
+        queries = [".DEBUG", ".DATABASES.replica.HOST", ".INSTALLED_APPS"]
+        expected = document.query(queries)
+        document = SettingsDocument(settings_py, env={})
+        results = []
+
+        def run():
+            for _ in range(50):
+                results.append(document.query(queries))
+
+        threads = [Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 8 * 50)
+        self.assertTrue(all(result == expected for result in results))
+
+    def test_from_file_and_release(self):
+        tempdir = mkdtemp()
+        try:
+            with open(path.join(tempdir, "base.py"), "wt") as f:
+                f.write("DEBUG = False\nNAME = 'base'\n")
+            with open(path.join(tempdir, "local.py"), "wt") as f:
+                f.write("from .base import *\nDEBUG = True\n")
+            document = SettingsDocument.from_file(path.join(tempdir, "local.py"))
+            self.assertEqual(
+                list(document.query([".DEBUG", ".NAME"]).values()), [True, "base"]
+            )
+        finally:
+            rmtree(tempdir)
+
+        reference = ref(document)
+        del document
+        self.assertIsNone(reference())
+
+
+if __name__ == "__main__":
+    unittest_main()
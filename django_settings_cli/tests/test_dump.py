@@ -0,0 +1,106 @@
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest import main as unittest_main
+
+from django_settings_cli.parser.dump import dump_file, split_statements
+
+settings_py = '''
+import os
+
+DEBUG = False
+DATABASES = {
+"default": {"HOST": os.environ.get("DB_HOST", "localhost")},
+}
+DOC = """
+NOT_A_SETTING = 1
+"""
+CACHES = {"default": {"LOCATION": "a"}}
+CACHES["default"] = {"LOCATION": "b"}
+INSTALLED_APPS = ["a"]
+INSTALLED_APPS += ["b"]
+if DEBUG:
+    LOG_LEVEL = "DEBUG"
+else:
+    LOG_LEVEL = "INFO"
+DEBUG = True
+'''
+
+
+class TestDump(TestCase):
+    def setUp(self):
+        self.tempdir = mkdtemp()
+        self.settings_py = path.join(self.tempdir, "settings.py")
+        with open(self.settings_py, "wt") as f:
+            f.write(settings_py)
+
+    def tearDown(self):
+        rmtree(self.tempdir)
+
+    def test_split_statements(self):
+        spans = split_statements(settings_py, 64)
+        self.assertEqual(spans[0][0], 0)
+        self.assertEqual(spans[-1][1], len(settings_py))
+        self.assertTrue(all(a[1] == b[0] for a, b in zip(spans, spans[1:])))
+        for start, _ in spans[1:]:
+            self.assertEqual(settings_py[start - 1], "\n")
+            self.assertNotIn(settings_py[start : start + 4], ("else", "    "))
+
+    def test_dump(self):
+        expected = {
+            "DEBUG": True,
+            "DATABASES": {"default": {"HOST": "db"}},
+            "DOC": "\nNOT_A_SETTING = 1\n",
+            "CACHES": {"default": {"LOCATION": "b"}},
+            "INSTALLED_APPS": ["a", "b"],
+            "LOG_LEVEL": "INFO",
+        }
+        serial = dump_file(self.settings_py, jobs=1, env={"DB_HOST": "db"})
+        self.assertEqual(list(serial), list(expected))
+        self.assertEqual(dict(serial), expected)
+        # Split across workers, with ranges ending within the dict and the string
+        parallel = dump_file(
+            self.settings_py, jobs=2, env={"DB_HOST": "db"}, threshold=0
+        )
+        self.assertEqual(parallel, serial)
+
+        with open(self.settings_py, "wt") as f:
+            f.write(
+                "".join(
+                    "SETTING_{i:d} = {{'i': {i:d}}}\nSETTING_{i:d}['j'] = [{i:d}]\n".format(
+                        i=i
+                    )
+                    for i in range(100)
+                )
+            )
+        parallel = dump_file(self.settings_py, jobs=2, threshold=0)
+        self.assertEqual(len(parallel), 100)
+        self.assertEqual(parallel["SETTING_99"], {"i": 99, "j": [99]})
+        self.assertEqual(parallel, dump_file(self.settings_py, jobs=1))
+
+    def test_dump_star_import(self):
+        with open(path.join(self.tempdir, "base.py"), "wt") as f:
+            f.write(
+                "import os\nDEBUG = False\nSECRET_KEY = 'base'\n"
+                "CACHES = {'default': {'LOCATION': 'a'}}\n"
+            )
+        prod_py = path.join(self.tempdir, "prod.py")
+        with open(prod_py, "wt") as f:
+            f.write(
+                "from base import *\nSECRET_KEY = 'prod'\n"
+                "CACHES['default']['TIMEOUT'] = 1\nALLOWED_HOSTS = ['*']\n"
+            )
+        self.assertEqual(
+            list(dump_file(prod_py, jobs=1, env={}).items()),
+            [
+                ("DEBUG", False),
+                ("SECRET_KEY", "prod"),
+                ("CACHES", {"default": {"LOCATION": "a", "TIMEOUT": 1}}),
+                ("ALLOWED_HOSTS", ["*"]),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest_main()
@@ -0,0 +1,266 @@
+from collections import OrderedDict
+from os import path
+from shutil import rmtree
+from sys import version
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest import main as unittest_main
+
+if version[0] == "2":
+    try:
+        from cStringIO import StringIO
+    except ImportError:
+        from StringIO import StringIO
+else:
+    from io import StringIO
+
+from django_settings_cli.emitter import MergeStrategy, emit, emit_source
+
+settings_py = """# -*- coding: utf-8 -*-
+DEBUG = True  # keep me
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.postgresql',  # é
+        'HOST': 'localhost',
+    },
+}
+CACHES = {'é': {'BACKEND': 'x'}}
+REST_FRAMEWORK["X"] = {}
+"""
+
+
+class TestEmitter(TestCase):
+    def upsert(self, query, input_s, source=settings_py):
+        return emit_source(
+            infile=StringIO(source),
+            query=query,
+            input_s=input_s,
+            merge=MergeStrategy.upsert,
+        )
+
+    def test_replace_value_only(self):
+        self.assertEqual(
+            self.upsert(".DEBUG", "False"),
+            settings_py.replace("DEBUG = True", "DEBUG = False"),
+        )
+        self.assertEqual(
+            self.upsert(".DATABASES.default.HOST", "DATABASES = 'db'"),
+            settings_py.replace("'localhost'", "'db'"),
+        )
+        self.assertEqual(
+            self.upsert(".CACHES.é.BACKEND", "'y'"),
+            settings_py.replace("'x'", "'y'"),
+        )
+        self.assertEqual(
+            self.upsert(".REST_FRAMEWORK.X", "None"),
+            settings_py.replace('["X"] = {}', '["X"] = None'),
+        )
+
+    def test_insert_into_dict(self):
+        self.assertEqual(
+            self.upsert(".DATABASES.default.PORT", "5432"),
+            settings_py.replace(
+                "'localhost',\n", "'localhost',\n        'PORT': 5432,\n"
+            ),
+        )
+        self.assertEqual(
+            self.upsert(".CACHES.é.LOCATION", "'l'"),
+            settings_py.replace("'x'}", "'x', 'LOCATION': 'l'}"),
+        )
+        self.assertEqual(
+            self.upsert(".REST_FRAMEWORK.X.Y.Z", "1"),
+            settings_py.replace('["X"] = {}', "[\"X\"] = {'Y': {'Z': 1}}"),
+        )
+
+    def test_append(self):
+        self.assertEqual(
+            self.upsert(".SECRET_KEY", "'s'"), settings_py + "SECRET_KEY = 's'\n"
+        )
+        self.assertEqual(
+            self.upsert(".REST_FRAMEWORK.Y", "1"),
+            settings_py + "REST_FRAMEWORK['Y'] = 1\n",
+        )
+        self.assertEqual(
+            self.upsert(".A", "1", source="B = 2\r\nC = 3"),
+            "B = 2\r\nC = 3\r\nA = 1\r\n",
+        )
+
+    def merge(self, merge, query, input_s, source):
+        return emit_source(
+            infile=StringIO(source), query=query, input_s=input_s, merge=merge
+        )
+
+    def test_merge(self):
+        source = (
+            "CACHES = {\n"
+            "    'default': {'BACKEND': 'a', 'TIMEOUT': 60},\n"
+            "}\n"
+            "INSTALLED_APPS = ('x', 'y')\n"
+            "EMPTY = ()\n"
+        )
+        fragment = "{'default': {'TIMEOUT': 300, 'OPTIONS': {}}, 'other': {}}"
+        self.assertEqual(
+            self.merge(MergeStrategy.merge_into, ".CACHES", fragment, source),
+            source.replace(
+                "'TIMEOUT': 60},\n",
+                "'TIMEOUT': 300, 'OPTIONS': {}},\n    'other': {},\n",
+            ),
+        )
+        self.assertEqual(
+            self.merge(MergeStrategy.merge_from, ".CACHES", fragment, source),
+            source.replace(
+                "'TIMEOUT': 60},\n",
+                "'TIMEOUT': 60, 'OPTIONS': {}},\n    'other': {},\n",
+            ),
+        )
+        self.assertEqual(
+            self.merge(
+                MergeStrategy.merge_into, ".INSTALLED_APPS", "['y', 'z']", source
+            ),
+            source.replace("('x', 'y')", "('x', 'y', 'z')"),
+        )
+        self.assertEqual(
+            self.merge(MergeStrategy.merge_from, ".EMPTY", "['z']", source),
+            source.replace("EMPTY = ()", "EMPTY = ('z',)"),
+        )
+        self.assertEqual(
+            self.merge(MergeStrategy.merge_into, ".CACHES.other", "{}", source),
+            source.replace("60},\n", "60},\n    'other': {},\n"),
+        )
+
+    def test_patch(self):
+        self.assertEqual(
+            emit_source(
+                infile=StringIO(settings_py),
+                query=None,
+                input_s=None,
+                merge=MergeStrategy.upsert,
+                patch={
+                    ".DEBUG": False,
+                    ".DATABASES.default.HOST": "db",
+                    ".DATABASES.default.PORT": 5432,
+                    ".DATABASES.default.OPTIONS.sslmode": "require",
+                    ".CACHES.é.LOCATION": "l",
+                    ".SECRET_KEY": "s",
+                    ".ALLOWED_HOSTS": ["*"],
+                },
+            ),
+            settings_py.replace("DEBUG = True", "DEBUG = False")
+            .replace(
+                "'localhost',\n",
+                "'db',\n        'PORT': 5432,\n"
+                "        'OPTIONS': {'sslmode': 'require'},\n",
+            )
+            .replace("'x'}", "'x', 'LOCATION': 'l'}")
+            + "SECRET_KEY = 's'\nALLOWED_HOSTS = ['*']\n",
+        )
+
+    def test_patch_parent_supersedes_children(self):
+        for patch in (
+            OrderedDict(((".A.x", 1), (".A", {"y": 2}))),
+            OrderedDict(((".A", {"y": 2}), (".A.x", 1), (".A.x.z", 3))),
+        ):
+            self.assertEqual(
+                emit_source(
+                    infile=StringIO("A = {'x': 0}\n"),
+                    query=None,
+                    input_s=None,
+                    merge=MergeStrategy.upsert,
+                    patch=patch,
+                ),
+                "A = {'y': 2}\n",
+            )
+
+    def test_patch_children_merged_into_parent(self):
+        merge = lambda merge, patch: emit_source(
+            infile=StringIO("A = {'x': 0}\n"),
+            query=None,
+            input_s=None,
+            merge=merge,
+            patch=OrderedDict(patch),
+        )
+        for patch in (
+            ((".A.x", 1), (".A", {"y": 2})),
+            ((".A", {"y": 2}), (".A.x", 1)),
+        ):
+            self.assertEqual(
+                merge(MergeStrategy.merge_into, patch), "A = {'x': 1, 'y': 2}\n"
+            )
+            # The existing value wins conflicts
+            self.assertEqual(
+                merge(MergeStrategy.merge_from, patch), "A = {'x': 0, 'y': 2}\n"
+            )
+        for strategy in MergeStrategy.merge_into, MergeStrategy.merge_from:
+            self.assertEqual(
+                merge(
+                    strategy,
+                    (
+                        (".A.w.v", 3),
+                        (".A", {"y": 2, "w": {"u": 4}}),
+                        (".A.w", {"t": 5}),
+                    ),
+                ),
+                "A = {'x': 0, 'y': 2, 'w': {'u': 4, 't': 5, 'v': 3}}\n",
+            )
+            for patch in (
+                ((".A", {"y": 2}), (".A.x", 1), (".A.x.z", 3)),
+                ((".A", "s"), (".A.x", 1)),
+            ):
+                self.assertRaises(ValueError, merge, strategy, patch)
+
+    def test_nested_json_patch(self):
+        tempdir = mkdtemp()
+        try:
+            settings, patch_file = (
+                path.join(tempdir, filename) for filename in ("settings.py", "p.json")
+            )
+            with open(settings, "wt") as f:
+                f.write("DEBUG = True\n")
+            with open(patch_file, "wt") as f:
+                f.write('{".CACHES": {"default": {"LOCATION": ["a", 1]}}}')
+            emit(
+                infile=settings,
+                query=None,
+                input_s=None,
+                merge=MergeStrategy.upsert,
+                outfile=None,
+                patch=patch_file,
+                in_place=True,
+            )
+            with open(settings, "rt") as f:
+                self.assertEqual(
+                    f.read(),
+                    "DEBUG = True\nCACHES = {'default': {'LOCATION': ['a', 1]}}\n",
+                )
+        finally:
+            rmtree(tempdir)
+
+    def test_in_place_only_if_changed(self):
+        tempdir = mkdtemp()
+        try:
+            settings, patch_file = (
+                path.join(tempdir, filename) for filename in ("settings.py", "p.json")
+            )
+            with open(settings, "wt") as f:
+                f.write(settings_py)
+            with open(patch_file, "wt") as f:
+                f.write('{".DEBUG": false}')
+
+            emit_kwargs = dict(
+                query=None,
+                input_s=None,
+                merge=MergeStrategy.upsert,
+                outfile=None,
+                patch=patch_file,
+                in_place=True,
+            )
+            self.assertTrue(emit(infile=settings, **emit_kwargs))
+            self.assertFalse(emit(infile=settings, **emit_kwargs))
+            with open(settings, "rt") as f:
+                self.assertIn("DEBUG = False  # keep me", f.read())
+        finally:
+            rmtree(tempdir)
+
+
+if __name__ == "__main__":
+    unittest_main()
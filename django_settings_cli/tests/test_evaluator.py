@@ -0,0 +1,294 @@
+import ast
+from os import mkdir, path
+from shutil import rmtree
+from sys import version
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest import main as unittest_main
+
+if version[0] == "2":
+    try:
+        from cStringIO import StringIO
+    except ImportError:
+        from StringIO import StringIO
+else:
+    from io import StringIO
+
+from django_settings_cli.parser import query_py_parser
+from django_settings_cli.parser.evaluator import (
+    UNKNOWN,
+    ModuleCache,
+    StaticEvaluator,
+    to_python,
+)
+
+settings_py = """
+import os
+from os import environ
+from pathlib import Path
+
+BASE_DIR = Path("/srv/app/proj/settings.py").parent.parent
+STATIC_ROOT = BASE_DIR / "static"
+HOST = os.environ.get("DB_HOST", "localhost")
+PORT = int(os.getenv("DB_PORT", "5432"))
+NAME = "app_" + environ["ENV"]
+DEBUG = environ.get("DEBUG") == "1"
+DATABASES = {"default": {"HOST": HOST, "PORT": PORT, "NAME": NAME}}
+DATABASES["default"]["URL"] = f"postgres://{HOST}:{PORT}/{NAME}"
+CACHE = "{}:{}".format(HOST, 11211)
+if DEBUG:
+    LEVEL = "DEBUG"
+else:
+    LEVEL = "INFO"
+INSTALLED_APPS = ["a", *["b"], os.getcwd()]
+try:
+    SECRET_KEY = environ["SECRET_KEY"]
+except KeyError:
+    SECRET_KEY = "dev"
+"""
+
+
+class TestEvaluator(TestCase):
+    env = {"DB_PORT": "6432", "ENV": "prod"}
+
+    def test_evaluate(self):
+        symbols = StaticEvaluator(env=self.env).run(ast.parse(settings_py))
+        self.assertEqual(
+            to_python(symbols["DATABASES"]),
+            {
+                "default": {
+                    "HOST": "localhost",
+                    "PORT": 6432,
+                    "NAME": "app_prod",
+                    "URL": "postgres://localhost:6432/app_prod",
+                }
+            },
+        )
+        self.assertEqual(to_python(symbols["STATIC_ROOT"]), "/srv/app/static")
+        self.assertEqual(symbols["CACHE"], "localhost:11211")
+        self.assertEqual(symbols["LEVEL"], "INFO")
+        self.assertEqual(symbols["INSTALLED_APPS"], ["a", "b", None])
+        self.assertIs(symbols["SECRET_KEY"], UNKNOWN)
+
+    def test_sandboxed(self):
+        symbols = StaticEvaluator(env={}).run(
+            ast.parse(
+                "A = open('/etc/passwd').read()\n"
+                "B = ''.__class__\n"
+                "C = '{0.__class__}'.format('')\n"
+                "D = 'x' * 10 ** 9\n"
+                "E = __import__('os')\n"
+            )
+        )
+        self.assertEqual(set(symbols.values()), {UNKNOWN})
+
+    def test_bounded(self):
+        symbols = StaticEvaluator(env={}).run(
+            ast.parse(
+                "X = 'a' * 2 ** 19\n"
+                "A = X + X + X\n"
+                "B = '-'.join([X, X, X])\n"
+                "C = X.replace('a', 'aaa')\n"
+                "D = f'{1:>999999999}'\n"
+                "E = '{:.999999999f}'.format(1.0)\n"
+                "F = '{0}{0}{0}'.format(X)\n"
+                "G = f'{X}{X}{X}'\n"
+                "H = '%999999999d' % 1\n"
+                "I = '%(x)s%(x)s%(x)s' % {'x': X}\n"
+                "J = 7 ** 10 ** 6\n"
+                "K = 1 << 10 ** 7\n"
+            )
+        )
+        self.assertEqual(len(symbols.pop("X")), 2**19)
+        self.assertEqual(set(symbols.values()), {UNKNOWN})
+
+        # Nested containers count each time they recur, whether aliased or not
+        symbols = StaticEvaluator(env={}).run(
+            ast.parse(
+                "X = [[0] * 1000] * 1000\n"
+                "A = [[0] * 1000000] * 1000\n"
+                "B = '%s' % ([[1] * 1000000] * 1000,)\n"
+                "C = '%s%s' % (X, X)\n"
+                "D = str([X, X])\n"
+                "E = f'{X}{X}'\n"
+                "F = [X, X]\n"
+                "G = X\n"
+                "G += X\n"
+                "H = {}\n"
+                "H['a'] = X\n"
+                "H['b'] = X\n"
+                "I = [0]\n"
+                "I[0] = I\n"
+            )
+        )
+        self.assertEqual(len(symbols.pop("X")), 1000)
+        # Its element is unknown—so `None`—rather than formatted
+        self.assertEqual(symbols.pop("B"), "None")
+        self.assertEqual(set(symbols.values()), {UNKNOWN})
+
+        symbols = StaticEvaluator(env={}).run(
+            ast.parse("A = '-'.join(['a', 'b']).replace('-', '+')\nB = '%5.1f' % 2\n")
+        )
+        self.assertEqual(symbols, {"A": "a+b", "B": "  2.0"})
+
+    def test_environ_copied_on_write(self):
+        env = {"A": "1"}
+        symbols = StaticEvaluator(env=env).run(
+            ast.parse(
+                "import os\n"
+                "E = os.environ\n"
+                "os.environ['A'] = '2'\n"
+                "E['B'] = '3'\n"
+                "A = os.getenv('A')\n"
+                "B = os.environ['B']\n"
+            )
+        )
+        self.assertEqual((symbols["A"], symbols["B"]), ("2", "3"))
+        self.assertEqual(env, {"A": "1"})
+
+    def test_environ_reads(self):
+        evaluator = StaticEvaluator(env={"A": "1", "B": "2", "C": "3"})
+        evaluator.run(
+            ast.parse(
+                "import os\n"
+                "os.environ['B'] = '4'\n"
+                "A = os.getenv('A')\n"
+                "B = os.environ['B']\n"
+                "D = 'D' in os.environ\n"
+            )
+        )
+        # Not `B`, as written before read; nor `C`, never read
+        self.assertEqual(evaluator.env_names, frozenset(("A", "D")))
+
+        evaluator = StaticEvaluator(env={"A": "1"})
+        symbols = evaluator.run(ast.parse("import os\nENV = {'e': os.environ}\n"))
+        self.assertIsNone(evaluator.env_names)
+        self.assertEqual(to_python(symbols["ENV"]), {"e": {"A": "1"}})
+
+    def test_mutating_calls_unknown(self):
+        symbols = StaticEvaluator(env={"DEBUG": "1"}).run(
+            ast.parse(
+                "import os\n"
+                "DEBUG = os.environ.get('DEBUG') == '1'\n"
+                "INSTALLED_APPS = ['a', 'b']\n"
+                "if DEBUG:\n"
+                "    INSTALLED_APPS.append('debug_toolbar')\n"
+                "MIDDLEWARE = ['m']\n"
+                "MIDDLEWARE.insert(0, 'n')\n"
+                "LOGGING = {'loggers': {}}\n"
+                "LOGGING['loggers'].update(x=1)\n"
+                "'docstring'\n"
+                "os.makedirs('/tmp/x')\n"
+                "HOST = os.environ.get('HOST', 'h')\n"
+            )
+        )
+        self.assertIs(symbols["INSTALLED_APPS"], UNKNOWN)
+        self.assertIs(symbols["MIDDLEWARE"], UNKNOWN)
+        self.assertIs(symbols["LOGGING"], UNKNOWN)
+        # Calls into modules mutate no setting
+        self.assertEqual(symbols["HOST"], "h")
+
+        # Nor does parse resolve the literal assigned before the call
+        source = "A = ['a']\nif B:\n    A.append('b')\nC = [1]\nC.append(2)\n"
+        for q, value in ((".A", None), (".C", None)):
+            self.assertEqual(
+                query_py_parser(infile=StringIO(source), query=q, env={}), value, q
+            )
+
+    def test_query(self):
+        query = lambda q: query_py_parser(
+            infile=StringIO(settings_py), query=q, env=dict(self.env, DB_HOST="db")
+        )
+        self.assertEqual(query(".DATABASES.default.HOST"), "db")
+        self.assertEqual(query(".PORT"), 6432)
+        self.assertEqual(query(".STATIC_ROOT"), "/srv/app/static")
+
+
+class TestSettingsChain(TestCase):
+    def setUp(self):
+        self.tempdir = mkdtemp()
+        self.settings = path.join(self.tempdir, "proj", "settings")
+        mkdir(path.dirname(self.settings))
+        mkdir(self.settings)
+        for filename, s in (
+            (path.join(path.pardir, "__init__.py"), ""),
+            ("__init__.py", ""),
+            ("base.py", "DEBUG = True\nINSTALLED_APPS = ['a']\nDB = {'HOST': 'h'}\n"),
+            (
+                "production.py",
+                "from .base import *\n"
+                "DEBUG = False\n"
+                "INSTALLED_APPS += ['prod']\n"
+                "DB['HOST'] += '2'\n",
+            ),
+            (
+                "staging.py",
+                "from proj.settings.base import *\nfrom .base import DB as D\n",
+            ),
+        ):
+            self.write(filename, s)
+        self.modules = ModuleCache()
+
+    def tearDown(self):
+        rmtree(self.tempdir)
+
+    def write(self, filename, s):
+        with open(path.join(self.settings, filename), "wt") as f:
+            f.write(s)
+
+    def symbols(self, module):
+        filename = path.join(self.settings, module + ".py")
+        with open(filename, "rt") as f:
+            tree = ast.parse(f.read())
+        return StaticEvaluator(env={}, filename=filename, modules=self.modules).run(
+            tree
+        )
+
+    def test_star_import_chain(self):
+        production = self.symbols("production")
+        self.assertEqual(production["DEBUG"], False)
+        self.assertEqual(production["INSTALLED_APPS"], ["a", "prod"])
+        self.assertEqual(production["DB"], {"HOST": "h2"})
+
+        # The base module is evaluated once, and not mutated by its importers
+        base = self.modules.modules[path.join(self.settings, "base.py")]
+        staging = self.symbols("staging")
+        self.assertIs(self.modules.modules[path.join(self.settings, "base.py")], base)
+        self.assertEqual(staging["INSTALLED_APPS"], ["a"])
+        self.assertEqual(staging["D"], {"HOST": "h"})
+
+        # Changing the base—here, its size—invalidates it, and so its importers
+        self.write("base.py", "DEBUG = True\nINSTALLED_APPS = ['a', 'b']\nDB = {}\n")
+        self.assertEqual(
+            self.symbols("production")["INSTALLED_APPS"], ["a", "b", "prod"]
+        )
+
+    def test_bounded_cache(self):
+        self.modules.max_modules = 1
+        self.symbols("staging")
+        self.assertEqual(
+            list(self.modules.modules), [path.join(self.settings, "base.py")]
+        )
+        base = ModuleCache().get(path.join(self.settings, "base.py"), {})
+        self.modules.get(path.join(self.settings, "production.py"), {})
+        self.assertEqual(
+            list(self.modules.modules), [path.join(self.settings, "production.py")]
+        )
+        self.assertEqual(
+            self.modules.get(path.join(self.settings, "base.py"), {}).symbols,
+            base.symbols,
+        )
+
+    def test_query(self):
+        self.assertEqual(
+            query_py_parser(
+                infile=path.join(self.settings, "production.py"),
+                query=".INSTALLED_APPS",
+                env={},
+            ),
+            ["a", "prod"],
+        )
+
+
+if __name__ == "__main__":
+    unittest_main()
@@ -0,0 +1,106 @@
+from os import environ, mkdir, path
+from shutil import rmtree
+from subprocess import PIPE, Popen
+from sys import executable
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest import main as unittest_main
+
+run_cli = """
+import runpy, sys
+sys.argv = ["django_settings_cli"] + sys.argv[1:]
+if len(sys.argv) > 1:
+    runpy.run_module("django_settings_cli", run_name="__main__")
+else:
+    import django_settings_cli.__main__
+sys.stderr.write("\\n".join(sorted(sys.modules)))
+"""
+
+
+class TestImportTime(TestCase):
+    # Only needed by some paths, so must not be paid for by a plain `parse`
+    lazy_modules = (
+        "yaml",
+        "astor",
+        "logging.config",
+        "multiprocessing",
+        "socketserver",
+        "tempfile",
+        "pprint",
+        "pathlib",
+        "orjson",
+        "cProfile",
+        "tracemalloc",
+        "astpath",
+        "lxml",
+        "django_settings_cli.parser.evaluator",
+        "django_settings_cli.parser.template",
+    )
+
+    def setUp(self):
+        self.tempdir = mkdtemp()
+        self.settings = path.join(self.tempdir, "proj")
+        mkdir(self.settings)
+        for filename, s in (
+            ("__init__.py", ""),
+            ("base.py", "DEBUG = True\nDATABASES = {'default': {'PORT': 5432}}\n"),
+            ("production.py", "from .base import *\nDEBUG = False\n"),
+        ):
+            with open(path.join(self.settings, filename), "wt") as f:
+                f.write(s)
+
+    def tearDown(self):
+        rmtree(self.tempdir)
+
+    def imported(self, *args):
+        """
+        Run the CLI with `args`—or only import it, without—in a fresh interpreter
+
+        :param args: Command-line arguments
+        :type args: ```Tuple[str]```
+
+        :return: The modules imported, by name
+        :rtype: ```frozenset```
+        """
+        process = Popen(
+            (executable, "-c", run_cli) + args,
+            stdin=PIPE,
+            stdout=PIPE,
+            stderr=PIPE,
+            universal_newlines=True,
+            env=dict(
+                environ,
+                DJANGO_SETTING_CLI_CACHE_DIR=path.join(self.tempdir, "cache"),
+                PYTHONPATH=path.dirname(path.dirname(path.dirname(__file__))),
+            ),
+        )
+        _, stderr = process.communicate("")
+        self.assertEqual(process.returncode, 0, stderr)
+        return frozenset(stderr.splitlines())
+
+    def assertLazy(self, modules, *needed):
+        for module in self.lazy_modules:
+            if module not in needed:
+                self.assertNotIn(module, modules)
+
+    def test_import(self):
+        modules = self.imported()
+        self.assertIn("django_settings_cli.parser", modules)
+        self.assertLazy(modules)
+
+    def test_parse(self):
+        base = path.join(self.settings, "base.py")
+        for _ in range(2):  # Both as cached, and not
+            self.assertLazy(self.imported("parse", ".DATABASES", base))
+        self.assertLazy(self.imported("parse", "--no-cache", ".DEBUG", base))
+
+    def test_parse_star_imports(self):
+        # Evaluated, but `pathlib` is only imported if the settings import it
+        production = path.join(self.settings, "production.py")
+        modules = self.imported("parse", ".DATABASES.default", production)
+        self.assertIn("django_settings_cli.parser.evaluator", modules)
+        self.assertLazy(modules, "django_settings_cli.parser.evaluator")
+
+
+if __name__ == "__main__":
+    unittest_main()
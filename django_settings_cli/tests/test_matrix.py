@@ -0,0 +1,117 @@
+import ast
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest import main as unittest_main
+
+from django_settings_cli.matrix import render_matrix
+from django_settings_cli.parser.evaluator import ModuleCache, OverlayEvaluator
+
+base_py = """
+import os
+
+DEBUG = False
+DATABASES = {
+    "default": {"HOST": os.environ.get("DB_HOST", "localhost"), "PORT": 5432},
+    "replica": {"HOST": "replica"},
+}
+INSTALLED_APPS = ["a", "b"]
+"""
+
+dev_py = """
+from base import *
+
+DEBUG = True
+DATABASES["default"]["HOST"] = "dev"
+INSTALLED_APPS += ["debug_toolbar"]
+"""
+
+prod_py = """
+DATABASES["default"]["PORT"] = 6432
+SECRET_KEY = "secret"
+"""
+
+
+class TestMatrix(TestCase):
+    def setUp(self):
+        self.tempdir = mkdtemp()
+        self.base, self.dev, self.prod, self.broken = (
+            path.join(self.tempdir, name)
+            for name in ("base.py", "dev.py", "prod.py", "broken.py")
+        )
+        for filename, source in (
+            (self.base, base_py),
+            (self.dev, dev_py),
+            (self.prod, prod_py),
+            (self.broken, "DEBUG = (\n"),
+        ):
+            with open(filename, "wt") as f:
+                f.write(source)
+
+    def tearDown(self):
+        rmtree(self.tempdir)
+
+    def test_copy_on_write(self):
+        base = ModuleCache().get(self.base, {})
+        with open(self.dev, "rt") as f:
+            tree = ast.parse(f.read())
+        symbols = OverlayEvaluator(base, self.base, env={}, filename=self.dev).run(tree)
+
+        self.assertEqual(symbols["DATABASES"]["default"]["HOST"], "dev")
+        self.assertEqual(symbols["INSTALLED_APPS"], ["a", "b", "debug_toolbar"])
+        # Only the containers along the written path are copied
+        self.assertIsNot(symbols["DATABASES"], base.symbols["DATABASES"])
+        self.assertIs(
+            symbols["DATABASES"]["replica"], base.symbols["DATABASES"]["replica"]
+        )
+        self.assertNotIn("os", symbols.maps[0])
+        # And the base is never mutated
+        self.assertEqual(base.symbols["DATABASES"]["default"]["HOST"], "localhost")
+        self.assertEqual(base.symbols["INSTALLED_APPS"], ["a", "b"])
+        self.assertFalse(base.symbols["DEBUG"])
+
+    def test_render_matrix(self):
+        records = list(
+            render_matrix(self.base, (self.dev, self.prod, self.broken), env={})
+        )
+        self.assertEqual(
+            [record["path"] for record in records], [self.dev, self.prod, self.broken]
+        )
+        dev, prod, broken = (record.get("settings") for record in records)
+        self.assertTrue(dev["DEBUG"])
+        self.assertEqual(dev["DATABASES"]["default"], {"HOST": "dev", "PORT": 5432})
+        self.assertFalse(prod["DEBUG"])
+        self.assertEqual(
+            prod["DATABASES"]["default"], {"HOST": "localhost", "PORT": 6432}
+        )
+        self.assertEqual(prod["INSTALLED_APPS"], ["a", "b"])
+        self.assertEqual(list(prod)[-1], "SECRET_KEY")
+        self.assertIsNone(broken)
+        self.assertTrue(records[2]["error"].startswith("SyntaxError"))
+
+    def test_render_matrix_queries(self):
+        records = list(
+            render_matrix(
+                self.base,
+                (self.dev, self.prod),
+                queries=[".DATABASES.default.HOST", "..HOST", ".SECRET_KEY"],
+                env={"DB_HOST": "db"},
+            )
+        )
+        self.assertEqual(
+            [(record["query"], record.get("value")) for record in records],
+            [
+                (".DATABASES.default.HOST", "dev"),
+                ("..HOST", ["dev", "replica"]),
+                (".SECRET_KEY", None),
+                (".DATABASES.default.HOST", "db"),
+                ("..HOST", ["db", "replica"]),
+                (".SECRET_KEY", "secret"),
+            ],
+        )
+        self.assertTrue(records[2]["error"].startswith("KeyError"))
+
+
+if __name__ == "__main__":
+    unittest_main()
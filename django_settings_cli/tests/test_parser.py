@@ -1,5 +1,9 @@
-from os import environ, path
+import ast
+from collections import OrderedDict
+from os import environ, path, utime
+from shutil import rmtree
 from sys import version
+from tempfile import mkdtemp
 from unittest import TestCase
 from unittest import main as unittest_main
 
@@ -10,10 +14,14 @@ if version[0] == "2":
         from cStringIO import StringIO
     except ImportError:
         from StringIO import StringIO
+    from io import TextIOWrapper
 else:
-    from io import StringIO
+    from io import StringIO, TextIOWrapper
 
+from django_settings_cli import utils
 from django_settings_cli.parser import query_py_parser
+from django_settings_cli.parser.parser_utils import descend
+from django_settings_cli.utils import read_text
 
 
 class TestParser(TestCase):
@@ -95,6 +103,148 @@ class TestParser(TestCase):
             "postgresql://taiga@localhost:5432/taiga",
         )
 
+    def test_many_queries(self):
+        self.assertEqual(
+            query_py_parser(
+                infile=self.local_py_example_sio,
+                query=[".DEBUG", ".DATABASES.default.NAME", ".EMAIL_PORT"],
+            ),
+            OrderedDict(
+                (
+                    (".DEBUG", False),
+                    (".DATABASES.default.NAME", "taiga"),
+                    (".EMAIL_PORT", 587),
+                )
+            ),
+        )
+
+    def test_last_assignment_wins(self):
+        self.assertEqual(
+            query_py_parser(infile=self.local_py_example_sio, query=".EMAIL_HOST"),
+            "smtp.gmail.com",
+        )
+
+    def test_subscripts_assign_into_name(self):
+        source = 'X = {"a": 1}\nX["b"] = 2\nX["a"] = 3\n'
+        self.assertEqual(
+            query_py_parser(
+                infile=StringIO(source), query=[".X", ".X.a", ".X[*]", ".X.b"]
+            ),
+            OrderedDict(
+                (
+                    (".X", {"a": 3, "b": 2}),
+                    (".X.a", 3),
+                    (".X[*]", [3, 2]),
+                    (".X.b", 2),
+                )
+            ),
+        )
+        self.assertEqual(
+            query_py_parser(
+                infile=StringIO('X = {"a": 1}\nX["b"] = f()\n'), query=".X"
+            ),
+            {"a": 1, "b": None},
+        )
+
+    def test_subscript_requires_name(self):
+        self.assertRaises(
+            KeyError,
+            query_py_parser,
+            infile=self.local_py_example_sio,
+            query=".REST_FRAMEWORK.github",
+        )
+
+    def test_nested_collections(self):
+        self.assertEqual(
+            query_py_parser(
+                infile=StringIO("X = {'a': ['b', ('c', -1)], 'd': {'e': {}}}\n"),
+                query=".X",
+            ),
+            {"a": ["b", ("c", -1)], "d": {"e": {}}},
+        )
+
+    def test_descend_only_converts_selected(self):
+        tree = ast.parse("X = {'a': {'b': [1, 2]}, 'c': {'a': 5}, 'a': {'b': 3}}")
+        node, remaining_keys = descend(tree.body[0].value, ("a", "b"))
+        self.assertIsInstance(node, ast.Num)
+        self.assertEqual(remaining_keys, ())
+
+        tree = ast.parse("X = {'a': f(b)}")
+        node, remaining_keys = descend(tree.body[0].value, ("a", "b"))
+        self.assertIsInstance(node, ast.Call)
+        self.assertEqual(remaining_keys, ("b",))
+
+
+class TestRead(TestCase):
+    def setUp(self):
+        self.tempdir = mkdtemp()
+        self.settings_py = path.join(self.tempdir, "settings.py")
+        with open(self.settings_py, "wb") as f:
+            f.write(
+                b"# -*- coding: latin-1 -*-\r\nNAME = '\xe9t\xe9'\r\nDEBUG = True\r"
+            )
+
+    def tearDown(self):
+        rmtree(self.tempdir)
+
+    def test_encoding_and_newlines(self):
+        self.assertEqual(
+            query_py_parser(self.settings_py, query=[".NAME", ".DEBUG"]),
+            OrderedDict(((".NAME", "\xe9t\xe9"), (".DEBUG", True))),
+        )
+        self.assertEqual(
+            read_text(self.settings_py),
+            "# -*- coding: latin-1 -*-\r\nNAME = '\xe9t\xe9'\r\nDEBUG = True\r",
+        )
+
+    def test_encoding_on_every_read_path(self):
+        from django_settings_cli.diff import diff_files
+        from django_settings_cli.parser.cache import FileCache
+        from django_settings_cli.snapshot import Snapshot, compile_snapshot
+
+        leaf_py = path.join(self.tempdir, "leaf.py")
+        with open(leaf_py, "wb") as f:
+            f.write(b"# -*- coding: latin-1 -*-\nfrom settings import *\nX = '\xe0'\n")
+
+        # Parse, then again once a touch has the cache reread the file
+        cache = FileCache(path.join(self.tempdir, "cache"))
+        for _ in range(2):
+            self.assertEqual(
+                query_py_parser(self.settings_py, query=".NAME", cache=cache),
+                "\xe9t\xe9",
+            )
+            utime(self.settings_py, (0, 0))
+
+        # A star import
+        self.assertEqual(query_py_parser(leaf_py, query=".NAME", env={}), "\xe9t\xe9")
+
+        # Diff, with its fingerprint cache
+        self.assertEqual(
+            [
+                (record["query"], record["new"])
+                for record in diff_files(
+                    self.settings_py, [leaf_py], env={}, cache=cache
+                )
+            ],
+            [(".X", "\xe0")],
+        )
+
+        # Compile
+        with Snapshot(compile_snapshot(leaf_py, env={})) as snapshot:
+            self.assertTrue(snapshot.fresh(leaf_py, {}))
+            self.assertEqual(snapshot.get(("NAME",)), "\xe9t\xe9")
+
+    def test_mmap_and_stream_read_alike(self):
+        expected = read_text(self.settings_py)
+        threshold = utils.MMAP_THRESHOLD
+        utils.MMAP_THRESHOLD = 0
+        try:
+            self.assertEqual(read_text(self.settings_py), expected)
+        finally:
+            utils.MMAP_THRESHOLD = threshold
+        with open(self.settings_py, "rb") as f:
+            self.assertEqual(read_text(TextIOWrapper(f)), expected)
+
 
 if __name__ == "__main__":
     unittest_main()
@@ -0,0 +1,58 @@
+from json import loads
+from os import environ, path
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest import main as unittest_main
+
+from django_settings_cli import profiling
+from django_settings_cli.parser import query_py_parser
+
+
+class TestProfiling(TestCase):
+    def setUp(self):
+        self.tempdir = mkdtemp()
+        self.settings_py = path.join(self.tempdir, "settings.py")
+        with open(self.settings_py, "wt") as f:
+            f.write("DEBUG = True\r\nDATABASES = {'default': {'NAME': 'db'}}\r\n")
+
+    def tearDown(self):
+        profiling.stop()
+        rmtree(self.tempdir)
+
+    def test_disabled(self):
+        self.assertIs(profiling.phase("read"), profiling.phase("visit"))
+        self.assertIsNone(profiling.stop())
+
+    def test_trace(self):
+        trace_file = path.join(self.tempdir, "trace.jsonl")
+        profiling.start(trace=trace_file)
+        query_py_parser(
+            self.settings_py, query=".DATABASES.default", format_str="{NAME}"
+        )
+        trace = profiling.stop()
+
+        with open(trace_file, "rt") as f:
+            self.assertEqual(loads(f.read()), trace)
+        phases = {p["phase"]: p for p in trace["phases"]}
+        for name in "read", "normalise", "scan", "ast.parse", "visit", "format":
+            self.assertEqual(phases[name]["calls"], 1)
+            self.assertGreaterEqual(phases[name]["seconds"], 0)
+
+    def test_start_from_cli(self):
+        kwargs = {"profile": False, "profile_out": None, "query": "."}
+        environ.pop("DJANGO_SETTING_CLI_PROFILE", None)
+        self.assertFalse(profiling.start_from_cli(dict(kwargs)))
+
+        environ["DJANGO_SETTING_CLI_PROFILE"] = path.join(self.tempdir, "env.jsonl")
+        try:
+            self.assertTrue(profiling.start_from_cli(kwargs))
+        finally:
+            del environ["DJANGO_SETTING_CLI_PROFILE"]
+        self.assertEqual(kwargs, {"query": "."})
+        profiling.stop()
+        self.assertTrue(path.isfile(path.join(self.tempdir, "env.jsonl")))
+
+
+if __name__ == "__main__":
+    unittest_main()
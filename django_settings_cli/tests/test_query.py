@@ -0,0 +1,129 @@
+from io import StringIO
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest import main as unittest_main
+
+from django_settings_cli.parser import query_py_parser
+from django_settings_cli.parser.query import (
+    Filter,
+    Index,
+    Key,
+    Recursive,
+    Slice,
+    Wildcard,
+    compile_query,
+    is_extended,
+    parse_query,
+    xpath,
+)
+
+settings_py = """
+import os
+
+DEBUG = False
+DATABASES = {
+    "default": {"ENGINE": "django.db.backends.postgresql", "HOST": "a", "PORT": 5432},
+    "replica": {
+        "ENGINE": "django.db.backends.mysql",
+        "HOST": os.environ.get("REPLICA_HOST", "b"),
+        "PORT": 3306,
+    },
+}
+INSTALLED_APPS = ["django.contrib.admin", "django.contrib.auth", "app"]
+CACHES = {"default": {"OPTIONS": {"HOST": "c"}}}
+LOGGING = {"django.request": {"level": "ERROR"}}
+REST_FRAMEWORK["PAGE_SIZE"] = 30
+"""
+
+
+class TestQuery(TestCase):
+    def query(self, query):
+        return query_py_parser(StringIO(settings_py), query=query, env={})
+
+    def test_parse_query(self):
+        self.assertFalse(is_extended(".DATABASES.default.NAME"))
+        self.assertTrue(is_extended(".DATABASES.*"))
+        self.assertEqual(
+            parse_query('..HOST.*[0][1:][*]["a.b"][?@.PORT >= 5432]'),
+            (
+                Recursive(Key("HOST")),
+                Wildcard(),
+                Index(0),
+                Slice(slice(1, None)),
+                Wildcard(),
+                Key("a.b"),
+                Filter(("PORT",), ">=", 5432),
+            ),
+        )
+        self.assertIs(compile_query(".A[0]"), compile_query(".A[0]"))
+        for query in "A", ".A[0", ".A[x]", ".A[?]", ".A..":
+            self.assertRaises(ValueError, parse_query, query)
+
+    def test_wildcards_and_recursive_descent(self):
+        self.assertEqual(
+            self.query(".DATABASES.*.ENGINE"),
+            ["django.db.backends.postgresql", "django.db.backends.mysql"],
+        )
+        self.assertEqual(self.query("..HOST"), ["a", "b", "c"])
+        self.assertEqual(self.query(".CACHES..HOST"), ["c"])
+        self.assertEqual(self.query(".REST_FRAMEWORK.*"), [30])
+
+    def test_star_imports(self):
+        tempdir = mkdtemp()
+        try:
+            with open(path.join(tempdir, "base.py"), "wt") as f:
+                f.write(
+                    "import os\n_PRIVATE = 1\n"
+                    "CACHES = {'default': {'LOCATION': 'a'}}\nDEBUG = False\n"
+                )
+            leaf = path.join(tempdir, "prod.py")
+            with open(leaf, "wt") as f:
+                f.write(
+                    "from base import *\n"
+                    "DEBUG = True\nSESSION = {'LOCATION': 'b'}\n_X = 1\n"
+                )
+            query = lambda q: query_py_parser(infile=leaf, query=q, env={})
+            self.assertEqual(query("..LOCATION"), ["a", "b"])
+            self.assertEqual(
+                query(".*"),
+                [{"default": {"LOCATION": "a"}}, True, {"LOCATION": "b"}, 1],
+            )
+            self.assertEqual(query("..CACHES.default.LOCATION"), ["a"])
+        finally:
+            rmtree(tempdir)
+
+    def test_indexes_and_keys(self):
+        self.assertEqual(self.query(".INSTALLED_APPS[-1]"), "app")
+        self.assertEqual(self.query(".INSTALLED_APPS[:2]")[1], "django.contrib.auth")
+        self.assertEqual(self.query('.LOGGING["django.request"].level'), "ERROR")
+        self.assertRaises(KeyError, self.query, ".INSTALLED_APPS[3]")
+
+    def test_filters(self):
+        self.assertEqual(self.query('.DATABASES[?ENGINE =~ "mysql"].HOST'), ["b"])
+        self.assertEqual(self.query(".DATABASES[?@.PORT < 4000].PORT"), [3306])
+        self.assertEqual(len(self.query(".DATABASES[?HOST]")), 2)
+        self.assertEqual(self.query('.DATABASES[?PORT == "5432"]'), [])
+
+    def test_many_queries(self):
+        self.assertEqual(
+            list(self.query([".DEBUG", ".INSTALLED_APPS[0]", "..PORT"]).values()),
+            [False, "django.contrib.admin", [5432, 3306]],
+        )
+
+    def test_xpath(self):
+        self.assertEqual(
+            xpath(settings_py, '//Assign[targets/Name/@id="DEBUG"]/value'), [False]
+        )
+        self.assertEqual(
+            xpath(settings_py, "//Assign/targets/Name/@id"),
+            ["DEBUG", "DATABASES", "INSTALLED_APPS", "CACHES", "LOGGING"],
+        )
+        self.assertEqual(
+            xpath(settings_py, "//Call"), ['os.environ.get("REPLICA_HOST", "b")']
+        )
+
+
+if __name__ == "__main__":
+    unittest_main()
@@ -0,0 +1,43 @@
+from unittest import TestCase
+from unittest import main as unittest_main
+
+from django_settings_cli.parser.scanner import find_statements
+
+
+class TestScanner(TestCase):
+    def test_finds_only_target_statements(self):
+        self.assertEqual(
+            find_statements(
+                '"""Docstring"""\n'
+                "A = {\n    'k': [1,\n2],  # comment\n}\n"
+                "B = 'a = 0'\n"
+                "A['j'] = 5; C = 1\n",
+                ["A"],
+            ),
+            ["A = {\n    'k': [1,\n2],  # comment\n}\n", "A['j'] = 5; C = 1\n"],
+        )
+
+    def test_finds_method_calls(self):
+        self.assertEqual(
+            find_statements("A = [1]\nA.append(2)\nA['k'].update(x=1)\n", ["A"]),
+            ["A = [1]\n", "A.append(2)\n", "A['k'].update(x=1)\n"],
+        )
+
+    def test_absent(self):
+        self.assertEqual(find_statements("A = 1\n", ["B"]), [])
+
+    def test_undecidable(self):
+        for source in (
+            "if DEBUG:\n    A = 1\n",
+            "B = A = 1\n",
+            "B = 'A = 0'\n",
+            "X = dict(\nA=1,\n)\n",
+            "X = '''\nA = 1\n'''\n",
+            "X = 1 + \\\n2\nA = (\n",
+            "if DEBUG:\n    A.append(1)\n",
+        ):
+            self.assertIsNone(find_statements(source, ["A"]), source)
+
+
+if __name__ == "__main__":
+    unittest_main()
@@ -0,0 +1,103 @@
+from collections import OrderedDict
+from json import loads
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest import main as unittest_main
+
+from django_settings_cli.serializers import (
+    _CHUNK_SIZE,
+    STREAM_THRESHOLD,
+    iter_env_lines,
+    iterencode,
+)
+from django_settings_cli.utils import stream_tree_as_json
+
+
+def _encode(value, indent=True):
+    return "".join(
+        chunk if isinstance(chunk, str) else chunk.decode("utf-8")
+        for chunk in iterencode(value, indent=indent)
+    )
+
+
+class TestSerializers(TestCase):
+    database = OrderedDict(
+        (
+            ("ENGINE", "django.db.backends.postgresql"),
+            ("PASSWORD", "it's $ecret"),
+            ("PORT", 5432),
+            ("OPTIONS", OrderedDict((("sslmode", "require"), ("ssl", True)))),
+            ("TEST", {}),
+        )
+    )
+
+    def setUp(self):
+        self.tempdir = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.tempdir)
+
+    def test_iterencode(self):
+        value = [self.database, None, 2**70]
+        self.assertEqual(loads(_encode(value)), loads(_encode(value, indent=False)))
+        chunks = list(iterencode(self.database, stream=True))
+        self.assertTrue(all(isinstance(chunk, str) for chunk in chunks))
+        self.assertEqual(loads("".join(chunks)), self.database)
+        self.assertNotIn(" ", _encode(value, indent=False).replace("it's $", ""))
+
+    def test_streams_large_values(self):
+        # Shared elements count each time, as each is encoded
+        value = {"A": ["x" * 100] * (STREAM_THRESHOLD // 100 + 1)}
+        for chunks in iterencode(value), iterencode(value, indent=False):
+            chunks = list(chunks)
+            self.assertGreater(len(chunks), 1)
+            self.assertTrue(
+                all(
+                    isinstance(chunk, str) and len(chunk) < 2 * _CHUNK_SIZE
+                    for chunk in chunks
+                )
+            )
+            self.assertEqual(loads("".join(chunks)), value)
+
+    def test_json_not_quoted(self):
+        filename = path.join(self.tempdir, "out.json")
+        for value in True, None, self.database:
+            stream_tree_as_json(filename, value, raw_strings=False)
+            with open(filename, "rt") as f:
+                self.assertEqual(loads(f.read()), value)
+
+    def test_dotenv(self):
+        self.assertEqual(
+            "".join(iter_env_lines(self.database, ".DATABASES.default")),
+            "ENGINE=django.db.backends.postgresql\n"
+            'PASSWORD="it\'s $ecret"\n'
+            "PORT=5432\n"
+            "OPTIONS__sslmode=require\n"
+            "OPTIONS__ssl=true\n"
+            "TEST='{}'\n",
+        )
+
+    def test_shell(self):
+        self.assertEqual(
+            "".join(
+                iter_env_lines(
+                    OrderedDict(
+                        (
+                            (".DEBUG", False),
+                            (".DATABASES.default.PASSWORD", "it's $ecret"),
+                        )
+                    ),
+                    [".DEBUG", ".DATABASES.default.PASSWORD"],
+                    shell=True,
+                )
+            ),
+            "export DEBUG=false\n"
+            "export DATABASES__default__PASSWORD='it'\"'\"'s $ecret'\n",
+        )
+        self.assertRaises(ValueError, list, iter_env_lines("A = 1\n", "."))
+
+
+if __name__ == "__main__":
+    unittest_main()
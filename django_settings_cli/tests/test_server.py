@@ -0,0 +1,80 @@
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Thread
+from unittest import TestCase
+from unittest import main as unittest_main
+
+from django_settings_cli.emitter import MergeStrategy
+from django_settings_cli.server import client, make_server, request
+
+
+class TestServer(TestCase):
+    def setUp(self):
+        self.tempdir = mkdtemp()
+        self.socket_path = path.join(self.tempdir, "server.sock")
+        self.settings_py = path.join(self.tempdir, "settings.py")
+        with open(self.settings_py, "wt") as f:
+            f.write("DEBUG = True\nDATABASES = {'default': {'NAME': 'a'}}\n")
+
+        self.server = make_server(self.socket_path)
+        self.thread = Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        rmtree(self.tempdir)
+
+    def parse(self, query, **kwargs):
+        kwargs.setdefault("infile", self.settings_py)
+        kwargs.setdefault("source", None)
+        return request(self.socket_path, "parse", dict(query=query, **kwargs))
+
+    def test_parse(self):
+        self.assertEqual(
+            self.parse([".DEBUG", ".DATABASES.default.NAME"]),
+            {".DEBUG": True, ".DATABASES.default.NAME": "a"},
+        )
+        self.assertEqual(self.parse(".DEBUG", infile=None, source="DEBUG = 5\n"), 5)
+        self.assertIsNotNone(self.server.cache.get(self.settings_py))
+        self.assertRaises(RuntimeError, self.parse, ".NOPE")
+
+    def test_emit(self):
+        self.assertEqual(
+            request(
+                self.socket_path,
+                "emit",
+                {
+                    "infile": None,
+                    "source": "A = 1\n",
+                    "query": ".B",
+                    "input_s": "B = 2",
+                    "merge": "upsert",
+                },
+            ),
+            {"source": "A = 1\nB = 2\n", "encoding": "utf-8"},
+        )
+
+    def test_emit_in_place_keeps_encoding(self):
+        with open(self.settings_py, "wb") as f:
+            f.write(b"# -*- coding: latin-1 -*-\nNAME = '\xe9t\xe9'\n")
+        client(
+            self.socket_path,
+            "emit",
+            {
+                "infile": self.settings_py,
+                "query": ".NAME",
+                "input_s": "'\xe0 la'",
+                "merge": MergeStrategy.upsert,
+                "outfile": None,
+                "in_place": True,
+            },
+        )
+        with open(self.settings_py, "rb") as f:
+            self.assertEqual(f.read(), b"# -*- coding: latin-1 -*-\nNAME = '\xe0 la'\n")
+
+
+if __name__ == "__main__":
+    unittest_main()
@@ -0,0 +1,139 @@
+from collections import OrderedDict
+from os import environ, path
+from shutil import rmtree
+from subprocess import PIPE, Popen
+from sys import executable
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest import main as unittest_main
+
+from django_settings_cli.parser.cache import content_hash
+from django_settings_cli.snapshot import Snapshot, build_snapshot, compile_snapshot
+
+settings_py = """
+import os
+
+DEBUG = False
+DATABASES = {"default": {"HOST": os.environ.get("DB_HOST", "localhost"), "PORT": 5432}}
+INSTALLED_APPS = ["a", "b", "c"]
+LOGGING = {"django.request": {"level": "ERROR"}}
+"""
+
+
+class TestSnapshot(TestCase):
+    def setUp(self):
+        self.tempdir = mkdtemp()
+        self.settings_py = path.join(self.tempdir, "settings.py")
+        with open(self.settings_py, "wt") as f:
+            f.write(settings_py)
+
+    def tearDown(self):
+        rmtree(self.tempdir)
+
+    def test_compile_and_query(self):
+        filename = compile_snapshot(self.settings_py, env={"DB_HOST": "db"})
+        self.assertEqual(filename, path.join(self.tempdir, "settings.snapshot"))
+        with Snapshot(filename) as snapshot:
+            self.assertEqual(
+                snapshot.names, ("DEBUG", "DATABASES", "INSTALLED_APPS", "LOGGING")
+            )
+            self.assertEqual(snapshot.env_names, ["DB_HOST"])
+            self.assertTrue(snapshot.fresh(self.settings_py, {"DB_HOST": "db"}))
+            # Only the variables read count
+            self.assertTrue(
+                snapshot.fresh(self.settings_py, {"DB_HOST": "db", "PWD": "/", "A": ""})
+            )
+            self.assertFalse(snapshot.fresh(self.settings_py, {"DB_HOST": "x"}))
+            self.assertFalse(snapshot.fresh(self.settings_py, {}))
+            self.assertEqual(snapshot.query(".DATABASES.default.HOST"), "db")
+            self.assertEqual(
+                snapshot.query(
+                    [".DEBUG", ".INSTALLED_APPS[-1]", ".INSTALLED_APPS.0", "..PORT"]
+                ),
+                OrderedDict(
+                    (
+                        (".DEBUG", False),
+                        (".INSTALLED_APPS[-1]", "c"),
+                        (".INSTALLED_APPS.0", "a"),
+                        ("..PORT", [5432]),
+                    )
+                ),
+            )
+            self.assertEqual(
+                snapshot.query('.LOGGING["django.request"]', format_str="{level}"),
+                "ERROR",
+            )
+            self.assertEqual(snapshot.query(".")["INSTALLED_APPS"], ["a", "b", "c"])
+            self.assertRaises(KeyError, snapshot.query, ".MISSING")
+            self.assertRaises(KeyError, snapshot.query, ".DATABASES.default.NAME")
+            self.assertRaises(KeyError, snapshot.query, ".INSTALLED_APPS[3]")
+
+        with open(self.settings_py, "at") as f:
+            f.write("DEBUG = True\n")
+        with Snapshot(filename) as snapshot:
+            self.assertFalse(snapshot.fresh(self.settings_py, {"DB_HOST": "db"}))
+
+    def test_fresh_with_imports(self):
+        base_py = path.join(self.tempdir, "base.py")
+        with open(base_py, "wt") as f:
+            f.write("DEBUG = False\n")
+        with open(self.settings_py, "wt") as f:
+            f.write("from base import *\nsecret = 'a'\n_PRIVATE = 1\n")
+        with Snapshot(compile_snapshot(self.settings_py, env={})) as snapshot:
+            self.assertEqual(snapshot.names, ("DEBUG", "secret"))
+            self.assertTrue(snapshot.fresh(self.settings_py, {}))
+
+        with open(base_py, "wt") as f:
+            f.write("DEBUG = True\n")
+        with Snapshot(path.join(self.tempdir, "settings.snapshot")) as snapshot:
+            self.assertFalse(snapshot.fresh(self.settings_py, {}))
+
+        # The variables read by the modules imported count too
+        with open(base_py, "wt") as f:
+            f.write("import os\nDEBUG = 'DEBUG' in os.environ\n")
+        with Snapshot(compile_snapshot(self.settings_py, env={"X": "1"})) as snapshot:
+            self.assertEqual(snapshot.env_names, ["DEBUG"])
+            self.assertTrue(snapshot.fresh(self.settings_py, {}))
+            self.assertFalse(snapshot.fresh(self.settings_py, {"DEBUG": ""}))
+
+    def test_stale_warning_on_stderr(self):
+        snapshot = compile_snapshot(self.settings_py, env={})
+        with open(self.settings_py, "at") as f:
+            f.write("DEBUG = True\n")
+        process = Popen(
+            [executable, "-m", "django_settings_cli", "parse"]
+            + ["--snapshot", snapshot, ".DEBUG", self.settings_py],
+            stdin=PIPE,
+            stdout=PIPE,
+            stderr=PIPE,
+            universal_newlines=True,
+            env=dict(
+                environ,
+                PYTHONPATH=path.dirname(path.dirname(path.dirname(__file__))),
+            ),
+        )
+        stdout, stderr = process.communicate("")
+        # Only the result is output; diagnostics are not
+        self.assertEqual(stdout.strip(), "true")
+        self.assertIn("Stale snapshot", stderr)
+
+    def test_index(self):
+        settings = OrderedDict(
+            ("SETTING_{:d}".format(i), {"values": list(range(i % 7))})
+            for i in range(500)
+        )
+        filename = path.join(self.tempdir, "large.snapshot")
+        with open(filename, "wb") as f:
+            f.write(build_snapshot(settings, content_hash("")))
+        with Snapshot(filename) as snapshot:
+            self.assertEqual(snapshot.source_hash, content_hash(""))
+            for name, value in settings.items():
+                self.assertEqual(snapshot.get((name,)), value)
+                self.assertEqual(snapshot.get((name, "values")), value["values"])
+
+    def test_not_a_snapshot(self):
+        self.assertRaises(ValueError, Snapshot, self.settings_py)
+
+
+if __name__ == "__main__":
+    unittest_main()
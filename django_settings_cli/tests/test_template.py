@@ -0,0 +1,70 @@
+from unittest import TestCase
+from unittest import main as unittest_main
+
+from django_settings_cli.parser.template import compile_template
+
+
+class TestTemplate(TestCase):
+    database = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": "taiga",
+        "USER": "taiga",
+        "HOST": "",
+        "PORT": 5432,
+    }
+
+    def test_render(self):
+        self.assertEqual(
+            compile_template(
+                '{ENGINE[ENGINE.rfind(".")+1:]}://{USER}@{HOST or "localhost"}:'
+                "{PORT:06d}/{NAME!r} {{literal}}"
+            ).render(self.database),
+            "postgresql://taiga@localhost:005432/'taiga' {literal}",
+        )
+
+    def test_no_eval(self):
+        self.assertEqual(
+            compile_template('{ENGINE[ENGINE.rfind(".")+1:]}', no_eval=True).render(
+                self.database
+            ),
+            "django.db.backends.postgresql",
+        )
+
+    def test_compiled_once(self):
+        self.assertIs(compile_template("{NAME}"), compile_template("{NAME}"))
+
+    def test_rejects_unsafe(self):
+        for format_str in (
+            '{__import__("os")}',
+            "{ENGINE.__class__}",
+            "{exit(1)}",
+            "{ENGINE.format(NAME)}",
+            "{[x for x in NAME]}",
+            "{(lambda: 0)()}",
+            "{NAME",
+        ):
+            self.assertRaises(ValueError, compile_template, format_str)
+
+    def test_bounded(self):
+        # `**` is not allowed at all
+        self.assertRaises(ValueError, compile_template, "{NAME*10**12}")
+        for format_str in (
+            "{NAME*1000000000}",
+            "{'x'*10000000000}",
+            "{'%999999999d'%PORT}",
+            "{'-'.join([NAME*100000]*100)}",
+            "{NAME.replace('a', NAME*200000)}",
+            "{NAME:>999999999}",
+            "{PORT:.999999999f}",
+        ):
+            self.assertRaises(
+                ValueError, compile_template(format_str).render, self.database
+            )
+        self.assertEqual(
+            compile_template("{NAME*2}{'%5d'%PORT}{NAME:>7}").render(self.database),
+            "taigataiga 5432  taiga",
+        )
+
+
+if __name__ == "__main__":
+    unittest_main()
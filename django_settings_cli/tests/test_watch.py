@@ -0,0 +1,97 @@
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase
+from unittest import main as unittest_main
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from django_settings_cli.parser.watch import WatchedFile
+
+
+class TestWatch(TestCase):
+    def setUp(self):
+        self.tempdir = mkdtemp()
+        self.settings_py = path.join(self.tempdir, "settings.py")
+        self.watched = WatchedFile(self.settings_py, [".DEBUG", ".CACHES.default"])
+
+    def tearDown(self):
+        rmtree(self.tempdir)
+
+    def write_settings(self, s):
+        with open(self.settings_py, "wt") as f:
+            f.write(s)
+        # Invalidate the stat check, as a write within the same mtime tick can leave it
+        self.watched.stat_key = None
+
+    def events(self):
+        return [
+            (event["query"], event.get("value", event.get("error", "").split(":")[0]))
+            for event in self.watched.refresh()
+        ]
+
+    def test_only_changes_emitted(self):
+        self.assertEqual(
+            self.events(),
+            [(".DEBUG", "FileNotFoundError"), (".CACHES.default", "FileNotFoundError")],
+        )
+        self.write_settings("DEBUG = True\nCACHES = {'default': {'TIMEOUT': 1}}\n")
+        self.assertEqual(
+            self.events(), [(".DEBUG", True), (".CACHES.default", {"TIMEOUT": 1})]
+        )
+        self.assertEqual(self.events(), [])
+
+        self.write_settings("DEBUG = False\nCACHES = {'default': {'TIMEOUT': 1}}\n")
+        self.assertEqual(self.events(), [(".DEBUG", False)])
+
+        # Unchanged statements are not parsed again
+        with patch("django_settings_cli.parser.watch._materialise") as materialise:
+            materialise.return_value = []
+            self.write_settings(
+                "X = 1\nDEBUG = False\nCACHES = {'default': {'TIMEOUT': 1}}\n"
+            )
+            self.assertEqual(self.events(), [])
+            materialise.assert_not_called()
+
+        self.write_settings("DEBUG = (\n")
+        self.assertEqual(
+            self.events(),
+            [(".DEBUG", "SyntaxError"), (".CACHES.default", "SyntaxError")],
+        )
+
+    def test_resolves_as_parse(self):
+        base_py = path.join(self.tempdir, "base.py")
+        with open(base_py, "wt") as f:
+            f.write("CACHES = {'default': {'LOCATION': 'a'}}\n")
+        self.watched = WatchedFile(
+            self.settings_py,
+            [".", ".HOST", ".CACHES.default.LOCATION", ".X[*]"],
+            env={"DB_HOST": "db"},
+        )
+        self.write_settings(
+            "import os\nfrom base import *\n"
+            "HOST = os.environ.get('DB_HOST', 'localhost')\nX = [1, 2]\n"
+        )
+        with open(self.settings_py, "rt") as f:
+            source = f.read()
+        self.assertEqual(
+            self.events(),
+            [
+                (".", source),
+                (".HOST", "db"),
+                (".CACHES.default.LOCATION", "a"),
+                (".X[*]", [1, 2]),
+            ],
+        )
+
+        # A change to an imported module alone is seen too
+        with open(base_py, "wt") as f:
+            f.write("CACHES = {'default': {'LOCATION': 'bb'}}\n")
+        self.assertEqual(self.events(), [(".CACHES.default.LOCATION", "bb")])
+
+
+if __name__ == "__main__":
+    unittest_main()
@@ -1,14 +1,20 @@
-from json import dumps
-from os import path
-from pprint import PrettyPrinter
+from os import chmod, fstat, path, remove, replace, stat, walk
 from string import ascii_letters
-from sys import stdout, version
+from sys import stdin, stdout, version
 
 if version[0] == "3":
     string_types = (str,)
 else:
     string_types = (basestring,)
 
+# Output formats of `serializers`: here, so that parsing arguments doesn't import it
+FORMATS = ("json", "compact", "ndjson", "dotenv", "shell")
+
+# Files at least this size are decoded straight from an mmap, not read into bytes first
+MMAP_THRESHOLD = 1024 * 1024
+
+_CHUNK_SIZE = 64 * 1024
+
 
 def _file_or_dash(parser, arg):
     if arg != "-" and not path.exists(arg):
@@ -16,28 +22,246 @@ def _file_or_dash(parser, arg):
     return arg
 
 
-pp = PrettyPrinter(indent=4).pprint
+def expand_paths(paths):
+    """
+    Expand directories, globs and file lists
+
+    :param paths: Directories—searched recursively for *.py—globs, filenames, and
+      `@` prefixed files listing a filename per line (`@-` for stdin)
+    :type paths: ```Iterable[str]```
+
+    :return: Filenames, lazily, in the order given
+    :rtype: ```Iterator[str]```
+    """
+    for p in paths:
+        if p.startswith("@"):
+            f = stdin if p == "@-" else open(p[1:], "rt")
+            try:
+                for line in f:
+                    line = line.rstrip("\n")
+                    if line:
+                        yield line
+            finally:
+                if f is not stdin:
+                    f.close()
+        elif path.isdir(p):
+            for root, dirs, files in walk(p):
+                dirs.sort()
+                for filename in sorted(files):
+                    if filename.endswith(".py"):
+                        yield path.join(root, filename)
+        elif any(ch in p for ch in "*?["):
+            from glob import glob
+
+            for filename in sorted(glob(p, recursive=True)):
+                yield filename
+        else:
+            yield p
+
+
+def _decode_source(data):
+    """
+    Decode Python source—`bytes`, `bytearray` or `mmap`—by its BOM or PEP 263 encoding
+    cookie, into one `str`, without first copying `data`
+    """
+    from tokenize import detect_encoding
+
+    # The cookie may only be on the first two lines
+    end = data.find(b"\n", data.find(b"\n") + 1)
+    lines = iter(data[: len(data) if end == -1 else end + 1].splitlines(True))
+    encoding, _ = detect_encoding(lambda: next(lines, b""))
+    return data.decode(encoding) if hasattr(data, "decode") else str(data, encoding)
+
+
+def read_text(infile):
+    """
+    Read Python source in bulk: a file in one read—or, when large, decoded straight from
+    an mmap of it—or a binary stream in chunks; decoded by its PEP 263 encoding
+
+    :param infile: Filename, or file-like object; a text stream with a binary `buffer`
+      (e.g., stdin) is read through that buffer
+    :type infile: ```Union[str, TextIO, BinaryIO]```
+
+    :return: Source, newlines untranslated
+    :rtype: ```str```
+    """
+    if isinstance(infile, string_types):
+        with open(infile, "rb") as f:
+            if fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+                return _decode_source(f.read())
+            from mmap import ACCESS_READ, mmap
+
+            mapped = mmap(f.fileno(), 0, access=ACCESS_READ)
+            try:
+                return _decode_source(mapped)
+            finally:
+                mapped.close()
+
+    buffer = getattr(infile, "buffer", None)
+    if buffer is None:
+        data = infile.read()
+        return _decode_source(data) if isinstance(data, bytes) else data
+    data = bytearray()
+    while True:
+        chunk = buffer.read(_CHUNK_SIZE)
+        if not chunk:
+            return _decode_source(data)
+        data += chunk
+
+
+def env_digest(env, names=None):
+    """
+    Digest the part of `env` that an evaluation read, e.g., to check that it is fresh
+
+    :param env: Environment
+    :type env: ```Mapping[str, str]```
+
+    :param names: Names read—each digested with its value, or its absence—or `None`
+      when the whole environment was, e.g., by `dict(os.environ)`
+    :type names: ```Optional[Iterable[str]]```
+
+    :return: SHA-1 hex digest
+    :rtype: ```str```
+    """
+    from hashlib import sha1
+
+    items = env.items() if names is None else ((name, env.get(name)) for name in names)
+    return sha1(repr(sorted(items)).encode("utf-8")).hexdigest()
+
+
+def write_if_changed(filename, text, encoding="utf-8"):
+    """
+    Atomically replace `filename` with `text`—written to a temporary file beside it,
+    then renamed over it—unless it already holds exactly those bytes
+
+    :param filename: Filename
+    :type filename: ```str```
+
+    :param text: New contents, newlines untranslated
+    :type text: ```str```
+
+    :param encoding: Encoding of the file
+    :type encoding: ```str```
+
+    :return: Whether the file was written
+    :rtype: ```bool```
+    """
+    data = text.encode(encoding)
+    try:
+        with open(filename, "rb") as f:
+            if f.read() == data:
+                return False
+        mode = stat(filename).st_mode
+    except (IOError, OSError):
+        mode = None
+
+    from tempfile import NamedTemporaryFile
+
+    directory = path.dirname(path.abspath(filename))
+    with NamedTemporaryFile(
+        "wb", dir=directory, prefix=".{}.".format(path.basename(filename)), delete=False
+    ) as f:
+        f.write(data)
+    try:
+        if mode is not None:
+            chmod(f.name, mode)
+        replace(f.name, filename)
+    except OSError:
+        remove(f.name)
+        raise
+    return True
 
 
-def stream_tree_as_json(outfile, r, raw_strings):
+def pp(obj):
+    from pprint import PrettyPrinter
+
+    PrettyPrinter(indent=4).pprint(obj)
+
+
+def stream_tree_as_json(outfile, r, raw_strings, compact=False):
+    """
+    Write `r` as a JSON text—or, for strings, as is—streamed chunk by chunk
+
+    :param outfile: Output filename, or `None` for stdout
+    :type outfile: ```Optional[str]```
+
+    :param r: Value
+    :type r: ```Any```
+
+    :param raw_strings: Output strings without quotes
+    :type raw_strings: ```bool```
+
+    :param compact: No indentation or whitespace
+    :type compact: ```bool```
+    """
+    from django_settings_cli.serializers import iterencode, write_chunks
+
     stream = stdout if outfile is None else open(outfile, "wt")
-    is_str = isinstance(r, string_types)
-    new_line = is_str
-    if raw_strings:
-        s = r if is_str else dumps(r, indent=2)
-        stream.write(s[1:-1] if s.startswith('"') else s)
-        new_line = r.endswith("\n")
-    elif is_str:
-        stream.write(quote_str(r))
+    if isinstance(r, string_types):
+        # Written as is—not copied into a quoted string—e.g., a whole settings file
+        chunks = (
+            ('"', r, '"') if not raw_strings and r and r[0] in ascii_letters else (r,)
+        )
         new_line = r.endswith("\n")
     else:
-        s = r if is_str else dumps(r, indent=2)
-        stream.write(quote_str(s))
+        chunks = iterencode(r, indent=not compact)
+        new_line = False
+    write_chunks(stream, chunks)
     if not new_line:
         stream.write("\n")
     if stream != stdout:
         stream.close()
 
 
+def stream_json_lines(outfile, records, flush=False):
+    """
+    Write each record as a compact JSON text on its own line
+
+    :param outfile: Output filename, or `None` for stdout
+    :type outfile: ```Optional[str]```
+
+    :param records: JSON serialisable records
+    :type records: ```Iterable[Any]```
+
+    :param flush: Flush after each record, for long-running producers
+    :type flush: ```bool```
+    """
+    from django_settings_cli.serializers import iterencode, write_chunks
+
+    stream = stdout if outfile is None else open(outfile, "wt")
+    for record in records:
+        write_chunks(stream, iterencode(record, indent=False))
+        stream.write("\n")
+        if flush:
+            stream.flush()
+    if stream != stdout:
+        stream.close()
+
+
+def stream_env_lines(outfile, r, query, shell=False):
+    """
+    Write the result of `query` as `.env` lines, or shell `export` lines
+
+    :param outfile: Output filename, or `None` for stdout
+    :type outfile: ```Optional[str]```
+
+    :param r: Result of `query`
+    :type r: ```Any```
+
+    :param query: Query string, or query strings
+    :type query: ```Union[str, List[str]]```
+
+    :param shell: `export NAME='value'` lines
+    :type shell: ```bool```
+    """
+    from django_settings_cli.serializers import iter_env_lines
+
+    stream = stdout if outfile is None else open(outfile, "wt")
+    for line in iter_env_lines(r, query, shell=shell):
+        stream.write(line)
+    if stream != stdout:
+        stream.close()
+
+
 def quote_str(s):
     return '"{}"'.format(s) if len(s) and s[0] in ascii_letters else s